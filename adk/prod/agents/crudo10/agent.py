@@ -13,6 +13,8 @@ from .constants import (
     get_cloud_run_endpoints,
     get_cloud_run_revisions,
     get_cloud_run_logs,
+    query_cloud_run_logs,
+    get_cloud_run_logs_histogram,
     gfc_generate_cloud_run_requests_vs_latency_chart,
     gfc_generate_cloud_run_instance_chart,
     gfc_generate_cloud_run_network_chart,
@@ -29,6 +31,8 @@ crudo_tools = [
     FunctionTool(get_cloud_run_endpoints),
     FunctionTool(get_cloud_run_revisions),
     FunctionTool(get_cloud_run_logs),
+    FunctionTool(query_cloud_run_logs),
+    FunctionTool(get_cloud_run_logs_histogram),
     FunctionTool(gfc_generate_cloud_run_requests_vs_latency_chart),
     FunctionTool(gfc_generate_cloud_run_instance_chart),
     FunctionTool(gfc_generate_cloud_run_network_chart),
@@ -3,7 +3,7 @@ import logging
 from .lib.ricc_colors import darkgray
 #from .lib.ricc_protobuf_converter import ProtobufConverter
 
-from .lib.ricc_cloud_run import get_cloud_run_revisions, get_cloud_run_endpoints, get_cloud_run_logs, get_cloud_run_logs_for_date
+from .lib.ricc_cloud_run import get_cloud_run_revisions, get_cloud_run_endpoints, get_cloud_run_logs, get_cloud_run_logs_for_date, query_cloud_run_logs, get_cloud_run_logs_histogram
 from .lib.ricc_gcp import default_project_and_region_instructions
 from .lib.ricc_system import current_time, current_place
 from .lib.ricc_net import check_url_endpoint
@@ -54,6 +54,8 @@ RICC_SIMPLIFIED_FUNCTIONS = [
     get_cloud_run_revisions,
     get_cloud_run_logs,
     #get_cloud_run_logs_for_date,
+    query_cloud_run_logs, # local log store: no Cloud Logging call
+    get_cloud_run_logs_histogram, # counts per severity per bucket: where to zoom in
     #TODO_SOON get_cloud_run_config,
     #TODO_LATER update_cloud_run_memory
     # Cloud Monitoring
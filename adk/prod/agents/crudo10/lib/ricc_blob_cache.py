@@ -0,0 +1,254 @@
+# lib/ricc_blob_cache.py
+# Content-addressed, gzip-compressed store for the .cache/ artifacts, with a global size budget (LRU).
+#
+#   .cache/blobs/ab/ab12...ef.gz   one file per distinct content (sha256 of the uncompressed bytes)
+#   .cache/blob_index.sqlite       cache key (request parameters) -> blob, stored_at, last_access
+#
+# Entry point, from crudo10/:  python -m lib.ricc_blob_cache stats|gc [--root .cache] [--max-mb 256]
+#
+# gc also deletes the plain files of the layout before the blob store (.cache/<project>/cloud-run/**),
+# which nothing reads any more. Kept: logs.sqlite (the log store) and service.yaml (a plain export).
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024 # compressed bytes on disk
+# Old layout cache files (relative to the root), and the names under them that are still current.
+LEGACY_PATTERNS = ("*/cloud-run/**/*.json", "*/cloud-run/**/*.yaml", "*/cloud-run/**/*_logs.txt")
+LEGACY_KEEP = ("service.yaml",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,   -- sha256 of the uncompressed content
+    size INTEGER NOT NULL,     -- compressed, on disk
+    raw_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_last_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS entries_by_digest ON entries (digest);
+"""
+
+
+class BlobCache:
+    """
+    Maps cache keys to compressed blobs named by the hash of their content: identical payloads
+    (the same revisions list cached for two regions, an unchanged config refetched...) are stored once.
+
+    When the blobs exceed max_bytes, the least recently read entries are evicted (and their blobs
+    deleted once no other key points to them).
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES, compresslevel: int = 6):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.max_bytes = max_bytes
+        self.compresslevel = compresslevel
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        """The index, opened on first use (the cache dir may not exist before the first write)."""
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.root / "blob_index.sqlite"), check_same_thread=False)
+            with self._conn:
+                self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / f"{digest}.gz"
+
+    def put(self, key: str, data: bytes, stored_at: Optional[float] = None) -> str:
+        """Stores data under key (replacing its previous value). Returns the content digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        size = path.stat().st_size if path.exists() else self._write_blob(path, data)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            with db:
+                previous = db.execute("SELECT digest FROM entries WHERE key = ?;", (key,)).fetchone()
+                db.execute("INSERT OR IGNORE INTO blobs (digest, size, raw_size) VALUES (?, ?, ?);", (digest, size, len(data)))
+                db.execute(
+                    "INSERT OR REPLACE INTO entries (key, digest, stored_at, last_access) VALUES (?, ?, ?, ?);",
+                    (key, digest, stored_at if stored_at is not None else now, now),
+                )
+                if previous and previous[0] != digest:
+                    self._drop_if_unreferenced(db, previous[0])
+            over_budget = self._total_bytes(db) > self.max_bytes
+        if over_budget:
+            self.gc(legacy_files=False)
+        return digest
+
+    def _write_blob(self, path: Path, data: bytes) -> int:
+        compressed = gzip.compress(data, compresslevel=self.compresslevel, mtime=0)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic: concurrent writers of the same content both rename a complete file.
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return len(compressed)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """(data, stored_at) of key, or None. Counts as an access for the LRU."""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT digest, stored_at FROM entries WHERE key = ?;", (key,)).fetchone()
+            if row is None:
+                return None
+            with db:
+                db.execute("UPDATE entries SET last_access = ? WHERE key = ?;", (time.time(), key))
+        digest, stored_at = row
+        try:
+            return gzip.decompress(self._blob_path(digest).read_bytes()), stored_at
+        except (OSError, EOFError): # blob deleted or damaged behind our back: forget the entry
+            self.delete(key)
+            return None
+
+    def stored_at(self, key: str) -> Optional[float]:
+        """When key was last written (its age, for TTLs), without reading the blob."""
+        with self._lock:
+            row = self._db().execute("SELECT stored_at FROM entries WHERE key = ?;", (key,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, key: str):
+        with self._lock:
+            db = self._db()
+            with db:
+                row = db.execute("SELECT digest FROM entries WHERE key = ?;", (key,)).fetchone()
+                if row:
+                    db.execute("DELETE FROM entries WHERE key = ?;", (key,))
+                    self._drop_if_unreferenced(db, row[0])
+
+    def _drop_if_unreferenced(self, db: sqlite3.Connection, digest: str) -> int:
+        """Deletes a blob no entry points to anymore. Returns the bytes freed."""
+        if db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1;", (digest,)).fetchone():
+            return 0
+        row = db.execute("SELECT size FROM blobs WHERE digest = ?;", (digest,)).fetchone()
+        db.execute("DELETE FROM blobs WHERE digest = ?;", (digest,))
+        try:
+            self._blob_path(digest).unlink()
+        except FileNotFoundError:
+            pass
+        return row[0] if row else 0
+
+    @staticmethod
+    def _total_bytes(db: sqlite3.Connection) -> int:
+        return db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs;").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            db = self._db()
+            entries = db.execute("SELECT COUNT(*) FROM entries;").fetchone()[0]
+            blobs, size, raw_size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM blobs;").fetchone()
+            oldest_access = db.execute("SELECT MIN(last_access) FROM entries;").fetchone()[0]
+        return {
+            "root": str(self.root),
+            "entries": entries,
+            "blobs": blobs, # < entries: deduplicated content
+            "bytes": size,
+            "raw_bytes": raw_size,
+            "compression_ratio": round(raw_size / size, 2) if size else 0.0,
+            "max_bytes": self.max_bytes,
+            "budget_used_pct": round(100 * size / self.max_bytes, 1) if self.max_bytes else 0.0,
+            "oldest_access_age_seconds": round(time.time() - oldest_access) if oldest_access else None,
+        }
+
+    def gc(self, max_bytes: Optional[int] = None, legacy_files: bool = True) -> Dict[str, Any]:
+        """
+        Evicts the least recently read entries until the blobs fit max_bytes (default: the
+        budget), then deletes blob files the index does not know (crashed writes), and with
+        legacy_files the plain cache files of the layout before the blob store.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        evicted = freed = 0
+        with self._lock:
+            db = self._db()
+            with db:
+                total = self._total_bytes(db)
+                for key, digest in db.execute("SELECT key, digest FROM entries ORDER BY last_access;").fetchall():
+                    if total <= max_bytes:
+                        break
+                    db.execute("DELETE FROM entries WHERE key = ?;", (key,))
+                    released = self._drop_if_unreferenced(db, digest)
+                    total -= released
+                    freed += released
+                    evicted += 1
+                known = {row[0] for row in db.execute("SELECT digest FROM blobs;")}
+        orphans = 0
+        if self.blobs_dir.exists():
+            for path in self.blobs_dir.glob("*/*"):
+                digest = path.name.split(".")[0] if not path.name.startswith(".") else None
+                if digest in known:
+                    continue
+                if path.name.startswith(".") and time.time() - path.stat().st_mtime < 3600:
+                    continue # a write in progress
+                freed += path.stat().st_size
+                path.unlink()
+                orphans += 1
+        legacy, legacy_bytes = self.remove_legacy_files() if legacy_files else (0, 0)
+        return {"evicted_entries": evicted, "orphan_files": orphans, "legacy_files": legacy, "freed_bytes": freed + legacy_bytes, "bytes": total}
+
+    def remove_legacy_files(self) -> Tuple[int, int]:
+        """
+        Deletes the LEGACY_PATTERNS files (and the directories they leave empty): since the
+        blob store they are never read, so they would otherwise stay on disk forever.
+        Returns (files, bytes) removed.
+        """
+        files = size = 0
+        paths = sorted({path for pattern in LEGACY_PATTERNS for path in self.root.glob(pattern)}) # before deleting dirs
+        for path in paths:
+            if path.name in LEGACY_KEEP or not path.is_file():
+                continue
+            size += path.stat().st_size
+            path.unlink()
+            files += 1
+            for parent in path.parents:
+                if parent == self.root or parent.name == "cloud-run":
+                    break
+                try:
+                    parent.rmdir() # only if empty
+                except OSError:
+                    break
+        return files, size
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="crudo10 .cache/ blob store: stats and garbage collection.")
+    parser.add_argument("command", choices=["stats", "gc"])
+    parser.add_argument("--root", default=".cache", help="cache directory (default: .cache)")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024, help="size budget in MB (default: 256)")
+    args = parser.parse_args(argv)
+    cache = BlobCache(Path(args.root), max_bytes=int(args.max_mb * 1024 * 1024))
+    result = cache.stats() if args.command == "stats" else {**cache.gc(), "stats": cache.stats()}
+    print(json.dumps(result, indent=2))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# lib/ricc_blob_cache_test.py
+
+'''
+Test me:  python -m unittest lib.ricc_blob_cache_test   (from crudo10/)
+'''
+
+import gzip
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from .ricc_blob_cache import BlobCache
+
+class TestBlobCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = BlobCache(Path(self.tmp_dir.name))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def blob_files(self):
+        return list((Path(self.tmp_dir.name) / "blobs").glob("*/*.gz"))
+
+    def test_roundtrip_compressed(self):
+        data = b'{"revisions": ["rev-1", "rev-2"]}\n' * 1000
+        self.cache.put("p/svc/versions.json", data, stored_at=1234.0)
+        self.assertEqual(self.cache.get("p/svc/versions.json"), (data, 1234.0))
+        self.assertEqual(self.cache.stored_at("p/svc/versions.json"), 1234.0)
+        self.assertIsNone(self.cache.get("p/other/versions.json"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["entries"], stats["blobs"], stats["raw_bytes"]), (1, 1, len(data)))
+        self.assertGreater(stats["compression_ratio"], 10)
+
+    def test_same_content_stored_once(self):
+        self.cache.put("a", b"same")
+        self.cache.put("b", b"same")
+        self.assertEqual(len(self.blob_files()), 1)
+        self.cache.put("a", b"changed") # the shared blob stays: b still points to it
+        self.assertEqual(len(self.blob_files()), 2)
+        self.cache.delete("b")
+        self.assertEqual(len(self.blob_files()), 1)
+        self.assertEqual(self.cache.get("a")[0], b"changed")
+
+    def test_lru_eviction_over_budget(self):
+        self.cache.max_bytes = 3 * len(gzip.compress(os.urandom(1000)))
+        for key in ["k1", "k2", "k3"]:
+            self.cache.put(key, os.urandom(1000))
+        self.cache.get("k1") # k2 is now the least recently read
+        time.sleep(0.01)
+        self.cache.put("k4", os.urandom(1000))
+        self.assertIsNone(self.cache.get("k2"))
+        self.assertIsNotNone(self.cache.get("k1"))
+        self.assertLessEqual(self.cache.stats()["bytes"], self.cache.max_bytes)
+
+    def test_gc_removes_orphan_files(self):
+        self.cache.put("a", b"kept")
+        orphan = Path(self.tmp_dir.name) / "blobs" / "00" / ("00" * 32 + ".gz")
+        orphan.parent.mkdir(parents=True)
+        orphan.write_bytes(b"junk")
+        result = self.cache.gc()
+        self.assertEqual((result["orphan_files"], result["evicted_entries"]), (1, 0))
+        self.assertFalse(orphan.exists())
+        self.assertEqual(self.cache.get("a")[0], b"kept")
+
+    def test_gc_removes_old_layout_files(self):
+        root = Path(self.tmp_dir.name)
+        old_files = ["p/cloud-run/endpoints.json", "p/cloud-run/svc/versions.json", "p/cloud-run/svc/rev-1/config.yaml", "p/cloud-run/svc/rev-1/20250515_logs.txt"]
+        kept_files = ["p/cloud-run/logs.sqlite", "p/cloud-run/svc/service.yaml"]
+        for name in old_files + kept_files:
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_text("old")
+        self.cache.put("a", b"kept")
+        result = self.cache.gc()
+        self.assertEqual((result["legacy_files"], result["freed_bytes"]), (4, 12))
+        self.assertEqual(sorted(str(p.relative_to(root)) for p in root.glob("p/**/*") if p.is_file()), kept_files)
+        self.assertFalse((root / "p/cloud-run/svc/rev-1").exists()) # left empty: removed too
+        self.assertEqual(self.cache.get("a")[0], b"kept")
+
+
+if __name__ == "__main__":
+    unittest.main()
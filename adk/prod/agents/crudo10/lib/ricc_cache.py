@@ -1 +1,166 @@
-# todo move here cache stuff from Cloud Run lib.
+# lib/ricc_cache.py
+# In-process LRU tier in front of the .cache/ blob store: repeated tool calls in a session do zero I/O.
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+MEMORY_CACHE_MAX_BYTES = 32 * 1024 * 1024 # 32MB
+
+
+def approx_size(value: Any) -> int:
+    """Rough size in bytes of a cached value (its JSON/text length)."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class MemoryCache:
+    """
+    Thread-safe LRU cache, bounded by the (approximate) total size of its values.
+
+    Each entry remembers when its data was fetched (`stored_at`, wall clock, i.e. the
+    same clock as the cache file mtime): the TTL is given at lookup time, so each
+    data type can have its own, and memory and disk tiers expire together.
+
+    Cached values are shared, not copied: treat them as read-only.
+    """
+
+    def __init__(self, max_bytes: int = MEMORY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (value, size, stored_at)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str, ttl_seconds: float) -> Optional[Any]:
+        """Returns the value if present and younger than ttl_seconds, None otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, size, stored_at = entry
+            if time.time() - stored_at >= ttl_seconds:
+                # Expired, but kept (until evicted): still good as a stale value, see get_entry().
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Returns (value, stored_at) whatever its age, or None: for stale-while-revalidate."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[2]
+
+    def put(self, key: str, value: Any, stored_at: Optional[float] = None):
+        """Caches value (fetched at `stored_at`, default now), evicting the least recently used entries."""
+        size = approx_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return # would evict everything else: not worth it
+            self._entries[key] = (value, size, time.time() if stored_at is None else stored_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, key: Optional[str] = None):
+        """Forgets one key, or everything."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._drop(key)
+
+    def _drop(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first one runs, the others
+    wait for it and get the same result (or exception). E.g. five sessions asking
+    for the same project's endpoints at once make ONE API call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._executed = 0
+        self._shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+            else:
+                self._shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self._executed, "shared": self._shared}
+
+
+# The process-wide instances used by ricc_cloud_run.
+MEMORY_CACHE = MemoryCache()
+SINGLE_FLIGHT = SingleFlight()
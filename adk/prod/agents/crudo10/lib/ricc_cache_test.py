@@ -0,0 +1,100 @@
+# lib/ricc_cache_test.py
+
+'''
+Test me:  python -m unittest lib.ricc_cache_test   (from crudo10/)
+'''
+
+import threading
+import time
+import unittest
+from .ricc_cache import MemoryCache, SingleFlight, approx_size
+
+class TestMemoryCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = MemoryCache()
+        self.assertIsNone(cache.get("endpoints", ttl_seconds=60))
+        cache.put("endpoints", [{"name": "svc"}])
+        self.assertEqual(cache.get("endpoints", ttl_seconds=60), [{"name": "svc"}])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_ttl_is_per_lookup(self):
+        cache = MemoryCache()
+        # Fetched 2 minutes ago (e.g. the mtime of the cache file).
+        cache.put("versions", ["rev-1"], stored_at=time.time() - 120)
+        self.assertEqual(cache.get("versions", ttl_seconds=3600), ["rev-1"])
+        self.assertIsNone(cache.get("versions", ttl_seconds=60))
+        # Expired entries are kept, as stale values.
+        value, stored_at = cache.get_entry("versions")
+        self.assertEqual(value, ["rev-1"])
+        self.assertGreaterEqual(time.time() - stored_at, 120)
+        self.assertIsNone(cache.get_entry("unknown"))
+
+    def test_lru_eviction_by_size(self):
+        cache = MemoryCache(max_bytes=25)
+        cache.put("a", "x" * 10)
+        cache.put("b", "y" * 10)
+        cache.get("a", ttl_seconds=60) # 'a' is now the most recently used
+        cache.put("c", "z" * 10)
+        self.assertIsNone(cache.get("b", ttl_seconds=60))
+        self.assertEqual(cache.get("a", ttl_seconds=60), "x" * 10)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertLessEqual(cache.stats()["bytes"], 25)
+        # Bigger than the whole cache: not cached at all.
+        cache.put("huge", "w" * 100)
+        self.assertIsNone(cache.get("huge", ttl_seconds=60))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_invalidate(self):
+        cache = MemoryCache()
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.invalidate("a")
+        self.assertIsNone(cache.get("a", ttl_seconds=60))
+        cache.invalidate()
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_approx_size(self):
+        self.assertEqual(approx_size("abc"), 3)
+        self.assertEqual(approx_size({"a": 1}), len('{"a": 1}'))
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def slow_fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return ["svc"]
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("endpoints", slow_fetch)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flight.do("endpoints", slow_fetch))) for _ in range(4)]
+        for t in followers:
+            t.start()
+        for t in [leader] + followers:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["svc"]] * 5)
+        self.assertEqual(flight.stats(), {"in_flight": 0, "executed": 1, "shared": 4})
+        # Done: the next call runs again.
+        flight.do("endpoints", slow_fetch)
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_are_shared_too(self):
+        flight = SingleFlight()
+        with self.assertRaises(RuntimeError):
+            flight.do("endpoints", lambda: (_ for _ in ()).throw(RuntimeError("API down")))
+        self.assertFalse(flight.in_flight("endpoints"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 from pathlib import Path
 from typing import Optional, Union, List, Dict, Any
 from .ricc_system import * # log_function_called, log_function_call_output
+from .ricc_gcp_clients import get_client
 #from .ricc_funcall_wrapper import ricc_fun_call_wrapper
 # Required imports (ensure these are available in the scope where this function is defined)
 import datetime
@@ -48,8 +49,9 @@ class RiccCloudMonitoring:
         print(f"Default output directory base set to: {self.default_output_dir}")
         print("Initializing Google Cloud clients...")
         try:
-            self.monitoring_client = monitoring_v3.MetricServiceClient()
-            self.run_client = run_v2.ServicesClient()
+            # Shared, long-lived clients (see ricc_gcp_clients.py): cheap to get once created.
+            self.monitoring_client = get_client("monitoring")
+            self.run_client = get_client("run.services")
             print("Google Cloud clients initialized successfully.")
         except Exception as e:
             print(f"🛑 Error initializing Google Cloud clients: {e}")
@@ -3,27 +3,70 @@
 
 import os
 import json
+import tempfile
+import threading
 import time
 import datetime
+import math
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional # , Callable, List,
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
 import logging
 import pytz # Added for timezone handling
 
-from google.cloud import run_v2, logging_v2
+from google.cloud import run_v2
 from google.protobuf.json_format import MessageToDict
 from google.api_core.exceptions import NotFound
 
 from . import ricc_colors as C # Assuming ricc_colors.py is in the same dir
 from .ricc_protobuf_converter import PROTOBUF_CONVERTER
+from .ricc_blob_cache import BlobCache
+from .ricc_cache import MEMORY_CACHE, SINGLE_FLIGHT
+from .ricc_gcp_clients import get_client
+from .ricc_log_store import SEVERITY_LEVELS, LogRow, get_log_store, histogram_bucket, missing_ranges, severity_level, to_utc_iso
+from .ricc_log_stream import DEFAULT_MAX_BYTES, budgeted_log_text
+from .ricc_log_templates import LogTemplateMiner, log_message
 from .ricc_system import log_function_called
 #from lib.ricc_system import function_called, log_function_called
 #from .ricc_funcall_wrapper import ricc_fun_call_wrapper
 
 # --- Configuration ---
 CACHE_DIR = Path(".cache")
+# Cached API results: gzip blobs named by content hash under CACHE_DIR/blobs, indexed by their
+# _get_cache_path() (project/service/revision/data type), LRU-evicted beyond 256MB.
+# `python -m lib.ricc_blob_cache stats|gc` to inspect / clean it (gc also deletes the plain files of
+# the old .cache/<project>/cloud-run/ layout, keeping logs.sqlite and service.yaml).
+BLOB_CACHE = BlobCache(CACHE_DIR)
 CACHE_OBSOLESCENCE_SECONDS = 3600 # 1 hour
+# Per data type TTL (seconds), for both the in-memory and the disk cache. Unlisted types: CACHE_OBSOLESCENCE_SECONDS.
+CACHE_TTL_SECONDS = {
+    "endpoints.json": 3600,
+    "versions.json": 3600,
+    "service.yaml": 3600,
+    "config.yaml": 24 * 3600, # a revision is immutable: its config never changes
+}
+# Stale-while-revalidate: an expired endpoints/revisions/config entry younger than this is returned
+# at once ('success_stale') while a background thread refreshes it. Also the last resort on API errors.
+CACHE_MAX_STALENESS_SECONDS = 24 * 3600 # 1 day
+# Cloud Logging may still ingest entries this old: the tail of a log window is refetched next time.
+LOG_INGESTION_LAG_SECONDS = 120
+# Long log windows are fetched as slices of LOG_SLICE_SECONDS, LOG_FETCH_WORKERS at a time,
+# stopping after LOG_MAX_ENTRIES entries. Page size: LOG_MIN_PAGE_SIZE .. LOG_MAX_PAGE_SIZE (API max).
+LOG_SLICE_SECONDS = 3 * 3600
+LOG_FETCH_WORKERS = 4
+LOG_MAX_ENTRIES = 10000
+LOG_MIN_PAGE_SIZE = 100
+LOG_MAX_PAGE_SIZE = 1000
+# Size budget of the log text handed to the model (head + tail beyond it).
+LOG_OUTPUT_MAX_BYTES = DEFAULT_MAX_BYTES
+# Server-side field projection (x-goog-fieldmask system parameter): entries come back with only
+# what the log store keeps, not their resource, labels, httpRequest, trace, sourceLocation...
+LOG_ENTRY_FIELD_MASK = "entries.timestamp,entries.insert_id,entries.severity,entries.text_payload,entries.json_payload,entries.proto_payload,next_page_token"
+# What the histogram needs from the entries it does not have locally.
+LOG_COUNT_FIELD_MASK = "entries.timestamp,entries.severity,next_page_token"
+LOG_SEVERITY_NAMES = {level: name for name, level in SEVERITY_LEVELS.items()}
+LOG_HISTOGRAM_MAX_BUCKETS = 500
 
 # Configure the logger
 logger = logging.getLogger(__name__)
@@ -39,7 +82,7 @@ def _get_cache_path(
     data_type: str = "json", # or 'yaml', 'txt'
     filename_prefix: str = ""
 ) -> Path:
-    """Constructs the deterministic cache path.
+    """Constructs the deterministic cache path: the key of the entry in BLOB_CACHE.
 
     Includes improved filename logic from v2, especially for logs, incorporating the filename_prefix.
     """
@@ -49,8 +92,6 @@ def _get_cache_path(
         if version_name:
             base_path /= version_name
 
-    base_path.mkdir(parents=True, exist_ok=True) # Ensure directory exists
-
     # --- Modified Cache Filename Logic (from v2) ---
     # Incorporate prefix into the filename logic more directly
     base_filename = filename_prefix if filename_prefix else "data"
@@ -74,55 +115,80 @@ def _get_cache_path(
     return base_path / filename
 
 
+def _serialize_cache(path: Path, data: Any) -> str:
+    """Serializes data for a cache file, according to its suffix (JSON, YAML, or text)."""
+    converted_data = PROTOBUF_CONVERTER.convert(data)
+    if converted_data:
+        print(f"Custom JSON conversion applied for: {type(data).__name__}")
+        data = converted_data
+        if path.suffix == '.yaml':
+            return yaml.dump(data, indent=2, default_flow_style=False, sort_keys=False)
+    if path.suffix == '.json':
+        return json.dumps(data, indent=2, default=str) # Use default=str for complex types
+    elif path.suffix == '.yaml':
+        return yaml.dump(data, default_flow_style=False, sort_keys=False)
+    return str(data)
+
+def _parse_cache(path: Path, text: str) -> Any:
+    """Inverse of _serialize_cache: what _read_cache returns for that file."""
+    if path.suffix == '.json':
+        return json.loads(text)
+    elif path.suffix == '.yaml':
+        return yaml.safe_load(text)
+    return text
+
 def _write_cache(path: Path, data: Any):
-    """Writes data to a cache file (JSON, YAML, or text)."""
+    """Writes data (as JSON, YAML, or text) to the blob cache, and to the in-memory cache."""
     print(f"{C.CACHE_ICON} Writing cache to: {path} for data ({data.__class__.__name__})", flush=True)
     try:
-        with open(path, 'w', encoding='utf-8') as f:
-            converted_data = PROTOBUF_CONVERTER.convert(data)
-            if converted_data:
-                print(f"Custom JSON conversion applied for: {type(data).__name__}")
-                if path.suffix == '.json':
-                    json.dump(converted_data, f, indent=2, default=str)
-                elif path.suffix == '.yaml':
-                    yaml.dump(converted_data, f, indent=2, default_flow_style=False, sort_keys=False)
-            elif path.suffix == '.json':
-                json.dump(data, f, indent=2, default=str) # Use default=str for complex types
-            elif path.suffix == '.yaml':
-                yaml.dump(data, f, default_flow_style=False, sort_keys=False)
-            else:
-                f.write(str(data))
+        text = _serialize_cache(path, data)
+        BLOB_CACHE.put(str(path), text.encode('utf-8'))
+        # Exactly what a later _read_cache() of the entry would return (protobufs as dicts/strings...).
+        MEMORY_CACHE.put(str(path), _parse_cache(path, text))
     except TypeError as e:
         logger.warning(f"{C.WARN_ICON} Unhandled data type for caching: {type(data).__name__}. Please add a converter to ProtobufConverter. Error: {e}")
         raise
     except Exception as e:
         print(f"{C.ERROR_ICON} Error writing cache to {path}: {e}", flush=True)
 
-def _read_cache(path: Path) -> Optional[Any]:
-    """Reads data from a cache file if it exists."""
-    if not path.exists():
+def _write_file(path: Path, text: str):
+    """Writes a plain file (for humans and yq, not read back by the cache)."""
+    path.parent.mkdir(parents=True, exist_ok=True) # Ensure directory exists
+    # Atomic: write a temp file next to it, then rename. Readers see the old or the new file, never half of it.
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _read_cache_entry(path: Path) -> Optional[Tuple[Any, float]]:
+    """(data, stored_at) of a cache entry if it exists."""
+    entry = BLOB_CACHE.get(str(path))
+    if entry is None:
         return None
     print(f"{C.CACHE_ICON} Reading cache from: {path}", flush=True)
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            if path.suffix == '.json':
-                return json.load(f)
-            elif path.suffix == '.yaml':
-                return yaml.safe_load(f)
-            else:
-                return f.read()
+        return _parse_cache(path, entry[0].decode('utf-8')), entry[1]
     except Exception as e:
         print(f"{C.ERROR_ICON} Error reading cache from {path}: {e}", flush=True)
         return None
 
+def _read_cache(path: Path) -> Optional[Any]:
+    """Reads data from a cache entry if it exists."""
+    entry = _read_cache_entry(path)
+    return entry[0] if entry else None
+
 
-def _is_cache_valid(path: Path) -> bool:
-    """Checks if the cache file exists and is not obsolete."""
-    if not path.exists():
-        return False
+def _is_cache_valid(path: Path, max_age_seconds: float = CACHE_OBSOLESCENCE_SECONDS) -> bool:
+    """Checks if the cache entry exists and is not obsolete."""
     try:
-        file_mod_time = path.stat().st_mtime
-        is_valid = (time.time() - file_mod_time) < CACHE_OBSOLESCENCE_SECONDS
+        stored_at = BLOB_CACHE.stored_at(str(path))
+        if stored_at is None:
+            return False
+        is_valid = (time.time() - stored_at) < max_age_seconds
         if not is_valid:
              print(f"{C.WARN_ICON} Cache expired: {path}", flush=True)
         return is_valid
@@ -130,10 +196,87 @@ def _is_cache_valid(path: Path) -> bool:
          print(f"{C.ERROR_ICON} Error checking cache validity for {path}: {e}", flush=True)
          return False
 
+def _cache_ttl(data_type: str) -> float:
+    return CACHE_TTL_SECONDS.get(data_type, CACHE_OBSOLESCENCE_SECONDS)
+
+def _load_cache(path: Path, data_type: str) -> Optional[Any]:
+    """
+    Two tier cache lookup: the in-memory LRU first (no I/O at all), then the blob
+    cache if still fresh (and then kept in memory, with its stored_at as its age).
+    """
+    ttl = _cache_ttl(data_type)
+    cached_data = MEMORY_CACHE.get(str(path), ttl)
+    if cached_data is not None:
+        print(f"{C.CACHE_ICON} Memory cache hit: {path}", flush=True)
+        return cached_data
+    if not _is_cache_valid(path, ttl):
+        return None
+    entry = _read_cache_entry(path)
+    if entry is None or not entry[0]:
+        return None
+    MEMORY_CACHE.put(str(path), entry[0], stored_at=entry[1])
+    return entry[0]
+
+def _load_stale_cache(path: Path) -> Optional[Tuple[Any, float]]:
+    """Last good value of a cache entry whatever its TTL, and its age, if not older than CACHE_MAX_STALENESS_SECONDS."""
+    entry = MEMORY_CACHE.get_entry(str(path))
+    if entry is None:
+        stored_at = BLOB_CACHE.stored_at(str(path))
+        if stored_at is None or time.time() - stored_at > CACHE_MAX_STALENESS_SECONDS:
+            return None
+        entry = _read_cache_entry(path)
+        if entry is None or not entry[0]:
+            return None
+        MEMORY_CACHE.put(str(path), entry[0], stored_at=entry[1])
+    cached_data, stored_at = entry
+    age = time.time() - stored_at
+    if age > CACHE_MAX_STALENESS_SECONDS:
+        return None
+    return cached_data, age
+
+def _fetch_once(path: Path, fetch: Callable[[], Any]) -> Any:
+    """Single-flight: concurrent fetches of the same cache entry share ONE API call and its result."""
+    if SINGLE_FLIGHT.in_flight(str(path)):
+        print(f"{C.CACHE_ICON} Waiting for the in-flight fetch of: {path}", flush=True)
+    return SINGLE_FLIGHT.do(str(path), fetch)
+
+def _revalidate_in_background(path: Path, fetch: Callable[[], Any]):
+    """Runs fetch() (which rewrites the cache entry) on a daemon thread, unless already in flight for this path."""
+    if SINGLE_FLIGHT.in_flight(str(path)):
+        return
+
+    def refresh():
+        try:
+            _fetch_once(path, fetch)
+            print(f"{C.CACHE_ICON} Background refresh done: {path}", flush=True)
+        except Exception as e:
+            print(f"{C.WARN_ICON} Background refresh of {path} failed, keeping the last good value: {e}", flush=True)
+
+    threading.Thread(target=refresh, name=f"revalidate-{path.name}", daemon=True).start()
+
+def _serve_stale(path: Path, fetch: Callable[[], Any]) -> Optional[Tuple[Any, float]]:
+    """Stale-while-revalidate: returns (last good value, age) and refreshes it in the background."""
+    stale = _load_stale_cache(path)
+    if stale is None:
+        return None
+    print(f"{C.CACHE_ICON} Serving stale cache ({stale[1]:.0f}s old) while refreshing: {path}", flush=True)
+    _revalidate_in_background(path, fetch)
+    return stale
+
+def _stale_response(key: str, stale: Tuple[Any, float], error: Optional[Exception] = None) -> Dict[str, Any]:
+    ret = {"status": "success_stale", key: stale[0], "cache_age_seconds": round(stale[1])}
+    if error is not None:
+        ret["message"] = f"API error, returning the last good value: {error}"
+    return ret
+
 def _save_service_to_yaml(service: run_v2.Service, project_id: str, region: str, service_name: str):
-    """Saves a Cloud Run service object to a YAML file in the cache."""
+    """Saves a Cloud Run service object to a YAML file in the cache dir (a plain file: `yq` it)."""
     cache_path = _get_cache_path(project_id, region, service_name, data_type="service.yaml")
-    _write_cache(cache_path, service)
+    try:
+        _write_file(cache_path, _serialize_cache(cache_path, service))
+    except Exception as e:
+        print(f"{C.ERROR_ICON} Error writing {cache_path}: {e}", flush=True)
+        return
     print(f"{C.INFO_ICON} Service '{service_name}' saved to YAML cache: {cache_path}", flush=True)
 
 # --- Cloud Run API Functions ---
@@ -166,55 +309,67 @@ def get_cloud_run_endpoints(project_id: str, region: str, ignore_cache: bool = F
     Returns:
         A dictionary containing a list of services or an error message.
         Each service includes 'name' and 'uri'.
+        Status 'success_stale' (with 'cache_age_seconds'): expired cached data, being refreshed in the background.
     """
     #print(f"{C.CLOUD_ICON} Function called: get_cloud_run_endpoints(project_id={project_id}, region={region}, ignore_cache={ignore_cache})", flush=True)
     log_function_called(f"get_cloud_run_endpoints(project_id={project_id}, region={region}, ignore_cache={ignore_cache})")
 
     cache_path = _get_cache_path(project_id, region, data_type="endpoints.json")
 
-    if not ignore_cache and _is_cache_valid(cache_path):
-        cached_data = _read_cache(cache_path)
+    if not ignore_cache:
+        cached_data = _load_cache(cache_path, "endpoints.json")
         if cached_data:
             print(f"{C.CACHE_ICON} Returning cached endpoint data.", flush=True)
             return {"status": "success_cache", "services": cached_data}
 
+        stale = _serve_stale(cache_path, lambda: _fetch_cloud_run_endpoints(project_id, region, cache_path))
+        if stale:
+            return _stale_response("services", stale)
+
     print(f"{C.INFO_ICON} Cache invalid or ignored. Fetching fresh data from GCP...", flush=True)
     try:
-        client = run_v2.ServicesClient()
-        parent = f"projects/{project_id}/locations/{region}"
-        request = run_v2.ListServicesRequest(parent=parent)
-        services_list = []
-        # gcloud run services list --format json
-        for service in client.list_services(request=request):
-             # Extract only relevant info to keep it clean
-             ### RICC toggle brekpoint
-             #print(f"CR - RICC ALOPrints: service={service}")
-             #
-             short_service_name = service.name.split('/')[-1] # Get the short name
-             service_info = {
-                 "name": short_service_name,
-                 "uri": service.uri,
-                 "last_modifier": service.update_time.rfc3339() if service.update_time else "N/A", # Example field
-                 # Add other useful fields like latest revision, traffic split etc. if needed
-                 # Irrelevant
-                 #"labels": service.labels,
-                 # Too big
-                 "conditions": service.conditions,
-                 "latest_ready_revision": service.latest_ready_revision,
-                 "containers__image": service.template.containers[0].image if service.template.containers else "N/A (no container found)",
-                 "pantheon_url": get_pantheon_url(short_service_name, project_id, region),
-                 "schema_carlessian_version": '1.1', # this is for Ricc to version this schema.
-             }
-             services_list.append(service_info)
-             _save_service_to_yaml(service, project_id, region, service_info["name"])
-
-        _write_cache(cache_path, services_list)
+        services_list = _fetch_once(cache_path, lambda: _fetch_cloud_run_endpoints(project_id, region, cache_path))
         return {"status": "success_api", "services": services_list}
-
     except Exception as e:
         print(f"{C.ERROR_ICON} API Error in get_cloud_run_endpoints: {e}", flush=True)
+        stale = _load_stale_cache(cache_path)
+        if stale:
+            return _stale_response("services", stale, error=e)
         return {"status": "error", "message": f"Failed to list Cloud Run services: {e}"}
 
+def _fetch_cloud_run_endpoints(project_id: str, region: str, cache_path: Path) -> List[Dict[str, Any]]:
+    """Lists the services from the Cloud Run API and rewrites the cache. Raises on API errors."""
+    client = get_client("run.services")
+    parent = f"projects/{project_id}/locations/{region}"
+    request = run_v2.ListServicesRequest(parent=parent)
+    services_list = []
+    # gcloud run services list --format json
+    for service in client.list_services(request=request):
+         # Extract only relevant info to keep it clean
+         ### RICC toggle brekpoint
+         #print(f"CR - RICC ALOPrints: service={service}")
+         #
+         short_service_name = service.name.split('/')[-1] # Get the short name
+         service_info = {
+             "name": short_service_name,
+             "uri": service.uri,
+             "last_modifier": service.update_time.rfc3339() if service.update_time else "N/A", # Example field
+             # Add other useful fields like latest revision, traffic split etc. if needed
+             # Irrelevant
+             #"labels": service.labels,
+             # Too big
+             "conditions": service.conditions,
+             "latest_ready_revision": service.latest_ready_revision,
+             "containers__image": service.template.containers[0].image if service.template.containers else "N/A (no container found)",
+             "pantheon_url": get_pantheon_url(short_service_name, project_id, region),
+             "schema_carlessian_version": '1.1', # this is for Ricc to version this schema.
+         }
+         services_list.append(service_info)
+         _save_service_to_yaml(service, project_id, region, service_info["name"])
+
+    _write_cache(cache_path, services_list)
+    return services_list
+
 
 def get_cloud_run_endpoints_names(project_id: str, region: str, ignore_cache: bool = False): # returns an array -> Dict[str, Any]:
     cloud_run_endpoints_dict = get_cloud_run_endpoints(project_id=project_id, region=region, ignore_cache=ignore_cache)
@@ -238,67 +393,79 @@ def get_cloud_run_revisions(project_id: str, region: str, service_name: str, max
 
     Returns:
         A dictionary containing a list of revision names or an error message.
+        Status 'success_stale' (with 'cache_age_seconds'): expired cached data, being refreshed in the background.
     """
     #print(f"{C.CLOUD_ICON} Function called: get_cloud_run_revisions(project_id={project_id}, region={region}, service_name={service_name}, ignore_cache={ignore_cache})", flush=True)
     log_function_called(f"get_cloud_run_revisions(project_id={project_id}, region={region}, service_name={service_name}, ignore_cache={ignore_cache})")
     cache_path = _get_cache_path(project_id, region, service_name=service_name, data_type="versions.json")
 
-    if not ignore_cache and _is_cache_valid(cache_path):
-        cached_data = _read_cache(cache_path)
+    if not ignore_cache:
+        cached_data = _load_cache(cache_path, "versions.json")
         if cached_data:
              print(f"{C.CACHE_ICON} Returning cached version data.", flush=True)
              return {"status": "success_cache", "revisions": cached_data}
 
+        stale = _serve_stale(cache_path, lambda: _fetch_cloud_run_revisions(project_id, region, service_name, max_results, cache_path))
+        if stale:
+            return _stale_response("revisions", stale)
+
     print(f"{C.INFO_ICON} Cache invalid or ignored. Fetching fresh data from GCP...", flush=True)
     try:
-        client = run_v2.RevisionsClient()
-        #print(f"parent={parent}")
-        parent = f"projects/{project_id}/locations/{region}/services/{service_name}"
-        request = run_v2.ListRevisionsRequest(parent=parent)
-
-        revisions_list = []
-        i = 0
-        for revision in client.list_revisions(request=request):
-             if not revision.containers:
-                 continue
-             i += 1
-             if i > max_results:
-                 break
-             #print(f"- Revision #{i}: {revision.name}")
-             #print(revision.containers[0].ports)
-             revision_info = {
-                 "name": revision.name.split('/')[-1], # Short name
-                 "create_time": revision.create_time.rfc3339() if revision.create_time else "N/A",
-                 "image": revision.containers[0].image if revision.containers else "N/A",
-                 "revision_pantheon_url": "TODO very complex",
-#                 "https://console.cloud.google.com/run/detail/europe-west1/gemini-news-crawler-dev/revisions?invt=AbtyHQ&project=palladius-genai&pageState=(%22cloudRunServiceRevisionsTable%22:(%22f%22:%22%255B%257B_22k_22_3A_22_22_2C_22t_22_3A10_2C_22v_22_3A_22_5C_22gemini-news-crawler-dev-00118-47z_5C_22_22_2C_22s_22_3Atrue%257D%255D%22))"
-
-                 #"containers": revision.containers if revision.containers else "N/A",
-                 #"log_uri2": revision.log_uri if revision.log_uri else "N/A",
-                 #"labels": revision.labels if revision.labels else "N/A",
-
-                 #"memory_limit": revision.containers[0].resources if revision.containers[0].resources else "N/A",
-                 #"memory_limit": revision.containers[0].resources.limits["memory"] if revision.containers[0].resources else "N/A",
-                 #"containers":
-                 # Add scaling info, tags, etc. if desired
-                 "the_whole_proto": MessageToDict(revision._pb),  # Convert the entire protobuf object to a dictionary
-             }
-             revisions_list.append(revision_info)
-
-        #print("fuori dal ciclo for")
-        # Sort by creation time, newest first
-        revisions_list.sort(key=lambda x: x.get("create_time", ""), reverse=True)
-
-        _write_cache(cache_path, revisions_list)
+        revisions_list = _fetch_once(cache_path, lambda: _fetch_cloud_run_revisions(project_id, region, service_name, max_results, cache_path))
         return {"status": "success_api", "revisions": revisions_list}
-
     except NotFound:
          print(f"{C.WARN_ICON} Service not found: {service_name}", flush=True)
          return {"status": "error", "message": f"Cloud Run service '{service_name}' not found in region '{region}'."}
     except Exception as e:
         print(f"{C.ERROR_ICON} API Error in get_cloud_run_revisions: {e}", flush=True)
+        stale = _load_stale_cache(cache_path)
+        if stale:
+            return _stale_response("revisions", stale, error=e)
         return {"status": "error", "message": f"Failed to list revisions for {service_name}: {e}"}
 
+def _fetch_cloud_run_revisions(project_id: str, region: str, service_name: str, max_results: int, cache_path: Path) -> List[Dict[str, Any]]:
+    """Lists the latest revisions from the Cloud Run API and rewrites the cache. Raises on API errors."""
+    client = get_client("run.revisions")
+    #print(f"parent={parent}")
+    parent = f"projects/{project_id}/locations/{region}/services/{service_name}"
+    request = run_v2.ListRevisionsRequest(parent=parent)
+
+    revisions_list = []
+    i = 0
+    for revision in client.list_revisions(request=request):
+         if not revision.containers:
+             continue
+         i += 1
+         if i > max_results:
+             break
+         #print(f"- Revision #{i}: {revision.name}")
+         #print(revision.containers[0].ports)
+         revision_info = {
+             "name": revision.name.split('/')[-1], # Short name
+             "create_time": revision.create_time.rfc3339() if revision.create_time else "N/A",
+             "image": revision.containers[0].image if revision.containers else "N/A",
+             "revision_pantheon_url": "TODO very complex",
+#                 "https://console.cloud.google.com/run/detail/europe-west1/gemini-news-crawler-dev/revisions?invt=AbtyHQ&project=palladius-genai&pageState=(%22cloudRunServiceRevisionsTable%22:(%22f%22:%22%255B%257B_22k_22_3A_22_22_2C_22t_22_3A10_2C_22v_22_3A_22_5C_22gemini-news-crawler-dev-00118-47z_5C_22_22_2C_22s_22_3Atrue%257D%255D%22))"
+
+             #"containers": revision.containers if revision.containers else "N/A",
+             #"log_uri2": revision.log_uri if revision.log_uri else "N/A",
+             #"labels": revision.labels if revision.labels else "N/A",
+
+             #"memory_limit": revision.containers[0].resources if revision.containers[0].resources else "N/A",
+             #"memory_limit": revision.containers[0].resources.limits["memory"] if revision.containers[0].resources else "N/A",
+             #"containers":
+             # Add scaling info, tags, etc. if desired
+             "the_whole_proto": MessageToDict(revision._pb),  # Convert the entire protobuf object to a dictionary
+         }
+         revisions_list.append(revision_info)
+
+    #print("fuori dal ciclo for")
+    # Sort by creation time, newest first
+    revisions_list.sort(key=lambda x: x.get("create_time", ""), reverse=True)
+
+    _write_cache(cache_path, revisions_list)
+    return revisions_list
+
 def get_cloud_run_config(project_id: str, region: str, service_name: str, revision_name: str, ignore_cache: bool = False) -> Dict[str, Any]:
     """
     Retrieves the configuration (as YAML) for a specific Cloud Run revision.
@@ -312,57 +479,69 @@ def get_cloud_run_config(project_id: str, region: str, service_name: str, revisi
 
     Returns:
         A dictionary containing the YAML configuration string or an error message.
+        Status 'success_stale' (with 'cache_age_seconds'): expired cached data, being refreshed in the background.
     """
     #print(f"{C.CLOUD_ICON} Function called: get_cloud_run_config(..., revision_name={revision_name}, ignore_cache={ignore_cache})", flush=True)
     log_function_called(f"get_cloud_run_config(..., revision_name={revision_name}, ignore_cache={ignore_cache})")
     cache_path = _get_cache_path(project_id, region, service_name, revision_name, data_type="config.yaml")
 
-    if not ignore_cache and _is_cache_valid(cache_path):
-        cached_data = _read_cache(cache_path)
+    if not ignore_cache:
+        cached_data = _load_cache(cache_path, "config.yaml")
         if cached_data:
              print(f"{C.CACHE_ICON} Returning cached config data.", flush=True)
              return {"status": "success_cache", "config_yaml": cached_data}
 
+        stale = _serve_stale(cache_path, lambda: _fetch_cloud_run_config(project_id, region, service_name, revision_name, cache_path))
+        if stale:
+            return _stale_response("config_yaml", stale)
+
     print(f"{C.INFO_ICON} Cache invalid or ignored. Fetching fresh config from GCP...", flush=True)
     try:
-        client = run_v2.RevisionsClient()
-        name = f"projects/{project_id}/locations/{region}/services/{service_name}/revisions/{revision_name}"
-        request = run_v2.GetRevisionRequest(name=name)
-        revision = client.get_revision(request=request)
-
-        # Convert the protobuf message to a dictionary, then to YAML
-        # Filter out some potentially noisy fields if needed
-        revision_dict = MessageToDict(revision._pb)
-
-        # Simple example: extract key fields or dump the whole thing
-        config_data = {
-            "revision_name": revision.name.split('/')[-1],
-            "service_name": revision.service.split('/')[-1],
-            "create_time": revision.create_time.rfc3339() if revision.create_time else None,
-            "container": {
-                "image": revision.containers[0].image if revision.containers else None,
-                "resources": MessageToDict(revision.containers[0].resources._pb) if revision.containers else None,
-                "env": [MessageToDict(env._pb) for env in revision.containers[0].env] if revision.containers else None,
-                "ports": [MessageToDict(port._pb) for port in revision.containers[0].ports] if revision.containers else None,
-            },
-            "scaling": MessageToDict(revision.scaling._pb) if revision.scaling else None,
-            "service_account": revision.service_account,
-            "log_uri": revision.log_uri,
-            # Add other fields as needed
-        }
-
-        yaml_output = yaml.dump(config_data, default_flow_style=False, sort_keys=False)
-
-        _write_cache(cache_path, yaml_output)
+        yaml_output = _fetch_once(cache_path, lambda: _fetch_cloud_run_config(project_id, region, service_name, revision_name, cache_path))
         return {"status": "success_api", "config_yaml": yaml_output}
-
     except NotFound:
          print(f"{C.WARN_ICON} Revision not found: {revision_name}", flush=True)
          return {"status": "error", "message": f"Cloud Run revision '{revision_name}' not found for service '{service_name}'."}
     except Exception as e:
         print(f"{C.ERROR_ICON} API Error in get_cloud_run_config: {e}", flush=True)
+        stale = _load_stale_cache(cache_path)
+        if stale:
+            return _stale_response("config_yaml", stale, error=e)
         return {"status": "error", "message": f"Failed to get config for revision {revision_name}: {e}"}
 
+def _fetch_cloud_run_config(project_id: str, region: str, service_name: str, revision_name: str, cache_path: Path) -> str:
+    """Gets a revision from the Cloud Run API as YAML and rewrites the cache. Raises on API errors."""
+    client = get_client("run.revisions")
+    name = f"projects/{project_id}/locations/{region}/services/{service_name}/revisions/{revision_name}"
+    request = run_v2.GetRevisionRequest(name=name)
+    revision = client.get_revision(request=request)
+
+    # Convert the protobuf message to a dictionary, then to YAML
+    # Filter out some potentially noisy fields if needed
+    revision_dict = MessageToDict(revision._pb)
+
+    # Simple example: extract key fields or dump the whole thing
+    config_data = {
+        "revision_name": revision.name.split('/')[-1],
+        "service_name": revision.service.split('/')[-1],
+        "create_time": revision.create_time.rfc3339() if revision.create_time else None,
+        "container": {
+            "image": revision.containers[0].image if revision.containers else None,
+            "resources": MessageToDict(revision.containers[0].resources._pb) if revision.containers else None,
+            "env": [MessageToDict(env._pb) for env in revision.containers[0].env] if revision.containers else None,
+            "ports": [MessageToDict(port._pb) for port in revision.containers[0].ports] if revision.containers else None,
+        },
+        "scaling": MessageToDict(revision.scaling._pb) if revision.scaling else None,
+        "service_account": revision.service_account,
+        "log_uri": revision.log_uri,
+        # Add other fields as needed
+    }
+
+    yaml_output = yaml.dump(config_data, default_flow_style=False, sort_keys=False)
+
+    _write_cache(cache_path, yaml_output)
+    return yaml_output
+
 # --- get_cloud_run_logs (from v1) ---
 # This function primarily fetches logs based on the current date and hours_ago.
 def get_cloud_run_logs(
@@ -372,7 +551,10 @@ def get_cloud_run_logs(
     revision_name: str,
     hours_ago: int = 1,
     day_str: Optional[str] = None, # New optional parameter YYYYMMDD
-    ignore_cache: bool = False
+    ignore_cache: bool = False,
+    max_entries: int = LOG_MAX_ENTRIES,
+    max_output_bytes: int = LOG_OUTPUT_MAX_BYTES,
+    compact: bool = True,
 ) -> Dict[str, Any]:
     """
     Retrieves logs for a specific Cloud Run revision.
@@ -388,12 +570,19 @@ def get_cloud_run_logs(
         hours_ago: How many hours back to fetch logs from the end time (default 1).
         day_str: Optional day (YYYYMMDD format) to set the end time for the log query.
                  If None, defaults to the current day (today).
-        ignore_cache: If True, bypasses the cache.
+        ignore_cache: If True, refetches the whole window (otherwise only what is not in the local store yet).
+        max_entries: Stop fetching from Cloud Logging after this many entries (default 10000).
+        max_output_bytes: Size budget of the returned 'logs' text (default 65536, ~16k tokens). Over it,
+                          only the first and last entries are returned; 'log_summary' still counts them all.
+        compact: If True (default), returns one line per log template ("<count>x [SEVERITY] first .. last: template",
+                 IDs/numbers masked, plus one example) instead of every entry. Use False to see the raw entries.
 
     Returns:
-        A dictionary containing the log entries as a string or an error message.
+        A dictionary containing the log entries as a string (plus 'entries', 'log_summary': counts by
+        severity and what was omitted, 'fetched_entries' and 'fetch_stats': slices, seconds,
+        entries_per_second, truncated) or an error message.
     """
-    log_function_called(f"get_cloud_run_logs(service={service_name}, rev={revision_name}, hours={hours_ago}, day={day_str}, ignore_cache={ignore_cache})")
+    log_function_called(f"get_cloud_run_logs(service={service_name}, rev={revision_name}, hours={hours_ago}, day={day_str}, ignore_cache={ignore_cache}, max_entries={max_entries}, max_output_bytes={max_output_bytes}, compact={compact})")
     #print("💤💤💤 TODO RICCARDO - add permaURL to Logs for this. So I can click while I wait... 💤💤💤")
 
     # --- Determine End Time ---
@@ -418,65 +607,456 @@ def get_cloud_run_logs(
     # --- Calculate Start Time ---
     start_time = end_time - datetime.timedelta(hours=hours_ago)
 
-    # --- Cache Handling ---
-    # Include day_str in the cache filename prefix
-    cache_filename_prefix = f"{day_str}_h{hours_ago}"
-    cache_path = _get_cache_path(
-        project_id, region, service_name, revision_name,
-        data_type="logs.txt",
-        filename_prefix=cache_filename_prefix
+    # --- Incremental sync with the local log store ---
+    # Only the parts of the window never fetched before go to Cloud Logging: asking again
+    # for the last hour ten minutes later fetches ~ten minutes of entries, not the hour.
+    try:
+        ranges, fetch_stats = _sync_log_window(project_id, region, service_name, revision_name, start_time, end_time, now_utc, ignore_cache, max_entries)
+    except Exception as e:
+        print(f"{C.ERROR_ICON} API Error in get_cloud_run_logs: {e}", flush=True)
+        ret = {"status": "error", "message": f"Failed to get logs for revision {revision_name}: {e}"}
+        print(f"get_cloud_run_logs ret = {ret}")
+        return ret
+
+    return _log_window_result(project_id, service_name, revision_name, start_time, end_time, ranges, fetch_stats, max_output_bytes, compact)
+
+def _get_log_store_path(project_id: str) -> Path:
+    return CACHE_DIR / project_id / "cloud-run" / "logs.sqlite"
+
+_log_sync_locks: Dict[str, threading.Lock] = {}
+_log_sync_locks_lock = threading.Lock()
+
+def _log_sync_lock(project_id: str, service_name: str, revision_name: str) -> threading.Lock:
+    """One sync per revision at a time: concurrent callers then only fetch what the first one did not."""
+    key = f"{project_id}/{service_name}/{revision_name}"
+    with _log_sync_locks_lock:
+        return _log_sync_locks.setdefault(key, threading.Lock())
+
+def _time_slices(start_time: datetime.datetime, end_time: datetime.datetime, slice_seconds: float = LOG_SLICE_SECONDS) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """[start_time, end_time] cut into consecutive slices of at most slice_seconds, newest first (fetched first)."""
+    slices = []
+    slice_start = start_time
+    while slice_start < end_time:
+        slice_end = min(slice_start + datetime.timedelta(seconds=slice_seconds), end_time)
+        slices.append((slice_start, slice_end))
+        slice_start = slice_end
+    return list(reversed(slices)) or [(start_time, end_time)]
+
+def _adaptive_page_size(max_entries: int, slices: int) -> int:
+    """Big pages (fewer round trips) when the budget allows them, small ones when few entries are wanted."""
+    return max(LOG_MIN_PAGE_SIZE, min(LOG_MAX_PAGE_SIZE, max_entries // max(slices, 1)))
+
+class _EntryBudget:
+    """Entries a fetch may still bring in, shared by its concurrent slices: when it runs out they all stop."""
+
+    def __init__(self, max_entries: int):
+        self.remaining = max_entries
+        self._lock = threading.Lock()
+
+    def consume(self, entries: int):
+        with self._lock:
+            self.remaining -= entries
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining <= 0
+
+def _sync_log_window(
+    project_id: str,
+    region: str,
+    service_name: str,
+    revision_name: str,
+    start_time: datetime.datetime,
+    end_time: datetime.datetime,
+    now_utc: datetime.datetime,
+    ignore_cache: bool = False,
+    max_entries: int = LOG_MAX_ENTRIES,
+) -> Tuple[List[Tuple[datetime.datetime, datetime.datetime]], Dict[str, Any]]:
+    """
+    Brings the local store up to date for [start_time, end_time] (only the missing ranges,
+    or the whole window with ignore_cache) and returns (fetched ranges, fetch stats).
+    Read the window back with _stream_log_window(). Raises on API errors.
+
+    Each range is cut into LOG_SLICE_SECONDS slices fetched by up to LOG_FETCH_WORKERS threads,
+    all stopping once max_entries have been fetched. Only completely fetched slices are marked
+    as synced: the next call fetches the rest.
+    """
+    store = get_log_store(_get_log_store_path(project_id))
+    budget = _EntryBudget(max_entries)
+    stats = {"slices": 0, "fetched_entries": 0, "truncated": False, "seconds": 0.0, "entries_per_second": 0.0}
+    started = time.perf_counter()
+    with _log_sync_lock(project_id, service_name, revision_name):
+        if ignore_cache:
+            ranges = [(start_time, end_time)]
+        else:
+            ranges = missing_ranges(store.get_coverage(service_name, revision_name), start_time, end_time)
+        if ranges:
+            print(f"{C.INFO_ICON} Fetching {len(ranges)} missing time range(s) from GCP Logging...", flush=True)
+        for range_start, range_end in ranges:
+            slices = _time_slices(range_start, range_end)
+            page_size = _adaptive_page_size(max_entries, len(slices))
+            fetch = lambda time_slice: _fetch_log_slice(store, project_id, region, service_name, revision_name, *time_slice, page_size, budget)
+            if len(slices) == 1:
+                results = [fetch(slices[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(LOG_FETCH_WORKERS, len(slices)), thread_name_prefix="log-slice") as executor:
+                    results = list(executor.map(fetch, slices))
+            fetched = sum(slice_fetched for slice_fetched, _new, _complete in results)
+            new_entries = sum(slice_new for _fetched, slice_new, _complete in results)
+            stats["slices"] += len(slices)
+            stats["fetched_entries"] += fetched
+            print(f"{C.CACHE_ICON} {fetched} entries fetched ({len(slices)} slice(s), page size {page_size}), {new_entries} new, for {range_start.isoformat()} .. {range_end.isoformat()}", flush=True)
+            complete = [time_slice for time_slice, (_fetched, _new, is_complete) in zip(slices, results) if is_complete]
+            if len(complete) < len(slices):
+                stats["truncated"] = True
+                print(f"{C.WARN_ICON} Stopped after {max_entries} entries: {len(slices) - len(complete)} slice(s) only partially fetched.", flush=True)
+            _mark_slices_synced(store, service_name, revision_name, complete, len(complete) == len(slices), now_utc)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    if stats["fetched_entries"] and stats["seconds"]:
+        stats["entries_per_second"] = round(stats["fetched_entries"] / stats["seconds"], 1)
+        print(f"{C.INFO_ICON} Fetched {stats['fetched_entries']} entries in {stats['seconds']}s ({stats['entries_per_second']} entries/s)", flush=True)
+    return ranges, stats
+
+def _mark_slices_synced(store, service_name: str, revision_name: str, complete: List[Tuple[datetime.datetime, datetime.datetime]], whole_range: bool, now_utc: datetime.datetime):
+    """
+    Marks the completely fetched slices as synced. The synced range of a revision is a single
+    interval: after a truncated fetch only slices touching it (newest first) are added.
+    """
+    # Entries of the last LOG_INGESTION_LAG_SECONDS may still show up: don't mark them as synced.
+    lag_limit = now_utc - datetime.timedelta(seconds=LOG_INGESTION_LAG_SECONDS)
+    if whole_range:
+        complete = [(min(complete)[0], max(complete)[1])]
+    pending = sorted(complete, reverse=True)
+    while pending:
+        covered = store.get_coverage(service_name, revision_name)
+        touching = [s for s in pending if covered is None or whole_range or not (s[1] < covered[0] or s[0] > covered[1])]
+        if not touching:
+            break
+        slice_start, slice_end = touching[0]
+        pending.remove(touching[0])
+        synced_until = min(slice_end, lag_limit)
+        if synced_until > slice_start:
+            store.mark_synced(service_name, revision_name, slice_start, synced_until)
+
+def _fetch_log_slice(
+    store,
+    project_id: str,
+    region: str,
+    service_name: str,
+    revision_name: str,
+    start_time: datetime.datetime,
+    end_time: datetime.datetime,
+    page_size: int,
+    budget: _EntryBudget,
+) -> Tuple[int, int, bool]:
+    """
+    Stores the entries of one slice page by page, as they arrive. Returns (fetched, new, complete):
+    complete is False when the budget ran out before the last page. Raises on API errors.
+    """
+    fetched = new_entries = 0
+    if budget.exhausted:
+        return fetched, new_entries, False
+    for rows, more_pages in _iter_log_pages(project_id, region, service_name, revision_name, start_time, end_time, page_size):
+        new_entries += store.add_entries(service_name, revision_name, rows)
+        fetched += len(rows)
+        budget.consume(len(rows))
+        if more_pages and budget.exhausted:
+            return fetched, new_entries, False # closes the generator: no more pages requested
+    return fetched, new_entries, True
+
+def _log_filter(
+    project_id: str,
+    region: str,
+    service_name: str,
+    revision_name: str,
+    start_time: datetime.datetime,
+    end_time: datetime.datetime,
+    min_severity: str = "WARNING",
+) -> str:
+    # Construct the filter using calculated start and end times
+    return (
+        f'resource.type="cloud_run_revision" '
+        f'resource.labels.project_id="{project_id}" '
+        f'resource.labels.location="{region}" '
+        f'resource.labels.service_name="{service_name}" '
+        f'resource.labels.revision_name="{revision_name}" '
+        f'timestamp >= "{start_time.isoformat()}" '
+        f'timestamp <= "{end_time.isoformat()}" ' # Add end timestamp constraint
+        f'severity>={min_severity.upper()}'
     )
 
-    if not ignore_cache and _is_cache_valid(cache_path):
-        cached_data = _read_cache(cache_path)
-        if cached_data:
-            print(f"{C.CACHE_ICON} Returning cached log data from {cache_path}.", flush=True)
-            return {"status": "success_cache", "logs": cached_data}
+def _iter_log_pages(
+    project_id: str,
+    region: str,
+    service_name: str,
+    revision_name: str,
+    start_time: datetime.datetime,
+    end_time: datetime.datetime,
+    page_size: int = LOG_MIN_PAGE_SIZE,
+    min_severity: str = "WARNING",
+    field_mask: str = LOG_ENTRY_FIELD_MASK,
+) -> Iterator[Tuple[List[LogRow], bool]]:
+    """
+    Yields the entries (WARNING+ by default) of a revision in [start_time, end_time] from Cloud Logging,
+    one page at a time as it arrives: (rows, more_pages). The next page is only requested when asked for.
+    Only the fields in field_mask come back from the API (fields outside it are None in the rows).
+    Raises on API errors.
+    """
+    client = get_client("logging.entries")
+    log_filter = _log_filter(project_id, region, service_name, revision_name, start_time, end_time, min_severity)
+    print(f"{C.INFO_ICON} Using log filter: {log_filter}", flush=True)
+    print(f"🌎 Pantheon URL : https://pantheon.corp.google.com/logs/query;query={log_filter}&project={project_id}")
+
+    request = {
+        "resource_names": [f"projects/{project_id}"],
+        "filter": log_filter,
+        "order_by": "timestamp desc", # Get latest first
+        "page_size": page_size,
+    }
+    pager = client.list_log_entries(request=request, metadata=[("x-goog-fieldmask", field_mask)])
+    for page in pager.pages:
+        yield [_log_entry_row(entry) for entry in page.entries], bool(page.next_page_token)
+
+def _log_entry_row(entry) -> LogRow:
+    """A (projected) LogEntry as a store row: payload is JSON for json/proto payloads, the text otherwise."""
+    pb = type(entry).pb(entry) # proto-plus wrapper -> protobuf message
+    payload = None
+    kind = pb.WhichOneof("payload")
+    if kind == "text_payload":
+        payload = pb.text_payload
+    elif kind == "json_payload":
+        payload = json.dumps(MessageToDict(pb.json_payload))
+    elif kind == "proto_payload":
+        try:
+            payload = json.dumps(MessageToDict(pb.proto_payload))
+        except Exception: # payload type not in the descriptor pool
+            payload = json.dumps({"@type": pb.proto_payload.type_url})
+    timestamp = pb.timestamp.ToDatetime(tzinfo=datetime.timezone.utc)
+    return to_utc_iso(timestamp), pb.insert_id, LOG_SEVERITY_NAMES.get(pb.severity, "DEFAULT"), payload
+
+def _format_log_row(row: LogRow) -> str:
+    timestamp, _insert_id, severity, payload = row
+    return f"{timestamp} [{severity}] {payload or ''}"
+
+def _stream_log_window(project_id: str, service_name: str, revision_name: str, start_time: datetime.datetime, end_time: datetime.datetime) -> Iterator[Tuple[Optional[str], str]]:
+    """(severity, formatted line) of the stored entries of the window, oldest first, read from the store in batches."""
+    store = get_log_store(_get_log_store_path(project_id))
+    for row in store.iter_entries(service_name, revision_name, start_time, end_time):
+        yield row[2], _format_log_row(row)
+
+def _log_window_result(
+    project_id: str,
+    service_name: str,
+    revision_name: str,
+    start_time: datetime.datetime,
+    end_time: datetime.datetime,
+    ranges: List[Tuple[datetime.datetime, datetime.datetime]],
+    fetch_stats: Dict[str, Any],
+    max_output_bytes: int,
+    compact: bool = True,
+) -> Dict[str, Any]:
+    """
+    The tool result of a synced log window: the text within max_output_bytes (head + tail beyond), plus counts.
+    compact: one line per log template (count, first/last seen, exemplar) instead of one per entry.
+    """
+    if compact:
+        store = get_log_store(_get_log_store_path(project_id))
+        miner = LogTemplateMiner().add_all(
+            (timestamp, severity, log_message(payload))
+            for timestamp, _insert_id, severity, payload in store.iter_entries(service_name, revision_name, start_time, end_time)
+        )
+        log_output, text_summary = budgeted_log_text(miner.render_lines(), max_output_bytes)
+        summary = {
+            **miner.stats(),
+            "bytes": text_summary["bytes"],
+            "approx_tokens": text_summary["approx_tokens"],
+            "returned_templates": text_summary["returned_entries"],
+            "omitted_templates": text_summary["omitted_entries"],
+            "truncated": text_summary["truncated"],
+        }
+        print(f"{C.INFO_ICON} {miner.entries} log entries compacted into {summary['templates']} templates ({text_summary['bytes']} bytes).", flush=True)
+    else:
+        log_output, summary = budgeted_log_text(_stream_log_window(project_id, service_name, revision_name, start_time, end_time), max_output_bytes)
+    if not summary["entries"]:
+        log_output = f"--- No logs found for {revision_name} between {start_time.isoformat()} and {end_time.isoformat()} ---"
+    elif summary["truncated"]:
+        print(f"{C.WARN_ICON} {summary['entries']} log entries ({summary['bytes']} bytes) over the {max_output_bytes} bytes budget: returning head and tail.", flush=True)
+    if not ranges:
+        print(f"{C.CACHE_ICON} Returning {summary['entries']} log entries from the local store.", flush=True)
+    return {
+        "status": "success_api" if ranges else "success_cache",
+        "logs": log_output,
+        "entries": summary["entries"],
+        "log_summary": summary,
+        "fetched_entries": fetch_stats["fetched_entries"],
+        "fetch_stats": fetch_stats,
+    }
+
+def query_cloud_run_logs(
+    project_id: str,
+    service_name: Optional[str] = None,
+    revision_name: Optional[str] = None,
+    hours_ago: float = 24,
+    end_time: Optional[str] = None,
+    min_severity: str = "WARNING",
+    text: Optional[str] = None,
+    max_results: int = 50,
+) -> Dict[str, Any]:
+    """
+    Searches the log entries already in the local store (filled by get_cloud_run_logs and
+    get_cloud_run_logs_for_date), without calling Cloud Logging. Only WARNING and above are stored.
 
-    print(f"{C.INFO_ICON} Cache invalid or ignored ({cache_path}). Fetching fresh logs from GCP Logging...", flush=True)
+    Args:
+        project_id: The Google Cloud Project ID.
+        service_name: Optional Cloud Run service name (all services if omitted).
+        revision_name: Optional Cloud Run revision name (all revisions if omitted).
+        hours_ago: How many hours back from end_time to search (default 24).
+        end_time: Optional end of the time range, ISO 8601 (e.g. "2025-05-15T10:00:00Z"). Defaults to now.
+        min_severity: Minimum severity, e.g. "WARNING", "ERROR", "CRITICAL" (default "WARNING").
+        text: Optional case-insensitive text the log payload must contain (e.g. "timeout").
+        max_results: Maximum number of entries returned, newest first (default 50).
+
+    Returns:
+        A dictionary with the matching entries (newest first) and their count, or an error message.
+    """
+    log_function_called(f"query_cloud_run_logs(service={service_name}, rev={revision_name}, hours={hours_ago}, end={end_time}, min_severity={min_severity}, text={text})")
+    if min_severity and min_severity.upper() not in SEVERITY_LEVELS:
+        return {"status": "error", "message": f"Unknown severity '{min_severity}', use one of {list(SEVERITY_LEVELS)}"}
     try:
-        client = logging_v2.Client(project=project_id)
-        # Construct the filter using calculated start and end times
-        log_filter = (
-            f'resource.type="cloud_run_revision" '
-            f'resource.labels.project_id="{project_id}" '
-            f'resource.labels.location="{region}" '
-            f'resource.labels.service_name="{service_name}" '
-            f'resource.labels.revision_name="{revision_name}" '
-            f'timestamp >= "{start_time.isoformat()}" '
-            f'timestamp <= "{end_time.isoformat()}" ' # Add end timestamp constraint
-            #f'severity>=ERROR'
-            f'severity>=WARNING'
+        end = _parse_end_time(end_time)
+    except ValueError:
+        return {"status": "error", "message": f"Invalid end_time format: '{end_time}'. Use ISO 8601, e.g. 2025-05-15T10:00:00Z."}
+    start = end - datetime.timedelta(hours=hours_ago)
+
+    store = get_log_store(_get_log_store_path(project_id))
+    entries = store.query(service_name, revision_name, start, end, min_severity, text, max_results)
+    print(f"{C.CACHE_ICON} {len(entries)} log entries found in the local store ({store.path}).", flush=True)
+    ret = {"status": "success_cache", "entries": entries, "count": len(entries)}
+    if not entries:
+        ret["message"] = (
+            f"No matching entries between {start.isoformat()} and {end.isoformat()} in the local store: "
+            "fetch them first with get_cloud_run_logs."
         )
-        print(f"{C.INFO_ICON} Using log filter: {log_filter}", flush=True)
-        print(f"🌎 Pantheon URL : https://pantheon.corp.google.com/logs/query;query={log_filter}&project={project_id}")
-        # https://pantheon.corp.google.com/logs/query;query=resource.type%20%3D%20%22cloud_run_revision%22%0Aresource.labels.service_name%20%3D%20%22gemini-news-crawler-prod%22%0Aresource.labels.location%20%3D%20%22europe-west1%22%0A%20severity%3E%3DDEFAULT;storageScope=project;cursorTimestamp=2025-04-22T09:23:32.264589Z;duration=P1D?e=TroubleshootingUiAdminLaunch::TroubleshootingUiAdminControl&invt=AbtwIg&project=palladius-genai&mods=logs_tg_staging
-
-        log_entries = []
-        # Be mindful of page size and potential large log volumes
-        for entry in client.list_entries(filter_=log_filter, order_by=logging_v2.DESCENDING, page_size=100): # Get latest first
-            log_line = f"{entry.timestamp.isoformat()} [{entry.severity}] "
-            if entry.payload is not None:
-                 if isinstance(entry.payload, dict):
-                      log_line += json.dumps(entry.payload)
-                 else:
-                      log_line += str(entry.payload)
-            log_entries.append(log_line)
-
-        # Reverse to show oldest first in the final output string
-        log_output = "\n".join(reversed(log_entries))
-
-        if not log_output:
-            log_output = f"--- No logs found for {revision_name} between {start_time.isoformat()} and {end_time.isoformat()} ---"
-
-        _write_cache(cache_path, log_output)
-        return {"status": "success_api", "logs": log_output}
+    return ret
+
+def get_cloud_run_logs_histogram(
+    project_id: str,
+    region: str,
+    service_name: str,
+    revision_name: str,
+    hours_ago: float = 24,
+    bucket_minutes: int = 60,
+    end_time: Optional[str] = None,
+    min_severity: str = "WARNING",
+    max_entries: int = LOG_MAX_ENTRIES,
+) -> Dict[str, Any]:
+    """
+    Counts the log entries of a Cloud Run revision per severity per time bucket, without retrieving
+    the entries themselves. Use it to find when errors happened before pulling logs with get_cloud_run_logs.
+
+    Args:
+        project_id: The Google Cloud Project ID.
+        region: The Google Cloud Region.
+        service_name: The name of the Cloud Run service.
+        revision_name: The name of the Cloud Run revision.
+        hours_ago: How many hours back from end_time to count (default 24).
+        bucket_minutes: Width of each time bucket in minutes (default 60).
+        end_time: Optional end of the time range, ISO 8601 (e.g. "2025-05-15T10:00:00Z"). Defaults to now.
+        min_severity: Minimum severity counted, e.g. "INFO", "WARNING", "ERROR" (default "WARNING").
+        max_entries: Max entries streamed from Cloud Logging (default 10000), newest first. Beyond it
+            'truncated' is true and the buckets before 'truncated_before' are incomplete.
 
+    Returns:
+        A dictionary with the non-empty buckets ('start', 'counts' per severity, 'total'), the totals
+        per severity, and where the counts came from, or an error message.
+    """
+    log_function_called(f"get_cloud_run_logs_histogram(service={service_name}, rev={revision_name}, hours={hours_ago}, bucket_minutes={bucket_minutes}, end={end_time}, min_severity={min_severity}, max_entries={max_entries})")
+    if min_severity.upper() not in SEVERITY_LEVELS:
+        return {"status": "error", "message": f"Unknown severity '{min_severity}', use one of {list(SEVERITY_LEVELS)}"}
+    try:
+        end = _parse_end_time(end_time)
+    except ValueError:
+        return {"status": "error", "message": f"Invalid end_time format: '{end_time}'. Use ISO 8601, e.g. 2025-05-15T10:00:00Z."}
+    # Whole seconds: buckets are counted in whole seconds, by SQLite and by histogram_bucket() alike.
+    start = (end - datetime.timedelta(hours=hours_ago)).replace(microsecond=0)
+    bucket_seconds = int(bucket_minutes * 60)
+    if bucket_seconds <= 0:
+        return {"status": "error", "message": "bucket_minutes must be positive."}
+    buckets = int(math.ceil((end - start).total_seconds() / bucket_seconds))
+    if buckets > LOG_HISTOGRAM_MAX_BUCKETS:
+        return {"status": "error", "message": f"{buckets} buckets requested, the maximum is {LOG_HISTOGRAM_MAX_BUCKETS}: use bigger buckets."}
+
+    counts: Dict[int, Dict[str, int]] = {}
+    def count(bucket: int, severity: str, n: int = 1):
+        bucket_counts = counts.setdefault(min(bucket, buckets - 1), {})
+        bucket_counts[severity] = bucket_counts.get(severity, 0) + n
+
+    # The log store already has the WARNING+ entries of its synced range: SQLite counts those.
+    # Only the rest of the window is asked to Cloud Logging, with just timestamp and severity per entry.
+    store = get_log_store(_get_log_store_path(project_id))
+    store_entries = streamed_entries = 0
+    ranges = [(start, end)]
+    counted_in_store = ("", "") # (from, until) as stored timestamps: the edges of the fetched ranges are not counted twice
+    if severity_level(min_severity) >= SEVERITY_LEVELS["WARNING"]:
+        covered = store.get_coverage(service_name, revision_name)
+        ranges = missing_ranges(covered, start, end)
+        if ranges != [(start, end)]:
+            store_from, store_until = max(start, covered[0]), min(end, covered[1])
+            counted_in_store = (to_utc_iso(store_from), to_utc_iso(store_until))
+            for bucket, severity, n in store.histogram(service_name, revision_name, store_from, store_until, start, bucket_seconds, min_severity):
+                count(bucket, severity, n)
+                store_entries += n
+    # Newest first (pages come 'timestamp desc'): if max_entries stops us, the recent buckets are complete.
+    truncated_before = None
+    try:
+        for range_start, range_end in reversed(ranges):
+            for rows, _more_pages in _iter_log_pages(project_id, region, service_name, revision_name, range_start, range_end, LOG_MAX_PAGE_SIZE, min_severity, LOG_COUNT_FIELD_MASK):
+                for timestamp, _insert_id, severity, _payload in rows:
+                    if counted_in_store[0] <= timestamp <= counted_in_store[1]:
+                        continue
+                    if streamed_entries >= max_entries:
+                        truncated_before = timestamp
+                        break
+                    count(histogram_bucket(timestamp, start, bucket_seconds), severity)
+                    streamed_entries += 1
+                if truncated_before:
+                    break
+            if truncated_before:
+                break
     except Exception as e:
-        print(f"{C.ERROR_ICON} API Error in get_cloud_run_logs: {e}", flush=True)
-        ret = {"status": "error", "message": f"Failed to get logs for revision {revision_name}: {e}"}
-        print(f"get_cloud_run_logs ret = {ret}")
-        return ret
+        print(f"{C.ERROR_ICON} API Error in get_cloud_run_logs_histogram: {e}", flush=True)
+        return {"status": "error", "message": f"Failed to count logs for revision {revision_name}: {e}"}
+
+    totals: Dict[str, int] = {}
+    for bucket_counts in counts.values():
+        for severity, n in bucket_counts.items():
+            totals[severity] = totals.get(severity, 0) + n
+    print(f"{C.INFO_ICON} Histogram of {store_entries + streamed_entries} entries: {store_entries} counted in the local store, {streamed_entries} streamed.", flush=True)
+    if truncated_before:
+        print(f"{C.WARN_ICON} Stopped streaming after {max_entries} entries: buckets before {truncated_before} are incomplete.", flush=True)
+    return {
+        "status": "success_api" if ranges else "success_cache",
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "bucket_minutes": bucket_minutes,
+        "buckets": [
+            {"start": (start + datetime.timedelta(seconds=bucket * bucket_seconds)).isoformat(), "counts": counts[bucket], "total": sum(counts[bucket].values())}
+            for bucket in sorted(counts)
+        ],
+        "empty_buckets": buckets - len(counts),
+        "totals": totals,
+        "store_entries": store_entries,
+        "streamed_entries": streamed_entries,
+        "truncated": truncated_before is not None,
+        "truncated_before": truncated_before,
+    }
+
+def _parse_end_time(end_time: Optional[str]) -> datetime.datetime:
+    """ISO 8601 ('Z' accepted, naive means UTC) -> aware datetime. None -> now. Raises ValueError."""
+    if not end_time:
+        return datetime.datetime.now(pytz.utc)
+    end = datetime.datetime.fromisoformat(end_time.replace("Z", "+00:00"))
+    return end if end.tzinfo else end.replace(tzinfo=datetime.timezone.utc)
 # --- End get_cloud_run_logs ---
 
 
@@ -500,7 +1080,7 @@ def update_cloud_run_memory(project_id: str, region: str, service_name: str, mem
     #print(f"{C.WARN_ICON} This is a potentially modifying operation!", flush=True)
 
     try:
-        client = run_v2.ServicesClient()
+        client = get_client("run.services")
         service_path = f"projects/{project_id}/locations/{region}/services/{service_name}"
 
         # Get the current service to modify it
@@ -571,10 +1151,12 @@ def get_cloud_run_logs_for_date(
     timezone: Optional[str] = "UTC",
     time_delta_hours: float = 1.0,
     ignore_cache: bool = False,
+    max_entries: int = LOG_MAX_ENTRIES,
+    max_output_bytes: int = LOG_OUTPUT_MAX_BYTES,
+    compact: bool = True,
 ) -> Dict[str, Any]:
     """
     Retrieves logs for a specific Cloud Run revision within a specified date and time range.
-"""
 
     Args:
         project_id: The Google Cloud Project ID.
@@ -585,36 +1167,20 @@ def get_cloud_run_logs_for_date(
         end_timestamp_time: The end time for the log retrieval (HH:MM:SS). Optional, defaults to 23:59:59.
         timezone: The timezone for the end timestamp (e.g., "UTC", "Europe/Rome"). Optional, defaults to UTC.
         time_delta_hours: The time delta in hours (float) to go back from the end timestamp.
-        ignore_cache: If True, bypasses the cache.
+        ignore_cache: If True, refetches the whole window (otherwise only what is not in the local store yet).
+        max_entries: Stop fetching from Cloud Logging after this many entries (default 10000).
+        max_output_bytes: Size budget of the returned 'logs' text (default 65536, ~16k tokens). Over it,
+                          only the first and last entries are returned; 'log_summary' still counts them all.
+        compact: If True (default), returns one line per log template ("<count>x [SEVERITY] first .. last: template",
+                 IDs/numbers masked, plus one example) instead of every entry. Use False to see the raw entries.
 
     Returns:
-        A dictionary containing the log entries as a string or an error message.
+        A dictionary containing the log entries as a string (plus 'entries', 'log_summary': counts by
+        severity and what was omitted, 'fetched_entries' and 'fetch_stats': slices, seconds,
+        entries_per_second, truncated) or an error message.
     """
     log_function_called(
-        f"get_cloud_run_logs_for_date(service_name={service_name}, revision_name={revision_name}, end_timestamp_date={end_timestamp_date}, end_timestamp_time={end_timestamp_time}, timezone={timezone}, time_delta_hours={time_delta_hours}, ignore_cache={ignore_cache})"
-    )
-
-    # Cache filename doesn't include time parameters to keep it simple, just caches the *last fetch*
-    # Use a more specific prefix for the cache file
-    cache_filename_prefix = f"{end_timestamp_date}_h{time_delta_hours}"
-    cache_path = _get_cache_path(
-        project_id, region, service_name, revision_name,
-        data_type="logs.txt", # Keep data_type simple
-        filename_prefix=cache_filename_prefix # Use prefix for specificity
-    )
-
-
-    # Cache validity check considers the *last fetch* time, not the log timestamps themselves
-    if not ignore_cache and _is_cache_valid(cache_path):
-        cached_data = _read_cache(cache_path)
-        if cached_data:
-            print(f"{C.CACHE_ICON} Returning cached log data from {cache_path}.", flush=True)
-            # Note: Cached logs might be older than the requested time range if cache is hit
-            return {"status": "success_cache", "logs": cached_data}
-
-    print(
-        f"{C.INFO_ICON} Cache invalid or ignored ({cache_path}). Fetching fresh logs from GCP Logging...",
-        flush=True,
+        f"get_cloud_run_logs_for_date(service_name={service_name}, revision_name={revision_name}, end_timestamp_date={end_timestamp_date}, end_timestamp_time={end_timestamp_time}, timezone={timezone}, time_delta_hours={time_delta_hours}, ignore_cache={ignore_cache}, max_entries={max_entries}, max_output_bytes={max_output_bytes}, compact={compact})"
     )
 
     try:
@@ -665,41 +1231,12 @@ def get_cloud_run_logs_for_date(
             hours=time_delta_hours
         )
 
-        # --- Construct the log filter ---
-        client = logging_v2.Client(project=project_id)
-        log_filter = (
-            f'resource.type="cloud_run_revision" '
-            f'resource.labels.project_id="{project_id}" '
-            f'resource.labels.location="{region}" '
-            f'resource.labels.service_name="{service_name}" '
-            f'resource.labels.revision_name="{revision_name}" '
-            f'timestamp >= "{start_timestamp.isoformat()}" '
-            f'timestamp <= "{end_timestamp.isoformat()}" '
-            f"severity>=WARNING"
+        # --- Sync the window into the local log store (only what was never fetched) ---
+        ranges, fetch_stats = _sync_log_window(
+            project_id, region, service_name, revision_name,
+            start_timestamp, end_timestamp, datetime.datetime.now(pytz.utc), ignore_cache, max_entries,
         )
-        print(f"{C.INFO_ICON} Using log filter: {log_filter}", flush=True)
-
-        log_entries = []
-        # Be mindful of page size and potential large log volumes
-        for entry in client.list_entries(
-            filter_=log_filter, order_by=logging_v2.DESCENDING, page_size=100
-        ):  # Get latest first
-            log_line = f"{entry.timestamp.isoformat()} [{entry.severity}] "
-            if entry.payload is not None:
-                if isinstance(entry.payload, dict):
-                    log_line += json.dumps(entry.payload)
-                else:
-                    log_line += str(entry.payload)
-            log_entries.append(log_line)
-
-        # Reverse to show oldest first in the final output string
-        log_output = "\n".join(reversed(log_entries))
-
-        if not log_output:
-            log_output = f"--- No logs found for {revision_name} between {start_timestamp.isoformat()} and {end_timestamp.isoformat()} ---"
-
-        _write_cache(cache_path, log_output)
-        return {"status": "success_api", "logs": log_output}
+        return _log_window_result(project_id, service_name, revision_name, start_timestamp, end_timestamp, ranges, fetch_stats, max_output_bytes, compact)
 
     except Exception as e:
         print(f"{C.ERROR_ICON} API Error in get_cloud_run_logs_for_date: {e}", flush=True)
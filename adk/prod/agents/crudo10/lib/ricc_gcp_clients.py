@@ -0,0 +1,132 @@
+# lib/ricc_gcp_clients.py
+# Long-lived GCP API clients: one per (API, project), created lazily and shared by every call and thread.
+
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import ricc_colors as C
+
+logger = logging.getLogger(__name__)
+
+
+def _run_services_client(project_id: Optional[str]):
+    from google.cloud import run_v2
+    return run_v2.ServicesClient()
+
+def _run_revisions_client(project_id: Optional[str]):
+    from google.cloud import run_v2
+    return run_v2.RevisionsClient()
+
+def _logging_client(project_id: Optional[str]):
+    from google.cloud import logging_v2
+    return logging_v2.Client(project=project_id)
+
+def _logging_entries_client(project_id: Optional[str]):
+    # The GAPIC client under logging_v2.Client: entries.list with per-call metadata (x-goog-fieldmask).
+    from google.cloud.logging_v2.services.logging_service_v2 import LoggingServiceV2Client
+    return LoggingServiceV2Client()
+
+def _monitoring_client(project_id: Optional[str]):
+    from google.cloud import monitoring_v3
+    return monitoring_v3.MetricServiceClient()
+
+# API name -> factory(project_id). Cloud Run, Monitoring and logging.entries clients are not bound
+# to a project (it is part of each request): use them with project_id=None, one client for all.
+CLIENT_FACTORIES: Dict[str, Callable[[Optional[str]], Any]] = {
+    "run.services": _run_services_client,
+    "run.revisions": _run_revisions_client,
+    "logging": _logging_client,
+    "logging.entries": _logging_entries_client,
+    "monitoring": _monitoring_client,
+}
+
+
+class GcpClientRegistry:
+    """
+    Creates each client once (credential discovery, gRPC channel, TLS handshake...)
+    and hands out the same instance afterwards. GCP clients are thread-safe, so
+    concurrent ADK sessions share the channel.
+
+    Every call records its setup time: the full construction on the first call,
+    ~0 afterwards (threads that waited for a creation in progress are counted apart). See stats().
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[Optional[str]], Any]] = CLIENT_FACTORIES):
+        self.factories = factories
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, Optional[str]], Any] = {}
+        # One lock per key: two threads never build the same client twice, other clients don't wait.
+        self._key_locks: Dict[Tuple[str, Optional[str]], threading.Lock] = {}
+        self._stats: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+
+    def get(self, api: str, project_id: Optional[str] = None) -> Any:
+        """Returns THE client of `api` for `project_id`, creating it on first use."""
+        if api not in self.factories:
+            raise ValueError(f"Unknown GCP API '{api}', use one of {list(self.factories)}")
+        key = (api, project_id)
+        started = time.perf_counter()
+        with self._lock:
+            client = self._clients.get(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        outcome = "reused"
+        if client is None:
+            with key_lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self.factories[api](project_id)
+                    outcome = "created"
+                    with self._lock:
+                        self._clients[key] = client
+                else:
+                    outcome = "waited" # another thread was building it: not a reuse cost
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self._stats.setdefault(key, {"calls": 0, "creation_ms": 0.0, "reuses": 0, "reuse_setup_ms": 0.0, "waits": 0, "wait_ms": 0.0})
+            stats["calls"] += 1
+            if outcome == "created":
+                stats["creation_ms"] = round(elapsed_ms, 3)
+            elif outcome == "waited":
+                stats["waits"] += 1
+                stats["wait_ms"] = round(stats["wait_ms"] + elapsed_ms, 3)
+            else:
+                stats["reuses"] += 1
+                stats["reuse_setup_ms"] = round(stats["reuse_setup_ms"] + elapsed_ms, 3)
+        label = f"{api}[{project_id}]" if project_id else api
+        if outcome == "created":
+            print(f"{C.CLOUD_ICON} Created {label} client in {elapsed_ms:.0f}ms", flush=True)
+        else:
+            # Every API call (and every log time slice) goes through here: debug only.
+            logger.debug(f"{C.CLOUD_ICON} Reusing {label} client ({outcome}, {elapsed_ms:.3f}ms)")
+        return client
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        'api[project]' -> calls, creation_ms (first call), avg_reuse_setup_ms (the later calls),
+        and waits / avg_wait_ms (concurrent first calls that waited for the creation).
+        """
+        with self._lock:
+            ret = {}
+            for (api, project_id), stats in self._stats.items():
+                ret[f"{api}[{project_id}]" if project_id else api] = {
+                    "calls": stats["calls"],
+                    "creation_ms": stats["creation_ms"],
+                    "avg_reuse_setup_ms": round(stats["reuse_setup_ms"] / stats["reuses"], 3) if stats["reuses"] else 0.0,
+                    "waits": stats["waits"],
+                    "avg_wait_ms": round(stats["wait_ms"] / stats["waits"], 3) if stats["waits"] else 0.0,
+                }
+            return ret
+
+    def reset(self):
+        """Forgets every client (e.g. after changing credentials): the next calls create new ones."""
+        with self._lock:
+            self._clients.clear()
+            self._key_locks.clear()
+
+
+# The process-wide registry.
+GCP_CLIENTS = GcpClientRegistry()
+
+def get_client(api: str, project_id: Optional[str] = None) -> Any:
+    return GCP_CLIENTS.get(api, project_id)
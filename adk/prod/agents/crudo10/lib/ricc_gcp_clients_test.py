@@ -0,0 +1,59 @@
+# lib/ricc_gcp_clients_test.py
+
+'''
+Test me:  python -m unittest lib.ricc_gcp_clients_test   (from crudo10/)
+'''
+
+import threading
+import time
+import unittest
+from .ricc_gcp_clients import GcpClientRegistry
+
+class TestGcpClientRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+
+        def slow_factory(project_id):
+            time.sleep(0.05) # credentials + channel setup
+            client = object()
+            self.created.append((project_id, client))
+            return client
+
+        self.registry = GcpClientRegistry(factories={"logging": slow_factory})
+
+    def test_one_client_per_api_and_project(self):
+        a = self.registry.get("logging", "project-a")
+        self.assertIs(self.registry.get("logging", "project-a"), a)
+        b = self.registry.get("logging", "project-b")
+        self.assertIsNot(a, b)
+        self.assertEqual(len(self.created), 2)
+        stats = self.registry.stats()["logging[project-a]"]
+        self.assertEqual(stats["calls"], 2)
+        self.assertGreaterEqual(stats["creation_ms"], 50)
+        self.assertLess(stats["avg_reuse_setup_ms"], 5)
+
+    def test_concurrent_first_calls_create_once(self):
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(self.registry.get("logging", "p"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.created), 1)
+        self.assertTrue(all(c is clients[0] for c in clients))
+        stats = self.registry.stats()["logging[p]"]
+        self.assertEqual((stats["calls"], stats["waits"]), (8, 7))
+        self.assertGreater(stats["avg_wait_ms"], 10) # waiting for the creation is not a reuse cost
+        self.assertEqual(stats["avg_reuse_setup_ms"], 0.0)
+
+    def test_unknown_api_and_reset(self):
+        with self.assertRaises(ValueError):
+            self.registry.get("bigquery")
+        a = self.registry.get("logging", "p")
+        self.registry.reset()
+        self.assertIsNot(self.registry.get("logging", "p"), a)
+
+
+if __name__ == "__main__":
+    unittest.main()
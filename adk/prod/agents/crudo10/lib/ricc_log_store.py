@@ -0,0 +1,296 @@
+# lib/ricc_log_store.py
+# Local store of Cloud Run log entries (SQLite), kept in sync incrementally with Cloud Logging.
+
+import datetime
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_entries (
+    service TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    timestamp TEXT NOT NULL,   -- UTC ISO 8601, microseconds: sorts as text
+    insert_id TEXT NOT NULL,
+    severity TEXT,
+    severity_level INTEGER,    -- SEVERITY_LEVELS[severity]: 'severity >= WARNING' is a range scan
+    payload TEXT,              -- JSON for structured (jsonPayload) entries, plain text otherwise
+    PRIMARY KEY (service, revision, timestamp, insert_id)
+);
+-- What has already been fetched, per revision: [synced_from, synced_until] is complete.
+CREATE TABLE IF NOT EXISTS log_sync (
+    service TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    synced_from TEXT NOT NULL,
+    synced_until TEXT NOT NULL,
+    newest_timestamp TEXT,
+    newest_insert_id TEXT,
+    PRIMARY KEY (service, revision)
+);
+"""
+
+# Created after the severity_level migration (older stores don't have the column yet).
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS log_entries_by_severity ON log_entries (service, severity_level, timestamp);
+CREATE INDEX IF NOT EXISTS log_entries_by_time ON log_entries (timestamp);
+"""
+
+# Cloud Logging LogSeverity values.
+SEVERITY_LEVELS = {
+    "DEFAULT": 0,
+    "DEBUG": 100,
+    "INFO": 200,
+    "NOTICE": 300,
+    "WARNING": 400,
+    "ERROR": 500,
+    "CRITICAL": 600,
+    "ALERT": 700,
+    "EMERGENCY": 800,
+}
+
+# (timestamp, insert_id, severity, payload)
+LogRow = Tuple[str, str, Optional[str], Optional[str]]
+
+
+def to_utc_iso(timestamp: datetime.datetime) -> str:
+    """Fixed-format UTC timestamp ('2025-04-22T09:23:32.264589+00:00'): text order == time order."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return timestamp.astimezone(datetime.timezone.utc).isoformat(timespec="microseconds")
+
+
+def histogram_bucket(timestamp: str, origin: datetime.datetime, bucket_seconds: int) -> int:
+    """
+    The LogStore.histogram() bucket of a stored timestamp, computed in Python with the same
+    whole-second arithmetic as its SQL (both sides truncated to seconds, integer division),
+    so an entry on a bucket edge lands in the same bucket whoever counts it.
+    """
+    return (int(datetime.datetime.fromisoformat(timestamp).timestamp()) - int(origin.timestamp())) // bucket_seconds
+
+
+def severity_level(severity: Optional[str]) -> int:
+    """'ERROR' -> 500. Unknown or missing severities count as DEFAULT."""
+    return SEVERITY_LEVELS.get(str(severity or "DEFAULT").upper(), 0)
+
+
+def _parse_payload(payload: Optional[str]) -> Any:
+    """JSON payloads back to dicts, text payloads as they are."""
+    if payload and payload[:1] in "{[":
+        try:
+            return json.loads(payload)
+        except ValueError:
+            pass
+    return payload
+
+
+def missing_ranges(
+    covered: Optional[Tuple[datetime.datetime, datetime.datetime]],
+    start: datetime.datetime,
+    end: datetime.datetime,
+) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """
+    The parts of [start, end] not in the `covered` range, i.e. what still has to be fetched.
+    A window disjoint from the covered range is fetched whole.
+    """
+    if covered is None:
+        return [(start, end)]
+    covered_from, covered_until = covered
+    if end < covered_from or start > covered_until:
+        return [(start, end)]
+    ranges = []
+    if start < covered_from:
+        ranges.append((start, covered_from))
+    if end > covered_until:
+        ranges.append((covered_until, end))
+    return ranges
+
+
+class LogStore:
+    """
+    Log entries of every revision of a project, deduplicated on (timestamp, insertId),
+    plus the time range already synced per revision: a later request for the same
+    revision only fetches what is outside of it.
+
+    Entries are indexed by service/revision/time and by severity, so query() answers
+    time range / severity / text questions locally, without going back to Cloud Logging.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+            self._conn.executescript(_INDEXES)
+
+    def _migrate(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(log_entries);")]
+        if "severity_level" not in columns:
+            self._conn.execute("ALTER TABLE log_entries ADD COLUMN severity_level INTEGER;")
+            self._conn.executemany(
+                "UPDATE log_entries SET severity_level = ? WHERE severity = ?;",
+                [(level, name) for name, level in SEVERITY_LEVELS.items()],
+            )
+            self._conn.execute("UPDATE log_entries SET severity_level = 0 WHERE severity_level IS NULL;")
+
+    def add_entries(self, service: str, revision: str, rows: Iterable[LogRow]) -> int:
+        """Stores entries (already known ones are ignored). Returns how many were new."""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO log_entries (service, revision, timestamp, insert_id, severity, severity_level, payload) VALUES (?, ?, ?, ?, ?, ?, ?);",
+                (
+                    (service, revision, timestamp, insert_id, severity, severity_level(severity), payload)
+                    for timestamp, insert_id, severity, payload in rows
+                ),
+            )
+            return self._conn.total_changes - before
+
+    def get_coverage(self, service: str, revision: str) -> Optional[Tuple[datetime.datetime, datetime.datetime]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_from, synced_until FROM log_sync WHERE service = ? AND revision = ?;", (service, revision)
+            ).fetchone()
+        if row is None:
+            return None
+        return datetime.datetime.fromisoformat(row[0]), datetime.datetime.fromisoformat(row[1])
+
+    def mark_synced(self, service: str, revision: str, start: datetime.datetime, end: datetime.datetime):
+        """Records that [start, end] has been fetched: merged with the covered range if they touch, replaces it otherwise."""
+        covered = self.get_coverage(service, revision)
+        if covered is not None and not (end < covered[0] or start > covered[1]):
+            start, end = min(start, covered[0]), max(end, covered[1])
+        with self._lock, self._conn:
+            newest = self._conn.execute(
+                "SELECT timestamp, insert_id FROM log_entries WHERE service = ? AND revision = ? ORDER BY timestamp DESC, insert_id DESC LIMIT 1;",
+                (service, revision),
+            ).fetchone() or (None, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO log_sync (service, revision, synced_from, synced_until, newest_timestamp, newest_insert_id) VALUES (?, ?, ?, ?, ?, ?);",
+                (service, revision, to_utc_iso(start), to_utc_iso(end), *newest),
+            )
+
+    def iter_entries(
+        self, service: str, revision: str, start: datetime.datetime, end: datetime.datetime, batch_size: int = 500
+    ) -> Iterator[LogRow]:
+        """
+        Entries of a revision in [start, end], oldest first, read batch_size at a time
+        (keyset pagination): the lock is not held between batches, the window is never all in memory.
+        """
+        params = [service, revision, to_utc_iso(start), to_utc_iso(end)]
+        after: Optional[Tuple[str, str]] = None
+        while True:
+            sql = (
+                "SELECT timestamp, insert_id, severity, payload FROM log_entries "
+                "WHERE service = ? AND revision = ? AND timestamp BETWEEN ? AND ?"
+            )
+            if after is not None:
+                sql += " AND (timestamp, insert_id) > (?, ?)"
+            sql += " ORDER BY timestamp, insert_id LIMIT ?;"
+            with self._lock:
+                batch = self._conn.execute(sql, params + list(after or ()) + [batch_size]).fetchall()
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after = batch[-1][0], batch[-1][1]
+
+    def get_entries(self, service: str, revision: str, start: datetime.datetime, end: datetime.datetime) -> List[LogRow]:
+        """Entries of a revision in [start, end], oldest first."""
+        return list(self.iter_entries(service, revision, start, end))
+
+    def query(
+        self,
+        service: Optional[str] = None,
+        revision: Optional[str] = None,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        min_severity: Optional[str] = None,
+        text: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Stored entries matching every given filter, newest first: time range, minimum
+        severity ('WARNING' also returns ERROR, CRITICAL...) and a case-insensitive
+        substring of the payload. JSON payloads are returned as dicts.
+        """
+        where, params = [], []
+        if service:
+            where.append("service = ?")
+            params.append(service)
+        if revision:
+            where.append("revision = ?")
+            params.append(revision)
+        if start:
+            where.append("timestamp >= ?")
+            params.append(to_utc_iso(start))
+        if end:
+            where.append("timestamp <= ?")
+            params.append(to_utc_iso(end))
+        if min_severity:
+            where.append("severity_level >= ?")
+            params.append(severity_level(min_severity))
+        if text:
+            where.append("payload LIKE ? ESCAPE '\\'")
+            params.append("%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        sql = "SELECT service, revision, timestamp, insert_id, severity, payload FROM log_entries"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp DESC, insert_id DESC LIMIT ?;"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"service": service, "revision": revision, "timestamp": timestamp, "insert_id": insert_id,
+             "severity": severity, "payload": _parse_payload(payload)}
+            for service, revision, timestamp, insert_id, severity, payload in rows
+        ]
+
+    def histogram(
+        self,
+        service: str,
+        revision: str,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        origin: datetime.datetime,
+        bucket_seconds: int,
+        min_severity: Optional[str] = None,
+    ) -> List[Tuple[int, str, int]]:
+        """
+        (bucket, severity, count) of the entries of a revision in [start, end], counted by SQLite:
+        bucket n covers [origin + n * bucket_seconds, origin + (n + 1) * bucket_seconds), in whole
+        seconds (see histogram_bucket() for the same computation on streamed entries).
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT (CAST(strftime('%s', timestamp) AS INTEGER) - ?) / ? AS bucket, severity, COUNT(*) FROM log_entries "
+                "WHERE service = ? AND revision = ? AND timestamp BETWEEN ? AND ? AND severity_level >= ? "
+                "GROUP BY bucket, severity ORDER BY bucket, severity;",
+                (int(origin.timestamp()), bucket_seconds, service, revision, to_utc_iso(start), to_utc_iso(end), severity_level(min_severity)),
+            ).fetchall()
+
+    def get_sync_state(self, service: str, revision: str) -> Optional[Dict[str, Any]]:
+        """Synced range and watermark (newest entry timestamp / insertId) of a revision."""
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM log_sync WHERE service = ? AND revision = ?;", (service, revision))
+            row = cursor.fetchone()
+            return dict(zip([d[0] for d in cursor.description], row)) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_stores: Dict[str, LogStore] = {}
+_stores_lock = threading.Lock()
+
+def get_log_store(path: Path) -> LogStore:
+    """THE store of a given file (one connection per file per process)."""
+    key = str(path.resolve())
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = LogStore(path)
+        return _stores[key]
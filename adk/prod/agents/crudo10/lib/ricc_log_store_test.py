@@ -0,0 +1,122 @@
+# lib/ricc_log_store_test.py
+
+'''
+Test me:  python -m unittest lib.ricc_log_store_test   (from crudo10/)
+'''
+
+import datetime
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from .ricc_log_store import LogStore, histogram_bucket, missing_ranges, to_utc_iso
+
+UTC = datetime.timezone.utc
+
+def at(hour: int, minute: int = 0) -> datetime.datetime:
+    return datetime.datetime(2025, 5, 15, hour, minute, tzinfo=UTC)
+
+class TestMissingRanges(unittest.TestCase):
+
+    def test_nothing_covered(self):
+        self.assertEqual(missing_ranges(None, at(9), at(10)), [(at(9), at(10))])
+
+    def test_only_the_delta(self):
+        # Last hour synced at 10:00, asked again at 10:10: only 10:00 .. 10:10 is missing.
+        self.assertEqual(missing_ranges((at(9), at(10)), at(9, 10), at(10, 10)), [(at(10), at(10, 10))])
+
+    def test_fully_covered(self):
+        self.assertEqual(missing_ranges((at(8), at(10)), at(9), at(10)), [])
+
+    def test_wider_window_and_disjoint_window(self):
+        self.assertEqual(missing_ranges((at(9), at(10)), at(8), at(11)), [(at(8), at(9)), (at(10), at(11))])
+        self.assertEqual(missing_ranges((at(9), at(10)), at(12), at(13)), [(at(12), at(13))])
+
+class TestLogStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = LogStore(Path(self.tmp_dir.name) / "logs.sqlite")
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_entries_are_deduplicated_and_sorted(self):
+        rows = [(to_utc_iso(at(9, 30)), "b", "ERROR", '{"msg": "boom"}'), (to_utc_iso(at(9, 10)), "a", "WARNING", "slow")]
+        self.assertEqual(self.store.add_entries("svc", "rev-1", rows), 2)
+        self.assertEqual(self.store.add_entries("svc", "rev-1", rows[:1]), 0) # refetched overlap
+        entries = self.store.get_entries("svc", "rev-1", at(9), at(10))
+        self.assertEqual([e[1] for e in entries], ["a", "b"])
+        self.assertEqual(self.store.get_entries("svc", "rev-2", at(9), at(10)), [])
+
+    def test_iter_entries_in_batches(self):
+        rows = [(to_utc_iso(at(9, m)), f"id-{m:02d}", "ERROR", "x") for m in range(0, 50, 5)]
+        rows.append((to_utc_iso(at(9, 45)), "id-45b", "ERROR", "same timestamp")) # straddles a batch boundary
+        self.store.add_entries("svc", "rev-1", rows)
+        entries = list(self.store.iter_entries("svc", "rev-1", at(9), at(10), batch_size=3))
+        self.assertEqual([e[1] for e in entries], [r[1] for r in sorted(rows)])
+
+    def test_coverage_and_watermark(self):
+        self.assertIsNone(self.store.get_coverage("svc", "rev-1"))
+        self.store.add_entries("svc", "rev-1", [(to_utc_iso(at(9, 50)), "z", "ERROR", "x")])
+        self.store.mark_synced("svc", "rev-1", at(9), at(10))
+        self.store.mark_synced("svc", "rev-1", at(10), at(10, 10)) # delta: merged
+        self.assertEqual(self.store.get_coverage("svc", "rev-1"), (at(9), at(10, 10)))
+        state = self.store.get_sync_state("svc", "rev-1")
+        self.assertEqual((state["newest_timestamp"], state["newest_insert_id"]), (to_utc_iso(at(9, 50)), "z"))
+        self.store.mark_synced("svc", "rev-1", at(14), at(15)) # disjoint: replaces
+        self.assertEqual(self.store.get_coverage("svc", "rev-1"), (at(14), at(15)))
+
+    def test_query_by_time_severity_and_text(self):
+        self.store.add_entries("svc", "rev-1", [
+            (to_utc_iso(at(9, 10)), "a", "WARNING", "slow request: 50% over budget"),
+            (to_utc_iso(at(9, 20)), "b", "ERROR", '{"message": "DB Timeout", "code": 504}'),
+        ])
+        self.store.add_entries("other", "rev-9", [(to_utc_iso(at(9, 30)), "c", "CRITICAL", "timeout")])
+        self.assertEqual([e["insert_id"] for e in self.store.query("svc")], ["b", "a"]) # newest first
+        self.assertEqual([e["insert_id"] for e in self.store.query(min_severity="error")], ["c", "b"])
+        self.assertEqual([e["insert_id"] for e in self.store.query(text="timeout")], ["c", "b"])
+        self.assertEqual([e["insert_id"] for e in self.store.query(text="50%")], ["a"]) # % is literal
+        self.assertEqual([e["insert_id"] for e in self.store.query(start=at(9, 15), end=at(9, 25))], ["b"])
+        self.assertEqual(self.store.query("svc", "rev-1", min_severity="ERROR")[0]["payload"], {"message": "DB Timeout", "code": 504})
+        self.assertEqual(len(self.store.query(limit=1)), 1)
+
+    def test_histogram(self):
+        self.store.add_entries("svc", "rev-1", [
+            (to_utc_iso(at(9, 5)), "a", "WARNING", "x"),
+            (to_utc_iso(at(9, 25)), "b", "ERROR", "x"),
+            (to_utc_iso(at(9, 29)), "c", "ERROR", "x"),
+            (to_utc_iso(at(10, 40)), "d", "WARNING", "x"),
+        ])
+        histogram = self.store.histogram("svc", "rev-1", at(9), at(11), origin=at(9), bucket_seconds=1800)
+        self.assertEqual(histogram, [(0, "ERROR", 2), (0, "WARNING", 1), (3, "WARNING", 1)])
+        self.assertEqual(self.store.histogram("svc", "rev-1", at(9), at(11), at(9), 1800, min_severity="ERROR"), [(0, "ERROR", 2)])
+
+    def test_histogram_bucket_matches_sql(self):
+        origin = at(9) + datetime.timedelta(microseconds=600000) # a 'now' with fractional seconds
+        timestamps = [to_utc_iso(at(9, 30) + datetime.timedelta(microseconds=us)) for us in (0, 300000, 999999)]
+        timestamps.append(to_utc_iso(at(9, 29) + datetime.timedelta(seconds=59, microseconds=700000)))
+        self.store.add_entries("svc", "rev-1", [(ts, str(i), "ERROR", "x") for i, ts in enumerate(timestamps)])
+        in_sql = self.store.histogram("svc", "rev-1", at(9), at(11), origin, 1800)
+        in_python = [histogram_bucket(ts, origin, 1800) for ts in timestamps]
+        self.assertEqual(in_python, [1, 1, 1, 0]) # 09:30:00.0 is in bucket 1 although origin is 09:00:00.6
+        self.assertEqual(in_sql, [(0, "ERROR", 1), (1, "ERROR", 3)])
+
+    def test_older_store_gets_severity_levels(self):
+        path = Path(self.tmp_dir.name) / "old.sqlite"
+        conn = sqlite3.connect(str(path))
+        conn.executescript("""
+            CREATE TABLE log_entries (service TEXT NOT NULL, revision TEXT NOT NULL, timestamp TEXT NOT NULL,
+                insert_id TEXT NOT NULL, severity TEXT, payload TEXT, PRIMARY KEY (service, revision, timestamp, insert_id));
+        """)
+        conn.execute("INSERT INTO log_entries VALUES ('svc', 'rev-1', ?, 'a', 'ERROR', 'boom');", (to_utc_iso(at(9)),))
+        conn.commit()
+        conn.close()
+        store = LogStore(path)
+        self.assertEqual([e["insert_id"] for e in store.query(min_severity="ERROR")], ["a"])
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# lib/ricc_log_stream.py
+# What the agent gets from a stream of log lines: all of them if they fit a byte budget,
+# otherwise the head, the tail and counts of what was left out.
+
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 64 * 1024 # ~16k tokens
+BYTES_PER_TOKEN = 4 # rough, for English/JSON log lines
+
+
+def budgeted_log_text(lines: Iterable[Tuple[Optional[str], str]], max_bytes: int = DEFAULT_MAX_BYTES) -> Tuple[str, Dict[str, Any]]:
+    """
+    Consumes (severity, line) pairs one at a time, keeping at most ~max_bytes of them: the first
+    lines up to half the budget, then a sliding window of the last ones. Lines in between are
+    dropped as they go by, never held in memory.
+
+    Returns (text, summary): summary counts every line seen, by severity, and what was omitted.
+    """
+    head, tail = [], deque()
+    head_bytes = tail_bytes = 0
+    head_full = False
+    entries = total_bytes = 0
+    severity_counts: Counter = Counter()
+    for severity, line in lines:
+        size = len(line.encode("utf-8")) + 1 # + newline
+        entries += 1
+        total_bytes += size
+        severity_counts[severity or "DEFAULT"] += 1
+        if not head_full and head_bytes + size <= max_bytes // 2:
+            head.append(line)
+            head_bytes += size
+            continue
+        head_full = True
+        tail.append((line, size))
+        tail_bytes += size
+        while tail and tail_bytes > max_bytes - head_bytes:
+            tail_bytes -= tail.popleft()[1]
+
+    omitted = entries - len(head) - len(tail)
+    parts = head
+    if omitted:
+        omitted_bytes = total_bytes - head_bytes - tail_bytes
+        parts = head + [f"--- {omitted} entries ({omitted_bytes} bytes) omitted: over the {max_bytes} bytes budget ---"]
+    parts = parts + [line for line, _size in tail]
+    summary = {
+        "entries": entries,
+        "bytes": total_bytes,
+        "approx_tokens": total_bytes // BYTES_PER_TOKEN,
+        "returned_entries": entries - omitted,
+        "omitted_entries": omitted,
+        "truncated": omitted > 0,
+        "severity_counts": dict(severity_counts),
+    }
+    return "\n".join(parts), summary
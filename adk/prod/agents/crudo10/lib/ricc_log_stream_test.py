@@ -0,0 +1,39 @@
+# lib/ricc_log_stream_test.py
+
+'''
+Test me:  python -m unittest lib.ricc_log_stream_test   (from crudo10/)
+'''
+
+import unittest
+from .ricc_log_stream import budgeted_log_text
+
+def log_lines(n: int):
+    for i in range(n):
+        yield ("ERROR" if i % 10 == 0 else "WARNING", f"line {i:04d}")
+
+class TestBudgetedLogText(unittest.TestCase):
+
+    def test_everything_fits(self):
+        text, summary = budgeted_log_text(log_lines(5), max_bytes=1000)
+        self.assertEqual(text.splitlines(), [f"line {i:04d}" for i in range(5)])
+        self.assertFalse(summary["truncated"])
+        self.assertEqual(summary["severity_counts"], {"ERROR": 1, "WARNING": 4})
+
+    def test_head_and_tail_over_budget(self):
+        text, summary = budgeted_log_text(log_lines(1000), max_bytes=100) # 10 bytes per line
+        lines = text.splitlines()
+        self.assertEqual(lines[:5], [f"line {i:04d}" for i in range(5)])
+        self.assertEqual(lines[-5:], [f"line {i:04d}" for i in range(995, 1000)])
+        self.assertIn("990 entries", lines[5])
+        self.assertEqual((summary["entries"], summary["omitted_entries"]), (1000, 990))
+        self.assertEqual(summary["severity_counts"], {"ERROR": 100, "WARNING": 900}) # counts cover everything
+
+    def test_empty(self):
+        self.assertEqual(budgeted_log_text([]), ("", {
+            "entries": 0, "bytes": 0, "approx_tokens": 0, "returned_entries": 0,
+            "omitted_entries": 0, "truncated": False, "severity_counts": {},
+        }))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+# lib/ricc_log_templates.py
+# Drain-style log template mining: entries that differ only by IDs, numbers, IPs... collapse into
+# one template with a count, first/last seen and one exemplar. Single pass, constant work per entry.
+
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .ricc_log_store import severity_level
+
+WILDCARD = "<*>"
+
+# Applied in order: the specific shapes first, plain numbers last.
+_MASKS = [
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<TIME>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b0[xX][0-9a-fA-F]+\b"), "<HEX>"),
+    (re.compile(r"\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b"), "<HEX>"), # hashes, trace IDs
+    (re.compile(r"\d+(?:\.\d+)?"), "<NUM>"),
+]
+
+# Where structured (jsonPayload) entries keep their human readable message.
+MESSAGE_FIELDS = ("message", "msg", "textPayload", "error", "log")
+
+
+def mask(message: str) -> str:
+    """'user 42 from 10.0.0.1' -> 'user <NUM> from <IP>'."""
+    for pattern, placeholder in _MASKS:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+def log_message(payload: Optional[str]) -> str:
+    """The message of a stored payload: its MESSAGE_FIELDS for JSON payloads, the text otherwise."""
+    if payload and payload[:1] == "{":
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return payload
+        for field in MESSAGE_FIELDS:
+            if isinstance(data.get(field), str) and data[field]:
+                return data[field]
+    return payload or ""
+
+
+class LogTemplate:
+    """One cluster: the template tokens (differing positions are WILDCARD) and what it matched."""
+
+    __slots__ = ("tokens", "count", "severity_counts", "first_seen", "last_seen", "exemplar")
+
+    def __init__(self, tokens: List[str], timestamp: str, severity: Optional[str], exemplar: str):
+        self.tokens = tokens
+        self.count = 0
+        self.severity_counts: Dict[str, int] = {}
+        self.first_seen = self.last_seen = timestamp
+        self.exemplar = exemplar
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    @property
+    def severity(self) -> str:
+        """The highest severity among the matched entries."""
+        return max(self.severity_counts, key=severity_level) if self.severity_counts else "DEFAULT"
+
+    def add(self, timestamp: str, severity: Optional[str]):
+        self.count += 1
+        severity = severity or "DEFAULT"
+        self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+        self.first_seen = min(self.first_seen, timestamp)
+        self.last_seen = max(self.last_seen, timestamp)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "template": self.template,
+            "count": self.count,
+            "severity_counts": dict(self.severity_counts),
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "exemplar": self.exemplar,
+        }
+
+
+class LogTemplateMiner:
+    """
+    Drain, simplified: masked messages are grouped by (token count, first token); within a group
+    an entry joins the most similar template (share of equal tokens >= similarity_threshold),
+    which then gets a WILDCARD where they differ, or starts a new one.
+
+    Repeated masked messages (the common case) skip the similarity search entirely.
+    Long messages (stack traces) are clustered on their first max_tokens tokens.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.5, max_tokens: int = 64, max_exemplar_chars: int = 300):
+        self.similarity_threshold = similarity_threshold
+        self.max_tokens = max_tokens
+        self.max_exemplar_chars = max_exemplar_chars
+        self.entries = 0
+        self._groups: Dict[Tuple[int, str], List[LogTemplate]] = {}
+        self._seen: Dict[Tuple[str, ...], LogTemplate] = {} # masked tokens -> the template that took them
+
+    def add(self, timestamp: str, severity: Optional[str], message: str) -> LogTemplate:
+        self.entries += 1
+        tokens = tuple(mask(message).split()[: self.max_tokens])
+        template = self._seen.get(tokens)
+        if template is None:
+            template = self._match(tokens, timestamp, severity, message)
+            self._seen[tokens] = template
+        template.add(timestamp, severity)
+        return template
+
+    def add_all(self, entries: Iterable[Tuple[str, Optional[str], str]]) -> "LogTemplateMiner":
+        """Consumes (timestamp, severity, message) triples, e.g. straight from a generator."""
+        for timestamp, severity, message in entries:
+            self.add(timestamp, severity, message)
+        return self
+
+    def _match(self, tokens: Tuple[str, ...], timestamp: str, severity: Optional[str], message: str) -> LogTemplate:
+        group = self._groups.setdefault((len(tokens), tokens[0] if tokens else ""), [])
+        best, best_similarity = None, -1.0
+        for candidate in group:
+            same = sum(1 for a, b in zip(candidate.tokens, tokens) if a == b or a == WILDCARD)
+            similarity = same / len(tokens) if tokens else 1.0
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is not None and best_similarity >= self.similarity_threshold:
+            best.tokens = [a if a == b else WILDCARD for a, b in zip(best.tokens, tokens)]
+            return best
+        template = LogTemplate(list(tokens), timestamp, severity, message[: self.max_exemplar_chars])
+        group.append(template)
+        return template
+
+    def templates(self) -> List[LogTemplate]:
+        """Most frequent first."""
+        return sorted((t for group in self._groups.values() for t in group), key=lambda t: (-t.count, t.first_seen))
+
+    def render_lines(self) -> Iterator[Tuple[str, str]]:
+        """(severity, text) per template, most frequent first: '<count>x [SEV] first .. last: template' + exemplar."""
+        for t in self.templates():
+            line = f"{t.count}x [{t.severity}] {t.first_seen} .. {t.last_seen}: {t.template}"
+            if t.exemplar != t.template:
+                line += f"\n    e.g. {t.exemplar}"
+            yield t.severity, line
+
+    def stats(self) -> Dict[str, Any]:
+        severity_counts: Dict[str, int] = {}
+        templates = 0
+        for group in self._groups.values():
+            for t in group:
+                templates += 1
+                for severity, count in t.severity_counts.items():
+                    severity_counts[severity] = severity_counts.get(severity, 0) + count
+        return {"entries": self.entries, "templates": templates, "severity_counts": severity_counts}
@@ -0,0 +1,60 @@
+# lib/ricc_log_templates_test.py
+
+'''
+Test me:  python -m unittest lib.ricc_log_templates_test   (from crudo10/)
+'''
+
+import time
+import unittest
+import uuid
+from .ricc_log_templates import LogTemplateMiner, log_message, mask
+
+class TestMasking(unittest.TestCase):
+
+    def test_mask(self):
+        self.assertEqual(
+            mask(f"req {uuid.UUID(int=7)} from 10.0.0.12:443 took 12.5ms, trace 4bf92f3577b34da6a3ce929d0e0e4736"),
+            "req <UUID> from <IP> took <NUM>ms, trace <HEX>",
+        )
+
+    def test_log_message(self):
+        self.assertEqual(log_message('{"message": "DB timeout", "code": 504}'), "DB timeout")
+        self.assertEqual(log_message('{"code": 504}'), '{"code": 504}')
+        self.assertEqual(log_message("plain text"), "plain text")
+        self.assertEqual(log_message(None), "")
+
+class TestLogTemplateMiner(unittest.TestCase):
+
+    def test_ids_collapse_into_one_template(self):
+        miner = LogTemplateMiner()
+        for i in range(100):
+            miner.add(f"2025-05-15T09:{i % 60:02d}:00", "ERROR" if i % 2 else "WARNING", f"Timeout calling user {i} after {i * 10}ms")
+        miner.add("2025-05-15T09:30:30", "WARNING", "Cache miss ratio high")
+        templates = miner.templates()
+        self.assertEqual([t.count for t in templates], [100, 1])
+        top = templates[0]
+        self.assertEqual(top.template, "Timeout calling user <NUM> after <NUM>ms")
+        self.assertEqual((top.first_seen, top.last_seen), ("2025-05-15T09:00:00", "2025-05-15T09:59:00"))
+        self.assertEqual(top.severity, "ERROR")
+        self.assertEqual(top.exemplar, "Timeout calling user 0 after 0ms")
+        self.assertEqual(miner.stats(), {"entries": 101, "templates": 2, "severity_counts": {"WARNING": 51, "ERROR": 50}})
+
+    def test_similar_messages_merge_with_wildcards(self):
+        miner = LogTemplateMiner()
+        miner.add("t1", "ERROR", "Connection refused by backend alpha")
+        miner.add("t2", "ERROR", "Connection refused by backend beta")
+        miner.add("t3", "ERROR", "Disk full") # different length: own group
+        self.assertEqual([t.template for t in miner.templates()], ["Connection refused by backend <*>", "Disk full"])
+
+    def test_streaming_100k_entries(self):
+        def entries():
+            for i in range(100_000):
+                yield "2025-05-15T09:00:00", "ERROR", f"Request {uuid.UUID(int=i)} failed: upstream 10.1.{i % 250}.7 returned {500 + i % 4}"
+        started = time.perf_counter()
+        miner = LogTemplateMiner().add_all(entries())
+        self.assertEqual(len(miner.templates()), 1)
+        self.assertLess(time.perf_counter() - started, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
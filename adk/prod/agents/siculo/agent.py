@@ -66,48 +66,183 @@ DB_FILE = os.getenv("SICULO_AGENT_DB_FILE", DEFAULT_DB_FILE)
 ALLOW_WRITES = getenv_boolean("SICULO_AGENT_ALLOW_WRITES", False)
 DEBUG = getenv_boolean("SICULO_AGENT_DEBUG", False)
 RAILS_ROOT = os.getenv("RAILS_ROOT", os.path.dirname(os.path.realpath(__file__)))
+# Rows per page returned by tool_execute_sql. Big results are paged, never loaded in full.
+PAGE_SIZE = int(os.getenv("SICULO_AGENT_PAGE_SIZE", "100"))
+# Slow query log: statements slower than this (ms) are logged with their plan to '<DB_FILE>.slow_queries.jsonl'.
+SLOW_QUERY_MS = float(os.getenv("SICULO_AGENT_SLOW_QUERY_MS", "200"))
+EXPLAIN_QUERIES = getenv_boolean("SICULO_AGENT_EXPLAIN_QUERIES", False)
+# Execution budget for every LLM-generated statement: a runaway cartesian join is interrupted, not waited for.
+QUERY_TIMEOUT_SECONDS = float(os.getenv("SICULO_AGENT_QUERY_TIMEOUT_SECONDS", "10"))
+MAX_RESULT_BYTES = int(os.getenv("SICULO_AGENT_MAX_RESULT_BYTES", "200000"))
+# 'fast' = WAL & co: concurrent sessions keep reading while someone writes. See lib/sqlite_profiles.py.
+# Only the default with writes allowed: WAL is stored in the DB file, a read-only agent must not change it.
+PERFORMANCE_PROFILE = os.getenv("SICULO_AGENT_PERFORMANCE_PROFILE", "fast" if ALLOW_WRITES else "default")
+# Route `col LIKE '%word%'` to the FTS5 index of the column, when there is one (see tool_create_fulltext_index).
+# Off by default: MATCH is token based, so infix matches ('%mini%' in 'Gemini') are lost when on.
+FTS_ROUTING = getenv_boolean("SICULO_AGENT_FTS_ROUTING", False)
+# Read-only deployments: serve reads from a RAM copy of the DB, reloaded when the file changes (mmap if too big).
+# Ignored when writes are allowed (writes would be lost with the copy).
+IN_MEMORY = getenv_boolean("SICULO_AGENT_IN_MEMORY", False) and not ALLOW_WRITES
 
 print(f">>> DB_FILE={DB_FILE}")
-SingletonAgent = SQLiteAgent(filename=DB_FILE, write_access=ALLOW_WRITES, debug=DEBUG)
+SingletonAgent = SQLiteAgent(
+    filename=DB_FILE,
+    write_access=ALLOW_WRITES,
+    debug=DEBUG,
+    explain_queries=EXPLAIN_QUERIES,
+    slow_query_ms=SLOW_QUERY_MS,
+    query_timeout_seconds=QUERY_TIMEOUT_SECONDS,
+    max_result_bytes=MAX_RESULT_BYTES,
+    performance_profile=PERFORMANCE_PROFILE,
+    fts_routing=FTS_ROUTING,
+    in_memory=IN_MEMORY,
+)
 
 # -- Tool part --
+# DB tools are async: the blocking SQLite work runs on the per-DB executor (lib/sqlite_async.py),
+# so a slow query in one session does not stall the other sessions on the ADK event loop.
 
-def tool_get_database_details():
+async def tool_get_database_details(exact_counts: bool = False):
     '''
         Retrieves enhanced details for all tables, including schema and row counts.
 
+        Row counts are estimates by default (fast, even on huge DBs). Only set
+        exact_counts=True if the user explicitly needs exact numbers.
+
         Returns:
             Dict[str, Any]: A dictionary containing 'db_filename' and 'table_details'.
                             'table_details' is a dict mapping table names to their
-                            schema and row count ({'schema': {...}, 'rows': int}).
+                            schema and row count ({'schema': {...}, 'rows': int, 'rows_estimated': bool}).
                             Row count is -1 if it cannot be determined.
     '''
-    return SingletonAgent.get_database_details()
+    return await SingletonAgent.aget_database_details(exact_counts=exact_counts)
+
+async def tool_execute_sql(sql_query: str, page_token: str = "", columnar: bool = False):
+    '''Executes a generic SQL query on the DB.
+
+    Results are paginated: you get one page of 'rows' plus a 'next_page_token'.
+    If 'next_page_token' is not null and you need more rows, call this tool again
+    with the SAME sql_query and that page_token. Prefer adding LIMIT/WHERE/aggregations
+    to your SQL over paging through big tables.
 
-def tool_execute_sql(sql_query: str):
-    '''Executes a generic SQL query on the DB.'''
+    With columnar=True the page comes as 'columns' (names, once) plus 'values'
+    (one list per column, in the same order) instead of 'rows': much smaller for
+    wide tables or many rows.
+
+    Every query has a time and size budget. If 'status' is 'partial' the query was
+    stopped (see 'stopped_reason' and 'message'): the rows are incomplete, so rewrite
+    the query (WHERE, LIMIT, aggregations, proper JOIN conditions) instead of retrying it.
+    A page can also be smaller than usual ('stopped_reason': 'max_bytes'): just use
+    'next_page_token' as usual.
+    '''
     print(f"Executing query.. ```{sql_query}```") # todo color blue
-    return SingletonAgent.execute_sql(sql_query)
+    return await SingletonAgent.aexecute_sql_paginated(
+        sql_query,
+        page_size=PAGE_SIZE,
+        page_token=page_token or None,
+        result_format="columnar" if columnar else "rows",
+    )
 
 # def tool_execute_natural_language_query(nl_query: str):
 #     '''Executes a natural language query on the DB.'''
 #     return SingletonAgent.execute_natural_language_query(nl_query)
 
-def tool_list_tables():
+async def tool_list_tables():
     '''Lists all user-defined tables in the database.'''
-    return SingletonAgent.list_tables()
+    return await SingletonAgent.alist_tables()
 
-def tool_get_table_schema(table_name: str):
+async def tool_get_table_schema(table_name: str):
     '''Retrieves the schema (column names and types) for a given table.'''
-    return SingletonAgent.get_table_schema(table_name)
+    return await SingletonAgent.aget_table_schema(table_name)
 
-def tool_get_full_schema()-> Dict[str, Dict[str, str]]:
+async def tool_get_full_schema()-> Dict[str, Dict[str, str]]:
     '''Retrieves the schema for all tables in the database.'''
-    return SingletonAgent.get_full_schema()
+    return await SingletonAgent.aget_full_schema()
+
+async def tool_explain_query(sql_query: str):
+    '''Shows the SQLite query plan (EXPLAIN QUERY PLAN) of a query WITHOUT running it, and which tables would be fully scanned.'''
+    return await SingletonAgent.aexplain(sql_query)
+
+async def tool_get_slow_queries(limit: int = 20):
+    '''Returns the most recent slow queries (duration, rows, query plan, full table scans). Use it to propose indexes.'''
+    return {
+        "status": "success",
+        "threshold_ms": SLOW_QUERY_MS,
+        "slow_queries": await SingletonAgent.aget_slow_queries(limit),
+    }
+
+async def tool_import_file(file_path: str, table_name: str, if_exists: str = "append"):
+    '''Bulk-loads a CSV, TSV or JSONL file (e.g. an events dump) into a table. Only works if the DB is writable.
+
+    The table is created from the file columns (types inferred from a sample) if it does not exist.
+    if_exists: 'append' (default), 'replace' (drop and recreate the table) or 'fail'.
+    Returns the number of imported rows and the speed (rows_per_sec).
+    '''
+    try:
+        return {"status": "success", **(await SingletonAgent.aimport_file(file_path, table_name, if_exists=if_exists))}
+    except (PermissionError, ValueError, OSError) as e:
+        return {"status": "error", "message": str(e)}
+
+async def tool_search_text(table_name: str, keywords: str, limit: int = 20):
+    '''Full-text keyword search (e.g. "events mentioning Gemini") on a table with a full-text index.
+
+    All keywords must match (prefixes too: 'gem' finds 'Gemini'), best matches first.
+    Rows come with '_rank' (lower is better) and '_snippet' (matching text, keywords in [brackets]).
+    Much faster than `LIKE '%...%'` on big tables. Use `tool_list_fulltext_indexes` to see indexed tables.
+    '''
+    try:
+        return await SingletonAgent.asearch_text(table_name, keywords, limit=limit)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+async def tool_list_fulltext_indexes():
+    '''Lists the tables with a full-text (FTS5) index, and which columns are indexed.'''
+    return {"status": "success", "fulltext_indexes": await SingletonAgent.aget_fts_indexes()}
+
+async def tool_create_fulltext_index(table_name: str, columns: Optional[List[str]] = None):
+    '''Builds (or rebuilds) a full-text index on the TEXT columns of a table (or on the given columns).
+
+    Only works if the DB is writable, and only do it if the user agrees. The index is then
+    kept up to date automatically (triggers), and enables `tool_search_text`.
+    '''
+    try:
+        return {"status": "success", **(await SingletonAgent.acreate_fts_index(table_name, columns))}
+    except (PermissionError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+
+async def tool_advise_indexes(apply: bool = False):
+    '''Index advisor: analyzes the queries run so far (and the slow query log) and proposes covering indexes.
+
+    With apply=True (only if the DB is writable AND the user explicitly agreed) it creates
+    them and replays the affected queries, reporting before/after timings.
+    '''
+    try:
+        return await SingletonAgent.aadvise_indexes(apply=apply)
+    except PermissionError as e:
+        return {"status": "error", "message": str(e)}
+
+async def tool_refresh_schema_cache():
+    '''Forces a reload of the cached DB schema. Only needed if the user explicitly asks: schema changes are detected automatically.'''
+    catalog = await SingletonAgent.aget_schema_catalog(force_refresh=True)
+    return {
+        "status": "success",
+        "tables": catalog.table_names(),
+        "schema_version": catalog.schema_version,
+    }
+
+async def tool_get_pool_stats():
+    '''Returns DB connection pool statistics (hits, misses, wait time), async executor queue depth, schema cache statistics, storage mode (file / in-memory copy / mmap) and the effective PRAGMAs (journal mode, cache...).'''
+    return {
+        "pool": SingletonAgent.get_pool_stats(),
+        "storage": SingletonAgent.get_storage_stats(),
+        "executor": SingletonAgent.get_executor_stats(),
+        "schema_catalog": SingletonAgent.get_schema_catalog_stats(),
+        "pragmas": await SingletonAgent.aget_pragmas(),
+    }
 
-def tool_get_colorful_database_schema_markdown():
+async def tool_get_colorful_database_schema_markdown():
     '''Takes the enhanced database details and prints a colorful representation.'''
-    database_details = SingletonAgent.get_database_details()
+    database_details = await SingletonAgent.aget_database_details()
     # TODO wrap with try..
     ret = database_schema_to_colorful_markdown(database_details)
     return {
@@ -127,6 +262,9 @@ BASE_INSTRUCTION = (
     "Whenever asked about date, time, location, version or context, feel free to call the `tool_simple_context` tool. Apart from that, all you do is SQL."
     "At the beginning, start greeting the user, introduce yourself, then use tools to access the database."
     "make yourself aware of the tables, a a relationship among tables, in order to be able to answer questions by the users"
+    "If the user complains about slow queries, use `tool_get_slow_queries` and `tool_explain_query`: full table scans on filtered/joined columns are good index candidates."
+    "`tool_advise_indexes` proposes indexes from the real query history; only use apply=True after the user confirms."
+    "For keyword questions (\"events mentioning X\") prefer `tool_search_text` on tables listed by `tool_list_fulltext_indexes` over LIKE '%X%'."
 )
 
 async def preload_db_schema_callback(callback_context: CallbackContext):
@@ -136,7 +274,7 @@ async def preload_db_schema_callback(callback_context: CallbackContext):
     if not callback_context.state.get("db_schema_loaded"):
         #logging.info("DB schema not loaded for session %s. Loading now.", callback_context.session_id)
         logging.info("DB schema not loaded for session %s. Loading now.", callback_context.state.get("session_id"))
-        db_details = tool_get_database_details()
+        db_details = await tool_get_database_details()
         schema_markdown = database_schema_to_colorful_markdown(db_details)
 
         callback_context.state['db_schema'] = schema_markdown
@@ -203,6 +341,15 @@ root_agent = Agent(
        tool_get_full_schema,
        #tool_print_database_schema,
        tool_get_colorful_database_schema_markdown,
+       tool_get_pool_stats,
+       tool_refresh_schema_cache,
+       tool_explain_query,
+       tool_get_slow_queries,
+       tool_advise_indexes,
+       tool_import_file,
+       tool_search_text,
+       tool_list_fulltext_indexes,
+       tool_create_fulltext_index,
        tool_simple_context,
        ],
 )
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+'''
+Read/write concurrency benchmark of SQLiteAgent performance profiles.
+
+N reader threads run a small SELECT in a loop while ONE writer thread inserts
+rows (one transaction each), for a fixed time, on a fresh DB per profile.
+With the default rollback journal every commit locks readers out; with WAL
+readers keep going while the writer writes.
+
+Usage:  python bin/benchmark_profiles.py [--readers 4] [--seconds 5] [--rows 50000]
+'''
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# --- MAGIC PATH FIXING START ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
+sys.path.insert(0, project_root)
+# --- MAGIC PATH FIXING END ---
+from lib.sqlite_agent import SQLiteAgent
+from lib.sqlite_profiles import PERFORMANCE_PROFILES
+from lib.colors import Color
+
+
+def create_db(path: str, profile: str, rows: int):
+    agent = SQLiteAgent(filename=path, write_access=True, performance_profile=profile)
+    agent.execute_sql("CREATE TABLE events (id INTEGER PRIMARY KEY, title TEXT, city TEXT, attendees INTEGER)")
+    agent.execute_sql("CREATE INDEX idx_events_city ON events(city)")
+    with agent._connect(write=True) as conn:
+        conn.executemany(
+            "INSERT INTO events (title, city, attendees) VALUES (?, ?, ?)",
+            ((f"Event {i}", f"City {i % 100}", i % 500) for i in range(rows)),
+        )
+    agent.close()
+
+
+def run(profile: str, readers: int, seconds: float, rows: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.sqlite")
+        create_db(path, profile, rows)
+        agent = SQLiteAgent(filename=path, write_access=True, max_readers=readers, performance_profile=profile)
+        stop = threading.Event()
+        read_latencies = [[] for _ in range(readers)]
+        writes = [0]
+        errors = []
+
+        def reader(i: int):
+            n = 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    agent.execute_sql("SELECT COUNT(*), AVG(attendees) FROM events WHERE city = ?", (f"City {n % 100}",))
+                except Exception as e:
+                    errors.append(e)
+                read_latencies[i].append((time.perf_counter() - started) * 1000)
+                n += 1
+
+        def writer():
+            n = 0
+            while not stop.is_set():
+                try:
+                    agent.execute_sql("INSERT INTO events (title, city, attendees) VALUES (?, ?, ?)", (f"New {n}", f"City {n % 100}", n))
+                    writes[0] += 1
+                except Exception as e:
+                    errors.append(e)
+                n += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)] + [threading.Thread(target=writer)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        pragmas = agent.get_pragmas()
+        agent.close()
+
+    latencies = sorted(l for per_thread in read_latencies for l in per_thread)
+    return {
+        'profile': profile,
+        'journal_mode': pragmas['journal_mode'],
+        'reads_per_sec': len(latencies) / seconds,
+        'writes_per_sec': writes[0] / seconds,
+        'read_p50_ms': statistics.median(latencies) if latencies else 0.0,
+        'read_p95_ms': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        'read_max_ms': latencies[-1] if latencies else 0.0,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLiteAgent performance profiles (concurrent reads + 1 writer). 🏎️")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads.")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run.")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows in the sample table.")
+    parser.add_argument("--profiles", nargs="+", default=list(PERFORMANCE_PROFILES), help="Profiles to compare.")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING) # one agent per run: keep the init chatter out of the table
+
+    print(Color.yellow(f"{args.readers} readers + 1 writer, {args.seconds}s per profile, {args.rows} rows."))
+    header = f"{'profile':<10} {'journal':<8} {'reads/s':>10} {'writes/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>7}"
+    results = [run(profile, args.readers, args.seconds, args.rows) for profile in args.profiles]
+    print(Color.bold(header))
+    for r in results:
+        print(f"{r['profile']:<10} {r['journal_mode']:<8} {r['reads_per_sec']:>10.0f} {r['writes_per_sec']:>10.0f} "
+              f"{r['read_p50_ms']:>8.2f} {r['read_p95_ms']:>8.2f} {r['read_max_ms']:>8.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
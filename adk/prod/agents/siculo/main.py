@@ -23,6 +23,7 @@ def main():
     parser.add_argument("db_file", help="Path to the SQLite database file.")
     parser.add_argument("--allow-writes", action="store_true", help="Allow write operations (INSERT, UPDATE, DELETE, etc.). Be careful! 💣")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging. 🐞")
+    parser.add_argument("--pool-stats", action="store_true", help="Print connection pool stats at the end. 🏊")
 
     # --- Commands ---
     subparsers = parser.add_subparsers(dest="command", help="Action to perform")
@@ -36,11 +37,19 @@ def main():
 
     # --- Add New Command for Full Schema ---
     parser_full_schema = subparsers.add_parser("show-full-schema", help="Display the schema for ALL tables. 🏛️")
+    parser_full_schema.add_argument("--exact-counts", action="store_true", help="Exact row counts (SELECT COUNT(*)) instead of estimates. 🐢")
 
     # Execute SQL
     parser_sql = subparsers.add_parser("exec-sql", help="Execute a raw SQL query. ⚡️")
     parser_sql.add_argument("sql_query", help="The SQL query string.")
 
+    # Bulk import
+    parser_import = subparsers.add_parser("import-file", help="Bulk-load a CSV/TSV/JSONL file into a table (needs --allow-writes). 📥")
+    parser_import.add_argument("file_path", help="The file to import.")
+    parser_import.add_argument("table_name", help="Destination table (created if missing).")
+    parser_import.add_argument("--format", choices=["csv", "tsv", "jsonl"], default=None, help="File format (default: from the extension).")
+    parser_import.add_argument("--if-exists", choices=["append", "replace", "fail"], default="append", help="What to do if the table exists.")
+
     # Execute Natural Language Query (Placeholder)
     parser_nl = subparsers.add_parser("exec-nl", help="Execute a query described in natural language (via LLM). 🗣️➡️📊")
     parser_nl.add_argument("natural_language_prompt", help="The natural language query.")
@@ -52,8 +61,15 @@ def main():
         print(f"{Color.red('Error:')} Database file not found: {args.db_file} 🤷‍♀️")
         return
 
+    agent = None
     try:
-        agent = SQLiteAgent(filename=args.db_file, write_access=args.allow_writes, debug=args.debug)
+        agent = SQLiteAgent(
+            filename=args.db_file,
+            write_access=args.allow_writes,
+            debug=args.debug,
+            # exec-nl translations survive across runs: same question => no LLM call.
+            nl_cache_path=f"{args.db_file}.nl_cache.json",
+        )
 
         if args.command == "list-tables":
             tables = agent.list_tables()
@@ -85,7 +101,7 @@ def main():
             #print(full_schema_data)
             # Pass the Color class itself to the function
             #print_database_schema(full_schema_data, Color)
-            database_details = agent.get_database_details()
+            database_details = agent.get_database_details(exact_counts=args.exact_counts)
             # Pass the new structure and the Color class to the updated print function
             print_database_schema(database_details, Color)
 
@@ -107,6 +123,15 @@ def main():
             print(f"{Color.green('-------------')}")
 
 
+        elif args.command == "import-file":
+            print(f"{Color.yellow('Importing:')} {args.file_path} -> {args.table_name}")
+            stats = agent.import_file(args.file_path, args.table_name, file_format=args.format, if_exists=args.if_exists)
+            print(f"{Color.green('Imported')} {stats['rows']} rows in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec) 📥")
+            if stats['added_columns']:
+                print(f"{Color.yellow('Added columns (first seen after the sample):')} {stats['added_columns']}")
+            if stats['ignored_columns']:
+                print(f"{Color.yellow('Ignored columns (not in table):')} {stats['ignored_columns']}")
+
         elif args.command == "exec-nl":
             print(f"{Color.yellow('Processing Natural Language Query:')} {args.natural_language_prompt}")
             results = agent.execute_natural_language_query(args.natural_language_prompt)
@@ -132,6 +157,13 @@ def main():
         if args.debug:
             import traceback
             traceback.print_exc() # Show stack trace if in debug mode
+    finally:
+        if agent is not None:
+            if args.pool_stats:
+                print(f"{Color.bold('Connection pool stats:')} {agent.get_pool_stats()}")
+                if args.command == "exec-nl":
+                    print(f"{Color.bold('NL->SQL cache stats:')} {agent.get_nl_cache_stats()}")
+            agent.close()
 
 if __name__ == "__main__":
     #print(Color.blue("Ciao. Qui color funge."))
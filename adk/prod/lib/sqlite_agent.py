@@ -1,11 +1,34 @@
 # lib/sqlite_agent.py
 import sqlite3
-from typing import List, Dict, Any, Tuple, Optional, Type
+from typing import List, Dict, Any, Tuple, Optional, Type, Iterator
 import re
+import base64
+import hashlib
+import json
 import logging
 import html # Import html for escaping
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager
 
 from .colors import Color # Assuming it's in the same lib folder
+from .sqlite_pool import SQLiteConnectionPool
+from .sqlite_profiles import apply_profile, check_profile, read_pragmas
+from .sqlite_bulk_import import bulk_import
+from .sqlite_nl_cache import NLQueryCache
+from .sqlite_async import DatabaseExecutor, get_executor
+from .sqlite_snapshot import DEFAULT_MAX_BYTES, MemorySnapshot, database_size, mmap_size_for
+from .sqlite_fts import create_fts_index, drop_fts_index, fts_search, list_fts_indexes, route_like_to_match
+from .sqlite_schema_catalog import SchemaCatalog, read_schema_version
+from .sqlite_columnar import RESULT_FORMATS, rows_to_columnar, columnar_to_rows, payload_size_report
+from .sqlite_query_log import SlowQueryLog, QueryWorkload, explain_query_plan, find_full_scans
+from .sqlite_index_advisor import recommend_indexes, replay_workload
+from .sqlite_budget import (
+    STOP_MAX_BYTES, STOP_MAX_ROWS, BudgetedRows, QueryBudget, QueryBudgetExceeded,
+    approx_row_bytes, is_interrupted, statement_timeout, stopped_message,
+)
 
 
 # Configure basic logging
@@ -14,6 +37,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Potentially use your color lib here too for logging if desired
 # from .colors import Color # Assuming it's in the same lib folder
 
+
 class SQLiteAgent:
     """
     An agent to interact with a SQLite3 database, with controlled write access
@@ -23,8 +47,29 @@ class SQLiteAgent:
         r"^\s*(INSERT|UPDATE|DELETE|CREATE|DROP|ALTER|REPLACE)\s+",
         re.IGNORECASE
     )
-
-    def __init__(self, filename: str, write_access: bool = False, debug: bool = False):
+    # Hard cap on a single page returned by execute_sql_paginated (i.e. to the LLM).
+    MAX_PAGE_SIZE: int = 1000
+
+    def __init__(
+        self,
+        filename: str,
+        write_access: bool = False,
+        debug: bool = False,
+        max_readers: int = 4,
+        explain_queries: bool = False,
+        slow_query_ms: Optional[float] = None,
+        slow_query_log_path: Optional[str] = None,
+        query_timeout_seconds: Optional[float] = None,
+        max_result_rows: Optional[int] = None,
+        max_result_bytes: Optional[int] = None,
+        performance_profile: str = "default",
+        nl_cache_path: Optional[str] = None,
+        nl_cache_size: int = 256,
+        fts_routing: bool = False,
+        in_memory: bool = False,
+        in_memory_max_bytes: int = DEFAULT_MAX_BYTES,
+        in_memory_check_seconds: float = 1.0,
+    ):
         """
         Initializes the SQLiteAgent.
 
@@ -33,6 +78,33 @@ class SQLiteAgent:
                             It will be created if it doesn't exist.
             write_access (bool): If True, allows write operations (default: False).
             debug (bool): If True, enable verbose logging.
+            max_readers (int): Max number of pooled read connections (default: 4).
+            explain_queries (bool): If True, run EXPLAIN QUERY PLAN before each read and
+                                    warn about full table scans (default: False).
+            slow_query_ms (float): If set, statements slower than this are appended
+                                   (with their plan) to the slow query log.
+            slow_query_log_path (str): Where to write the slow query log
+                                       (default: '<filename>.slow_queries.jsonl').
+            query_timeout_seconds (float): Default per-statement execution budget: statements
+                                           running longer are interrupted inside SQLite.
+            max_result_rows (int): Default cap on the rows a read can return.
+            max_result_bytes (int): Default cap on the (approximate) size of a read result.
+            performance_profile (str): PRAGMA set applied to every pooled connection:
+                                       'default' (SQLite defaults) or 'fast' (WAL,
+                                       synchronous=NORMAL, mmap, bigger cache, in-memory temp store).
+                                       See lib/sqlite_profiles.py.
+            nl_cache_path (str): If set, the natural language -> SQL translation cache is
+                                 persisted to this JSON file (default: in memory only).
+            nl_cache_size (int): Max cached translations (LRU).
+            fts_routing (bool): If True, `col LIKE '%word%'` predicates on full-text indexed
+                                columns are narrowed by FTS5 MATCH lookups (token based).
+                                Infix matches ('%mini%' in 'Gemini') are lost: see route_like_to_match().
+            in_memory (bool): Read-only agents only. If True, reads run on an in-memory copy of
+                              the database (reloaded when the file changes), or on a fully
+                              memory-mapped file if it is bigger than `in_memory_max_bytes`.
+                              See lib/sqlite_snapshot.py.
+            in_memory_max_bytes (int): Size above which the file is memory-mapped instead of copied.
+            in_memory_check_seconds (float): Min seconds between two checks for file changes.
         """
         if not isinstance(filename, str) or not filename:
             raise ValueError("Database filename must be a non-empty string. 🤔")
@@ -40,6 +112,54 @@ class SQLiteAgent:
         self.db_filename: str = filename
         self.allow_writes: bool = write_access
         self.debug: bool = debug
+        self.performance_profile: str = check_profile(performance_profile)
+        if in_memory and write_access:
+            raise ValueError("in_memory is for read-only agents: writes would be lost with the copy. 🤔")
+        # Read-only hot path: 'memory' (RAM copy), 'mmap' (too big to copy) or 'file'.
+        self.storage_mode: str = "file"
+        self._snapshot: Optional[MemorySnapshot] = None
+        self._mmap_size: Optional[int] = None
+        if in_memory:
+            if database_size(filename) <= in_memory_max_bytes:
+                try:
+                    self._snapshot = MemorySnapshot(filename, check_interval=in_memory_check_seconds)
+                except sqlite3.Error as e:
+                    logging.error(f"Failed to load database '{filename}' in memory: {e}")
+                    raise ConnectionError(f"Could not load database [{filename}] in memory: {e}") from e
+                self.storage_mode = "memory"
+            else:
+                self._mmap_size = mmap_size_for(filename)
+                self.storage_mode = "mmap"
+        # One pool per agent: connections are reused across tool calls.
+        self._pool = SQLiteConnectionPool(
+            filename,
+            max_readers=max_readers,
+            timeout=10,
+            on_connect=self._on_connect,
+            database=self._snapshot.uri if self._snapshot else None,
+            uri=self._snapshot is not None,
+        )
+        if self._snapshot is not None:
+            self._snapshot.on_reload = lambda uri: self._pool.retarget(uri, uri=True)
+        # Schema is cached in memory, and rebuilt only when PRAGMA schema_version changes.
+        self._catalog: Optional[SchemaCatalog] = None
+        self._catalog_lock = threading.Lock()
+        self._catalog_hits: int = 0
+        self._catalog_rebuilds: int = 0
+        # Query plan inspection and slow query log (both optional).
+        self.explain_queries: bool = explain_queries
+        self.slow_query_log: Optional[SlowQueryLog] = None
+        if slow_query_ms is not None:
+            self.slow_query_log = SlowQueryLog(slow_query_log_path or f"{filename}.slow_queries.jsonl", threshold_ms=slow_query_ms)
+        # Default execution budget for every statement (overridable per call).
+        self.query_budget = QueryBudget(query_timeout_seconds, max_result_rows, max_result_bytes)
+        # Natural language -> SQL translations, so repeated questions skip the LLM.
+        self.nl_cache = NLQueryCache(max_entries=nl_cache_size, path=nl_cache_path)
+        # Full-text indexes (lib/sqlite_fts.py), cached per schema_version for LIKE routing.
+        self.fts_routing: bool = fts_routing
+        self._fts_indexes: Tuple[int, Dict[str, Dict[str, Any]]] = (-1, {})
+        # Every read statement (sql + params, calls, total time): input for the index advisor.
+        self._workload = QueryWorkload()
 
         if self.debug:
             logging.getLogger().setLevel(logging.DEBUG)
@@ -47,29 +167,183 @@ class SQLiteAgent:
 
         logging.info(f"Agent initialized for database: {self.db_filename}")
         logging.info(f"Write access: {'ENABLED ✅' if self.allow_writes else 'DISABLED ❌'}")
+        logging.info(f"Performance profile: {self.performance_profile}")
+        if self.storage_mode != "file":
+            logging.info(f"Storage mode: {self.storage_mode}")
 
         # Test connection on init to catch immediate issues like permissions
+        # (the writer, with write access: it sets the profile journal_mode for the readers too).
         try:
-            with self._connect() as conn:
+            with self._connect(write=self.allow_writes) as conn:
                 logging.debug(f"Successfully connected to {self.db_filename} for initial check.")
                 pass # Just check if connection works
         except sqlite3.Error as e:
             logging.error(f"Failed to connect to database '{self.db_filename}' on init: {e}")
             raise ConnectionError(f"Could not connect to database [{self.db_filename}]: {e}") from e
 
-    def _connect(self) -> sqlite3.Connection:
-        """Establishes a connection to the SQLite database."""
-        try:
-            # isolation_level=None means autocommit mode for writes outside transactions
-            # Using a context manager (`with`) handles commit/rollback implicitly for transactions
-            conn = sqlite3.connect(self.db_filename, timeout=10) # Add a timeout
-            # Return rows as dictionary-like objects
-            conn.row_factory = sqlite3.Row
-            logging.debug(f"Opened connection to {self.db_filename}")
-            return conn
-        except sqlite3.Error as e:
-            logging.error(f"SQLite connection error to {self.db_filename}: {e}")
-            raise
+    def _connect(self, write: bool = False) -> AbstractContextManager[sqlite3.Connection]:
+        """
+        Borrows a pooled connection to the SQLite database.
+
+        Use it as `with self._connect() as conn:`. Commit/rollback is handled on exit,
+        and the connection goes back to the pool instead of being closed.
+        In 'memory' storage mode, reads first reload the copy if the file changed.
+        """
+        if not write and self._snapshot is not None:
+            self._snapshot.refresh_if_stale()
+        return self._pool.connection(write=write)
+
+    def _on_connect(self, conn: sqlite3.Connection, write: bool = False):
+        """
+        Per connection setup: performance profile PRAGMAs, plus the mapping in 'mmap' mode.
+        Only the writer of an agent with write access may change the file (journal_mode).
+        """
+        apply_profile(conn, self.performance_profile, writer=write and self.allow_writes and self.storage_mode == "file")
+        if self._mmap_size is not None:
+            conn.execute(f"PRAGMA mmap_size = {self._mmap_size};").fetchall()
+
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """Storage mode ('file', 'memory' or 'mmap'), plus in-memory copy size / reloads in 'memory' mode."""
+        stats: Dict[str, Any] = {'storage_mode': self.storage_mode, 'file_bytes': database_size(self.db_filename)}
+        if self._snapshot is not None:
+            stats.update(self._snapshot.stats())
+        if self._mmap_size is not None:
+            stats['mmap_size'] = self._mmap_size
+        return stats
+
+    def reload_snapshot(self) -> Dict[str, Any]:
+        """Reloads the in-memory copy now, whether the file changed or not ('memory' mode only)."""
+        if self._snapshot is None:
+            raise ValueError(f"No in-memory copy to reload (storage mode: {self.storage_mode}). 🤔")
+        self._snapshot.refresh_if_stale(force=True)
+        return self.get_storage_stats()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Returns connection pool hits/misses and wait time."""
+        return self._pool.stats()
+
+    def get_pragmas(self) -> Dict[str, Any]:
+        """Returns the effective PRAGMAs (journal_mode, synchronous, cache...) of a pooled connection."""
+        with self._connect() as conn:
+            return {'performance_profile': self.performance_profile, **read_pragmas(conn)}
+
+    def cancel_running_queries(self) -> int:
+        """Interrupts every statement currently running on this agent's connections (from any thread)."""
+        return self._pool.interrupt_all()
+
+    # --- Async facade: same methods, run on the per-database executor (see lib/sqlite_async.py) ---
+
+    @property
+    def executor(self) -> DatabaseExecutor:
+        """The thread pool async calls run on: one per DB file, sized like the connection pool (+ the writer)."""
+        return get_executor(self.db_filename, max_workers=self._pool.max_readers + 1)
+
+    def get_executor_stats(self) -> Dict[str, Any]:
+        """Returns async executor queue depth, running calls and average queue wait."""
+        return self.executor.stats()
+
+    async def aexecute_sql(self, *args, **kwargs) -> List[Dict[str, Any]] | Dict[str, Any] | str:
+        """Async execute_sql(): does not block the event loop."""
+        return await self.executor.run(self.execute_sql, *args, **kwargs)
+
+    async def aexecute_sql_paginated(self, *args, **kwargs) -> Dict[str, Any]:
+        """Async execute_sql_paginated()."""
+        return await self.executor.run(self.execute_sql_paginated, *args, **kwargs)
+
+    async def aexecute_natural_language_query(self, nl_query: str) -> List[Dict[str, Any]] | str:
+        """Async execute_natural_language_query()."""
+        return await self.executor.run(self.execute_natural_language_query, nl_query)
+
+    async def alist_tables(self) -> List[str]:
+        """Async list_tables()."""
+        return await self.executor.run(self.list_tables)
+
+    async def aget_table_schema(self, table_name: str) -> Dict[str, str]:
+        """Async get_table_schema()."""
+        return await self.executor.run(self.get_table_schema, table_name)
+
+    async def aget_full_schema(self) -> Dict[str, Dict[str, str]]:
+        """Async get_full_schema()."""
+        return await self.executor.run(self.get_full_schema)
+
+    async def aget_database_details(self, *args, **kwargs) -> Dict[str, Any]:
+        """Async get_database_details()."""
+        return await self.executor.run(self.get_database_details, *args, **kwargs)
+
+    async def aexplain(self, sql_query: str, params: Tuple = ()) -> Dict[str, Any]:
+        """Async explain()."""
+        return await self.executor.run(self.explain, sql_query, params)
+
+    async def aadvise_indexes(self, *args, **kwargs) -> Dict[str, Any]:
+        """Async advise_indexes()."""
+        return await self.executor.run(self.advise_indexes, *args, **kwargs)
+
+    async def asearch_text(self, *args, **kwargs) -> Dict[str, Any]:
+        """Async search_text()."""
+        return await self.executor.run(self.search_text, *args, **kwargs)
+
+    async def acreate_fts_index(self, *args, **kwargs) -> Dict[str, Any]:
+        """Async create_fts_index()."""
+        return await self.executor.run(self.create_fts_index, *args, **kwargs)
+
+    async def aimport_file(self, *args, **kwargs) -> Dict[str, Any]:
+        """Async import_file()."""
+        return await self.executor.run(self.import_file, *args, **kwargs)
+
+    async def aget_fts_indexes(self) -> Dict[str, Dict[str, Any]]:
+        """Async get_fts_indexes()."""
+        return await self.executor.run(self.get_fts_indexes)
+
+    async def aget_schema_catalog(self, force_refresh: bool = False) -> SchemaCatalog:
+        """Async get_schema_catalog()."""
+        return await self.executor.run(self.get_schema_catalog, force_refresh)
+
+    async def aget_slow_queries(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Async get_slow_queries() (reads the JSONL log from disk)."""
+        return await self.executor.run(self.get_slow_queries, limit)
+
+    async def aget_pragmas(self) -> Dict[str, Any]:
+        """Async get_pragmas()."""
+        return await self.executor.run(self.get_pragmas)
+
+    def close(self):
+        """Closes all pooled connections (and the in-memory copy, if any)."""
+        self._pool.close()
+        if self._snapshot is not None:
+            self._snapshot.close()
+
+    def get_schema_catalog(self, force_refresh: bool = False) -> SchemaCatalog:
+        """
+        Returns the in-memory schema catalog, rebuilding it (in one pass) only if
+        the schema changed since last time, or if `force_refresh` is True.
+
+        Checking for changes costs a single `PRAGMA schema_version` on a pooled connection.
+        """
+        with self._connect() as conn:
+            schema_version = read_schema_version(conn)
+            with self._catalog_lock:
+                catalog = self._catalog
+                if not force_refresh and catalog is not None and catalog.schema_version == schema_version:
+                    self._catalog_hits += 1
+                    return catalog
+                logging.debug(f"(Re)building schema catalog (schema_version={schema_version}).")
+                catalog = SchemaCatalog.load(conn)
+                self._catalog = catalog
+                self._catalog_rebuilds += 1
+                logging.info(f"Schema catalog built: {len(catalog.tables)} table(s), schema_version={catalog.schema_version}")
+                return catalog
+
+    def get_schema_catalog_stats(self) -> Dict[str, Any]:
+        """Returns schema catalog cache hits/rebuilds."""
+        with self._catalog_lock:
+            catalog = self._catalog
+            return {
+                'hits': self._catalog_hits,
+                'rebuilds': self._catalog_rebuilds,
+                'schema_version': catalog.schema_version if catalog else None,
+                'fingerprint': catalog.fingerprint if catalog else None,
+                'tables': len(catalog.tables) if catalog else 0,
+            }
 
     def _is_write_query(self, sql_query: str) -> bool:
         """Checks if the SQL query performs a write operation."""
@@ -78,15 +352,10 @@ class SQLiteAgent:
     def list_tables(self) -> List[str]:
         """Lists all user-defined tables in the database."""
         logging.debug("Attempting to list tables.")
-        query = "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
         tables: List[str] = []
         try:
-            with self._connect() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query)
-                results = cursor.fetchall()
-                tables = [row['name'] for row in results]
-                logging.info(f"Found {len(tables)} tables: {tables}")
+            tables = self.get_schema_catalog().table_names()
+            logging.info(f"Found {len(tables)} tables: {tables}")
         except sqlite3.Error as e:
             logging.error(f"Error listing tables: {e}")
             # Decide if you want to raise or return empty list
@@ -110,41 +379,51 @@ class SQLiteAgent:
              return {}
 
         logging.debug(f"Attempting to get schema for table: {table_name}")
-        query = f"PRAGMA table_info({table_name});" # PRAGMA doesn't support placeholders
         schema: Dict[str, str] = {}
         try:
-            with self._connect() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query)
-                results = cursor.fetchall()
-                if not results:
-                     logging.warning(f"Table '{table_name}' not found or has no columns.")
-                     return {}
-                # Column info: cid, name, type, notnull, dflt_value, pk
-                schema = {row['name']: row['type'] for row in results}
-                logging.info(f"Schema for '{table_name}': {schema}")
+            schema = self.get_schema_catalog().table_schema(table_name)
+            if not schema:
+                 logging.warning(f"Table '{table_name}' not found or has no columns.")
+                 return {}
+            logging.info(f"Schema for '{table_name}': {schema}")
         except sqlite3.Error as e:
             logging.error(f"Error getting schema for table '{table_name}': {e}")
             # raise # Or return {}
         return schema
 
-    def execute_sql(self, sql_query: str, params: Tuple = ()) -> List[Dict[str, Any]] | str:
+    def execute_sql(
+        self,
+        sql_query: str,
+        params: Tuple = (),
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None,
+    ) -> List[Dict[str, Any]] | Dict[str, Any] | str:
         """
         Executes a given SQL query string.
 
         Args:
             sql_query (str): The SQL query to execute.
             params (Tuple): Optional parameters to pass to the query for safety.
+            result_format (str): 'rows' (List[Dict], default) or 'columnar' (column names
+                                 once + one value list per column, see lib/sqlite_columnar.py).
+            budget (QueryBudget): Timeout / row / byte limits for this statement
+                                  (default: the agent's query_budget).
 
         Returns:
-            List[Dict[str, Any]] | str: A list of dictionaries for SELECT results,
+            List[Dict[str, Any]] | Dict[str, Any] | str: A list of dictionaries for SELECT results
+                                         (or a columnar dict if result_format='columnar'),
                                          or a status message string for other operations.
 
         Raises:
             PermissionError: If a write operation is attempted and write_access is False.
+            ValueError: If result_format is unknown.
+            QueryBudgetExceeded: If the statement was stopped by its budget or cancelled
+                                 (the rows fetched so far are in the exception).
             sqlite3.Error: If there's an issue executing the query.
         """
         logging.debug(f"Attempting to execute SQL: {sql_query[:100]}..." + (" (with params)" if params else ""))
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result_format '{result_format}', use one of {RESULT_FORMATS}. 🤔")
 
         is_write = self._is_write_query(sql_query)
 
@@ -152,32 +431,524 @@ class SQLiteAgent:
             logging.warning(f"Blocked write operation (write access disabled): {sql_query[:100]}...")
             raise PermissionError("Write operations are disabled for this agent instance. ⛔️")
 
+        budget = budget or self.query_budget
+        if not is_write:
+            sql_query = self._route_to_fts(sql_query) or sql_query
+        started = time.perf_counter()
         try:
-            with self._connect() as conn:
-                cursor = conn.cursor()
-                logging.debug(f"Executing with params: {params}")
-                cursor.execute(sql_query, params)
-
-                if is_write:
-                    # No need to explicitly call conn.commit() here,
-                    # the 'with' context manager handles it on successful exit.
-                    rowcount = cursor.rowcount
-                    logging.info(f"Write operation successful. Rows affected: {rowcount}")
-                    return f"Write operation successful. Rows affected: {rowcount} 👍"
-                else:
-                    # Assuming it's a SELECT or similar if not a write
-                    results = cursor.fetchall()
-                    # Convert sqlite3.Row objects to standard dicts
-                    dict_results = [dict(row) for row in results]
-                    logging.info(f"Read operation successful. Fetched {len(dict_results)} rows.")
-                    logging.debug(f"First few results: {dict_results[:3]}")
-                    return dict_results
-
+            with self._connect(write=is_write) as conn:
+                plan = self._explain_read(conn, sql_query, params) if not is_write else None
+                fetched: Optional[BudgetedRows] = None
+                with statement_timeout(conn, budget.timeout_seconds):
+                    cursor = conn.cursor()
+                    logging.debug(f"Executing with params: {params}")
+                    started = time.perf_counter()
+                    cursor.execute(sql_query, params)
+
+                    if is_write:
+                        # No need to explicitly call conn.commit() here,
+                        # the 'with' context manager handles it on successful exit.
+                        rowcount = cursor.rowcount
+                        logging.info(f"Write operation successful. Rows affected: {rowcount}")
+                        result = f"Write operation successful. Rows affected: {rowcount} 👍"
+                    elif result_format == "columnar":
+                        # Transposed straight from the cursor: no per-row dict, column names sent once.
+                        columns = [col[0] for col in cursor.description] if cursor.description else []
+                        fetched = BudgetedRows(cursor, budget, started)
+                        columnar = rows_to_columnar(columns, fetched)
+                        columnar['payload_bytes'] = payload_size_report(columnar)
+                        logging.info(f"Read operation successful. Fetched {columnar['row_count']} rows (columnar, {columnar['payload_bytes']['saved_pct']}% smaller).")
+                        rowcount = columnar['row_count']
+                        result = columnar
+                    else:
+                        # Assuming it's a SELECT or similar if not a write
+                        columns = [col[0] for col in cursor.description] if cursor.description else []
+                        fetched = BudgetedRows(cursor, budget, started)
+                        # Convert sqlite3.Row objects to standard dicts
+                        dict_results = [dict(row) for row in fetched]
+                        logging.info(f"Read operation successful. Fetched {len(dict_results)} rows.")
+                        logging.debug(f"First few results: {dict_results[:3]}")
+                        rowcount = len(dict_results)
+                        result = dict_results
+
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                # A statement the budget stopped did not run its course: its time says nothing to the advisor.
+                if fetched is None or not fetched.stopped_reason:
+                    self._record_statement(sql_query, params, elapsed_ms, rowcount, plan, conn)
+
+            if fetched is not None and fetched.stopped_reason:
+                rows = columnar_to_rows(result) if result_format == "columnar" else result
+                raise QueryBudgetExceeded(fetched.stopped_reason, budget, columns, rows, elapsed_ms)
+            return result
+
+        except QueryBudgetExceeded as e:
+            logging.warning(f"⏱️ Partial result ({e.reason}, {len(e.rows)} rows): {sql_query[:100]}")
+            raise
         except sqlite3.Error as e:
+            if is_interrupted(e):
+                # Interrupted before the first row (e.g. sorting a huge join) or during a write (rolled back).
+                reason = budget.interrupt_reason(started)
+                logging.warning(f"⏱️ Statement stopped ({reason}): {sql_query[:100]}")
+                raise QueryBudgetExceeded(reason, budget, elapsed_ms=(time.perf_counter() - started) * 1000) from e
             logging.error(f"Error executing SQL: {sql_query[:100]}... Error: {e}")
             # Re-raise the exception so the caller knows something went wrong
             raise
 
+    def _explain_safely(self, conn: sqlite3.Connection, sql_query: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        """EXPLAIN QUERY PLAN, returning [] for statements that cannot be explained."""
+        try:
+            return explain_query_plan(conn, sql_query, params)
+        except sqlite3.Error as e:
+            logging.debug(f"Could not explain query: {e}")
+            return []
+
+    def _explain_read(self, conn: sqlite3.Connection, sql_query: str, params: Tuple = ()) -> Optional[List[Dict[str, Any]]]:
+        """If explain_queries is on, explains a read before running it and warns on full table scans."""
+        if not self.explain_queries:
+            return None
+        plan = self._explain_safely(conn, sql_query, params)
+        full_scans = find_full_scans(plan)
+        if full_scans:
+            logging.warning(f"🔍 Full table scan on {full_scans} for: {sql_query[:100]}")
+        return plan
+
+    def _record_statement(
+        self,
+        sql_query: str,
+        params: Tuple,
+        duration_ms: float,
+        row_count: int,
+        plan: Optional[List[Dict[str, Any]]] = None,
+        conn: Optional[sqlite3.Connection] = None,
+    ):
+        """Records a read in the workload, and appends the statement to the slow query log if it was over threshold."""
+        logging.debug(f"Statement took {duration_ms:.3f} ms ({row_count} rows).")
+        if not self._is_write_query(sql_query):
+            self._workload.record(sql_query, params, duration_ms)
+        if self.slow_query_log is None or not self.slow_query_log.should_log(duration_ms):
+            return
+        if plan is None:
+            if conn is not None:
+                plan = self._explain_safely(conn, sql_query, params)
+            else:
+                with self._connect() as conn:
+                    plan = self._explain_safely(conn, sql_query, params)
+        try:
+            self.slow_query_log.record(sql_query, params, duration_ms, row_count, plan)
+        except OSError as e:
+            logging.error(f"Could not write to slow query log {self.slow_query_log.path}: {e}")
+
+    def explain(self, sql_query: str, params: Tuple = ()) -> Dict[str, Any]:
+        """
+        Returns the EXPLAIN QUERY PLAN of a query (without running it), and
+        the tables it would read with a full table scan.
+        """
+        with self._connect() as conn:
+            plan = explain_query_plan(conn, sql_query, params)
+        return {
+            'sql': sql_query,
+            'plan': [step['detail'] for step in plan],
+            'full_scans': find_full_scans(plan),
+        }
+
+    def get_slow_queries(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Returns the last `limit` entries of the slow query log ([] if disabled)."""
+        if self.slow_query_log is None:
+            return []
+        return self.slow_query_log.read(limit)
+
+    def get_workload(self, include_slow_log: bool = True) -> List[Dict[str, Any]]:
+        """
+        Returns the recorded read workload ({'sql', 'params', 'calls', 'total_ms'}), most
+        expensive first. Includes the persistent slow query log, so it survives restarts.
+        """
+        merged: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        slow_entries = self.get_slow_queries(limit=1000) if include_slow_log else []
+        for entry in slow_entries:
+            if self._is_write_query(entry['sql']):
+                continue
+            key = (entry['sql'], json.dumps(entry.get('params', []), default=str))
+            merged_entry = merged.setdefault(key, {'sql': entry['sql'], 'params': entry.get('params', []), 'calls': 0, 'total_ms': 0.0})
+            merged_entry['calls'] += 1
+            merged_entry['total_ms'] += entry.get('duration_ms', 0.0)
+        for entry in self._workload.entries():
+            key = (entry['sql'], json.dumps(entry['params'], default=str))
+            # In-memory stats win for statements seen in this process (the slow log only has the slow runs).
+            merged[key] = entry
+        return sorted(merged.values(), key=lambda e: e['total_ms'], reverse=True)
+
+    def advise_indexes(self, apply: bool = False, max_indexes: int = 5, repeat: int = 3) -> Dict[str, Any]:
+        """
+        Index advisor: parses the WHERE / JOIN / ORDER BY columns of the recorded workload
+        and proposes covering indexes, most valuable first.
+
+        Args:
+            apply (bool): If True, create the indexes (needs write access) and replay the
+                          affected queries before and after, to measure the gain.
+            max_indexes (int): Max number of indexes to propose.
+            repeat (int): Replay each query this many times, keeping the best time. Each
+                          run has the agent timeout: a query over it gets None.
+
+        Returns:
+            Dict[str, Any]: {'status', 'workload_size', 'recommendations', 'applied', 'replay'}.
+
+        Raises:
+            PermissionError: If apply is True and write_access is False.
+        """
+        if apply and not self.allow_writes:
+            raise PermissionError("Creating indexes needs write access. Re-run with apply=False to only get advice. ⛔️")
+        workload = self.get_workload()
+        catalog = self.get_schema_catalog()
+        with self._connect() as conn:
+            recommendations = recommend_indexes(conn, catalog, workload, max_indexes=max_indexes)
+        result: Dict[str, Any] = {
+            'status': 'success',
+            'workload_size': len(workload),
+            'recommendations': recommendations,
+            'applied': False,
+            'replay': [],
+        }
+        if not apply or not recommendations:
+            return result
+
+        affected_sql = {sql for rec in recommendations for sql in rec['queries']}
+        # Same time budget as the queries themselves. Slow log entries that took the whole timeout
+        # (logged before stopped statements were left out) would only hit it again: not replayed.
+        timeout_seconds = self.query_budget.timeout_seconds
+        affected = [
+            entry for entry in workload
+            if entry['sql'] in affected_sql
+            and (timeout_seconds is None or entry['total_ms'] / max(entry.get('calls', 1), 1) < timeout_seconds * 1000)
+        ]
+        with self._connect() as conn:
+            before = replay_workload(conn, affected, repeat, timeout_seconds)
+        with self._connect(write=True) as conn:
+            for recommendation in recommendations:
+                logging.info(f"🛠️ Creating index: {recommendation['ddl']}")
+                conn.execute(recommendation['ddl'])
+            conn.execute("PRAGMA optimize;") # refresh planner stats, cheaply
+        with self._connect() as conn:
+            after = replay_workload(conn, affected, repeat, timeout_seconds)
+
+        result['applied'] = True
+        for entry, before_ms, after_ms in zip(affected, before, after):
+            result['replay'].append({
+                'sql': entry['sql'],
+                'before_ms': before_ms,
+                'after_ms': after_ms,
+                'speedup': round(before_ms / after_ms, 2) if before_ms and after_ms else None,
+            })
+        return result
+
+    def _iter_row_batches(
+        self,
+        sql_query: str,
+        params: Tuple = (),
+        batch_size: int = 500,
+        timeout_seconds: Optional[float] = None,
+    ) -> Iterator[Tuple[List[str], List[sqlite3.Row]]]:
+        """
+        Streams a read query in `fetchmany(batch_size)` batches on a pooled read connection.
+
+        Yields (column_names, rows) tuples. The connection is held until the generator
+        is exhausted or closed, then it goes back to the pool. With timeout_seconds,
+        the whole iteration is interrupted (OperationalError('interrupted')) past the deadline.
+        """
+        if self._is_write_query(sql_query):
+            raise PermissionError("Streaming is only supported for read queries. Use execute_sql() for writes. ⛔️")
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1. 🤔")
+
+        logging.debug(f"Streaming SQL: {sql_query[:100]}... (batch_size={batch_size})")
+        try:
+            with self._connect() as conn, statement_timeout(conn, timeout_seconds):
+                cursor = conn.execute(sql_query, params)
+                columns = [col[0] for col in cursor.description] if cursor.description else []
+                try:
+                    while True:
+                        batch = cursor.fetchmany(batch_size)
+                        if not batch:
+                            break
+                        yield columns, batch
+                finally:
+                    cursor.close()
+        except sqlite3.Error as e:
+            if not is_interrupted(e):
+                logging.error(f"Error streaming SQL: {sql_query[:100]}... Error: {e}")
+            raise
+
+    def iter_sql(self, sql_query: str, params: Tuple = (), batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Executes a read query and yields rows (as dicts) one at a time, fetching
+        them from the cursor in batches. Never holds the whole result set in memory.
+
+        Args:
+            sql_query (str): The (read) SQL query to execute.
+            params (Tuple): Optional parameters to pass to the query for safety.
+            batch_size (int): Rows fetched from SQLite per `fetchmany` call.
+
+        Raises:
+            PermissionError: If sql_query is a write operation.
+            sqlite3.Error: If there's an issue executing the query.
+        """
+        for _columns, batch in self._iter_row_batches(sql_query, params, batch_size):
+            for row in batch:
+                yield dict(row)
+
+    @staticmethod
+    def _query_digest(sql_query: str, params: Tuple) -> str:
+        """Short hash binding a continuation token to its query."""
+        return hashlib.sha1(json.dumps([sql_query, list(params)], default=str).encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def _encode_page_token(digest: str, offset: int) -> str:
+        raw = json.dumps({'q': digest, 'o': offset}).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def _decode_page_token(page_token: str, digest: str) -> int:
+        """Returns the offset stored in page_token, checking it belongs to this query."""
+        try:
+            token = json.loads(base64.urlsafe_b64decode(page_token.encode('ascii')))
+            offset = int(token['o'])
+            token_digest = token['q']
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid page_token: {page_token!r} 🤔") from e
+        if token_digest != digest or offset < 0:
+            raise ValueError("page_token does not belong to this query (did the SQL change?). 🤔")
+        return offset
+
+    def execute_sql_paginated(
+        self,
+        sql_query: str,
+        params: Tuple = (),
+        page_size: int = 100,
+        page_token: Optional[str] = None,
+        max_rows: Optional[int] = None,
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None,
+    ) -> Dict[str, Any]:
+        """
+        Executes a SQL query and returns ONE page of results, plus a continuation token.
+
+        The cursor is streamed: rows before the page are skipped batch by batch and rows
+        after it are never fetched, so a `SELECT *` on a huge table costs one page of memory.
+        Write queries are delegated to execute_sql().
+
+        Args:
+            sql_query (str): The SQL query to execute.
+            params (Tuple): Optional parameters to pass to the query for safety.
+            page_size (int): Rows per page (capped to MAX_PAGE_SIZE).
+            page_token (str): Token from a previous call, to get the next page.
+            max_rows (int): Optional cap on the total rows that can be paged through.
+            result_format (str): 'rows' or 'columnar' (the page comes as 'values' instead of 'rows').
+            budget (QueryBudget): Timeout / row / byte limits (default: the agent's query_budget).
+                                  max_bytes caps each page (a smaller page, same next_page_token
+                                  logic); budget.max_rows is used when max_rows is not given.
+
+        Returns:
+            Dict[str, Any]: {'status', 'columns', 'rows', 'row_count', 'offset',
+                             'next_page_token' (None on the last page), 'truncated',
+                             'stopped_reason' (None, 'max_rows', 'max_bytes', 'timeout', 'cancelled')}.
+                            status is 'partial' (with a 'message') if the query was interrupted.
+                            For writes: {'status', 'message'}.
+
+        Raises:
+            PermissionError: If a write operation is attempted and write_access is False.
+            ValueError: If page_token is invalid or belongs to another query.
+            sqlite3.Error: If there's an issue executing the query.
+        """
+        budget = budget or self.query_budget
+        if self._is_write_query(sql_query):
+            try:
+                return {'status': 'success', 'message': self.execute_sql(sql_query, params, budget=budget)}
+            except QueryBudgetExceeded as e:
+                return e.to_dict()
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result_format '{result_format}', use one of {RESULT_FORMATS}. 🤔")
+
+        page_size = max(1, min(page_size, self.MAX_PAGE_SIZE))
+        digest = self._query_digest(sql_query, params)
+        offset = self._decode_page_token(page_token, digest) if page_token else 0
+        # Routed after the digest: page tokens are bound to the SQL as the caller wrote it.
+        routed_sql = self._route_to_fts(sql_query)
+        if routed_sql:
+            sql_query = routed_sql
+        if max_rows is None:
+            max_rows = budget.max_rows
+        limit = page_size
+        if max_rows is not None:
+            limit = max(0, min(page_size, max_rows - offset))
+
+        plan: Optional[List[Dict[str, Any]]] = None
+        if self.explain_queries:
+            with self._connect() as conn:
+                plan = self._explain_read(conn, sql_query, params)
+
+        columns: List[str] = []
+        rows: List[sqlite3.Row] = []
+        skipped = 0
+        has_more = False
+        stopped_reason: Optional[str] = None
+        page_bytes = 0
+        started = time.perf_counter()
+        batches = self._iter_row_batches(sql_query, params, batch_size=page_size + 1, timeout_seconds=budget.timeout_seconds)
+        try:
+            for columns, batch in batches:
+                if skipped + len(batch) <= offset:
+                    skipped += len(batch)
+                    continue
+                start = offset - skipped
+                skipped = offset
+                for row in batch[start:]:
+                    if len(rows) >= limit:
+                        has_more = True
+                        break
+                    if budget.max_bytes is not None:
+                        row_bytes = approx_row_bytes(row)
+                        # Always at least one row per page, or paging could never move forward.
+                        if rows and page_bytes + row_bytes > budget.max_bytes:
+                            has_more = True
+                            stopped_reason = STOP_MAX_BYTES
+                            break
+                        page_bytes += row_bytes
+                    rows.append(row)
+                if has_more:
+                    break
+        except sqlite3.OperationalError as e:
+            if not is_interrupted(e):
+                raise
+            stopped_reason = budget.interrupt_reason(started)
+            logging.warning(f"⏱️ Paginated read stopped ({stopped_reason}) after {len(rows)} rows: {sql_query[:100]}")
+        finally:
+            batches.close() # gives the connection back to the pool right away
+        interrupted = stopped_reason not in (None, STOP_MAX_BYTES)
+        if not interrupted: # its elapsed time is the timeout, not a run time
+            self._record_statement(sql_query, params, (time.perf_counter() - started) * 1000, len(rows), plan)
+
+        next_offset = offset + len(rows)
+        truncated = has_more and max_rows is not None and next_offset >= max_rows
+        if truncated:
+            stopped_reason = STOP_MAX_ROWS
+        # An interrupted query is not resumable as is: the next page would hit the same wall.
+        next_page_token = self._encode_page_token(digest, next_offset) if has_more and not truncated and not interrupted else None
+        logging.info(f"Paginated read: {len(rows)} rows at offset {offset} (more: {has_more}, truncated: {truncated}).")
+        page: Dict[str, Any] = {
+            'status': 'partial' if interrupted else 'success',
+            'columns': columns,
+            'row_count': len(rows),
+            'offset': offset,
+            'next_page_token': next_page_token,
+            'truncated': truncated,
+            'stopped_reason': stopped_reason,
+        }
+        if interrupted:
+            page['message'] = stopped_message(stopped_reason, budget, len(rows))
+        if routed_sql:
+            page['fts_routed_sql'] = routed_sql
+        if plan is not None:
+            page['full_scans'] = find_full_scans(plan)
+        if result_format == "columnar":
+            columnar = rows_to_columnar(columns, rows)
+            page['format'] = 'columnar'
+            page['values'] = columnar['values']
+            page['payload_bytes'] = payload_size_report(columnar)
+        else:
+            page['rows'] = [dict(row) for row in rows]
+        return page
+
+
+    def get_fts_indexes(self) -> Dict[str, Dict[str, Any]]:
+        """Full-text indexed tables: {table: {'fts_table', 'columns'}} (cached until the schema changes)."""
+        schema_version = self.get_schema_catalog().schema_version
+        cached_version, indexes = self._fts_indexes
+        if cached_version != schema_version:
+            with self._connect() as conn:
+                indexes = list_fts_indexes(conn)
+            self._fts_indexes = (schema_version, indexes)
+        return indexes
+
+    def create_fts_index(self, table_name: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Builds (or rebuilds) an FTS5 full-text index on the TEXT columns of a table
+        (or on `columns`), kept in sync with the table by triggers.
+
+        Raises:
+            PermissionError: If write_access is False.
+            ValueError: If the table or columns are unknown.
+        """
+        if not self.allow_writes:
+            raise PermissionError("Building a full-text index needs write access. ⛔️")
+        catalog = self.get_schema_catalog()
+        with self._connect(write=True) as conn:
+            return create_fts_index(conn, catalog, table_name, columns)
+
+    def drop_fts_index(self, table_name: str) -> bool:
+        """Drops the full-text index (and its triggers) of a table. Returns False if there was none."""
+        if not self.allow_writes:
+            raise PermissionError("Dropping a full-text index needs write access. ⛔️")
+        with self._connect(write=True) as conn:
+            return drop_fts_index(conn, table_name)
+
+    def search_text(self, table_name: str, keywords: str, limit: int = 20) -> Dict[str, Any]:
+        """
+        Full-text search on an FTS-indexed table: every keyword must match (prefixes too),
+        best matches first (bm25). Rows come with '_rank' and '_snippet'.
+
+        Raises:
+            ValueError: If the table has no full-text index.
+        """
+        started = time.perf_counter()
+        with self._connect() as conn:
+            rows = fts_search(conn, table_name, keywords, limit=limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logging.info(f"🔎 Full-text search '{keywords}' on {table_name}: {len(rows)} rows in {elapsed_ms:.3f} ms")
+        return {'status': 'success', 'table': table_name, 'keywords': keywords, 'row_count': len(rows), 'rows': rows, 'elapsed_ms': round(elapsed_ms, 3)}
+
+    def _route_to_fts(self, sql_query: str) -> Optional[str]:
+        """If fts_routing is on, returns the query with LIKE '%word%' routed to FTS MATCH (None if unchanged)."""
+        if not self.fts_routing:
+            return None
+        indexes = self.get_fts_indexes()
+        routed = route_like_to_match(sql_query, indexes) if indexes else None
+        if routed:
+            logging.info(f"🔎 Routed LIKE to full-text index: {routed[:200]}")
+        return routed
+
+    def import_file(
+        self,
+        path: str,
+        table_name: str,
+        file_format: Optional[str] = None,
+        if_exists: str = "append",
+        batch_size: int = 10000,
+    ) -> Dict[str, Any]:
+        """
+        Bulk-loads a CSV / TSV / JSONL file into a table (created from the inferred schema
+        if needed), streaming it with executemany in `batch_size`-row transactions.
+        Much faster than one execute_sql INSERT per row.
+
+        Args:
+            path (str): File to import.
+            table_name (str): Destination table.
+            file_format (str): 'csv', 'tsv' or 'jsonl' (default: guessed from the extension).
+            if_exists (str): 'append' (default), 'replace' (drop and recreate) or 'fail'.
+            batch_size (int): Rows per executemany / transaction.
+
+        Returns:
+            Dict[str, Any]: Import stats, including 'rows' and 'rows_per_sec'.
+
+        Raises:
+            PermissionError: If write_access is False.
+            ValueError: If the format, if_exists or the file columns are invalid.
+            FileNotFoundError: If path does not exist.
+        """
+        if not self.allow_writes:
+            raise PermissionError("Bulk import needs write access. ⛔️")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"File to import not found: {path} 🤷")
+        with self._connect(write=True) as conn:
+            return bulk_import(conn, path, table_name, file_format=file_format, if_exists=if_exists, batch_size=batch_size)
 
     def get_full_schema(self) -> Dict[str, Dict[str, str]]:
         """
@@ -192,18 +963,12 @@ class SQLiteAgent:
         logging.info("Attempting to retrieve full database schema.")
         full_schema: Dict[str, Dict[str, str]] = {}
         try:
-            table_names = self.list_tables()
-            if not table_names:
+            # Served from the in-memory catalog: no per-table PRAGMA unless the schema changed.
+            full_schema = self.get_schema_catalog().full_schema()
+            if not full_schema:
                 logging.warning("No tables found in the database.")
                 return {}
 
-            logging.debug(f"Found tables: {table_names}. Fetching schema for each.")
-            for table_name in table_names:
-                # Reuse the existing method to get schema for each table
-                table_schema = self.get_table_schema(table_name)
-                # get_table_schema already handles logging for individual tables
-                full_schema[table_name] = table_schema
-
             logging.info(f"Successfully retrieved schema for {len(full_schema)} table(s).")
             return full_schema
 
@@ -216,43 +981,23 @@ class SQLiteAgent:
     def _get_full_schema_description(self) -> str:
         """Helper to generate a schema description string for the LLM.
         """
-        schema_parts = []
         try:
-            tables = self.list_tables()
-            if not tables:
-                return "The database contains no tables."
-
-            for table in tables:
-                schema = self.get_table_schema(table)
-                if schema:
-                    columns_str = ", ".join([f"{name} ({type})" for name, type in schema.items()])
-                    schema_parts.append(f"Table '{table}': [{columns_str}]")
-                else:
-                    schema_parts.append(f"Table '{table}': (Could not retrieve schema)") # Should not happen if list_tables worked
-            return "\n".join(schema_parts)
+            # Built once per schema version, see SchemaCatalog.description()
+            return self.get_schema_catalog().description()
         except Exception as e:
             logging.error(f"Failed to get full schema description: {e}")
             return f"Error retrieving schema: {e}" # Provide error info to LLM context potentially
 
 
-    def execute_natural_language_query(self, nl_query: str) -> List[Dict[str, Any]] | str:
-        """
-        Takes a natural language query, attempts to convert it to SQL using an LLM
-        (placeholder for now), and executes it.
-
-        Args:
-            nl_query (str): The natural language query.
+    def get_nl_cache_stats(self) -> Dict[str, Any]:
+        """Returns NL -> SQL translation cache hit rate (exact and fuzzy hits)."""
+        return self.nl_cache.stats()
 
-        Returns:
-            List[Dict[str, Any]] | str: The results from execute_sql or an error message.
+    def _generate_sql(self, nl_query: str, schema_description: str) -> str:
+        """
+        Asks the LLM to translate a natural language query into SQL (placeholder for now).
+        Only called on a translation cache miss.
         """
-        logging.info(f"Received natural language query: {nl_query}")
-
-        # 1. Get Schema
-        logging.debug("Fetching full database schema for LLM context.")
-        schema_description = self._get_full_schema_description()
-        logging.debug(f"Schema description:\n{schema_description}")
-
         # 2. Construct Prompt for LLM (e.g., Gemini)
         #    This is where the magic (and potential chaos 🤪) happens!
         prompt = f"""
@@ -301,6 +1046,49 @@ class SQLiteAgent:
 
         print(Color.yellow(f"[SIMULATED LLM RESPONSE] - Received SQL: {generated_sql}\n")) # Use your color lib
         # ** END SIMULATION **
+        return generated_sql
+
+    def execute_natural_language_query(self, nl_query: str) -> List[Dict[str, Any]] | str:
+        """
+        Takes a natural language query, attempts to convert it to SQL using an LLM
+        (placeholder for now), and executes it.
+
+        Translations are cached by (normalized question, schema fingerprint): an exact
+        hit skips the LLM (and the prompt building), a fuzzy hit (same question with
+        different quoted strings / numbers) reuses the cached SQL with bound parameters.
+
+        Args:
+            nl_query (str): The natural language query.
+
+        Returns:
+            List[Dict[str, Any]] | str: The results from execute_sql or an error message.
+
+        Raises:
+            QueryBudgetExceeded: If the SQL (cached or generated) was stopped by its budget.
+                                 A cached translation is not retried: it would just run again.
+        """
+        logging.info(f"Received natural language query: {nl_query}")
+
+        # 1. Get Schema (cached catalog: its fingerprint scopes the translation cache)
+        catalog = self.get_schema_catalog()
+        cached = self.nl_cache.get(nl_query, catalog.fingerprint)
+        if cached is not None:
+            cached_sql, cached_params, hit_type = cached
+            logging.info(f"🎯 NL cache {hit_type} hit: {cached_sql}" + (f" with params {cached_params}" if cached_params else ""))
+            try:
+                return self.execute_sql(cached_sql, cached_params)
+            except QueryBudgetExceeded:
+                raise # slow, not wrong: a new translation would likely be just as slow
+            except sqlite3.Error as e:
+                # Stale or badly templated translation (missing table/column...): forget it, get a fresh one.
+                self.nl_cache.discard(catalog.fingerprint, cached_sql)
+                logging.warning(f"Cached translation failed ({e}), asking the LLM again.")
+
+        logging.debug("Fetching full database schema for LLM context.")
+        schema_description = catalog.description()
+        logging.debug(f"Schema description:\n{schema_description}")
+
+        generated_sql = self._generate_sql(nl_query, schema_description)
 
         if not generated_sql or not isinstance(generated_sql, str) or generated_sql.strip() == "":
             logging.error("LLM did not return a valid SQL query string.")
@@ -312,10 +1100,16 @@ class SQLiteAgent:
         logging.info(f"Executing SQL generated from NL query: {generated_sql}")
         try:
             # The execute_sql method already handles the write access check
-            return self.execute_sql(generated_sql)
+            results = self.execute_sql(generated_sql)
+            # Only reads that ran fine are cached: replaying a cached write would be a surprise.
+            if not self._is_write_query(generated_sql):
+                self.nl_cache.put(nl_query, catalog.fingerprint, generated_sql)
+            return results
         except PermissionError as e:
             logging.error(f"LLM generated a write query, but write access is disabled: {generated_sql}")
             return f"Error: The language model generated a write query ('{generated_sql[:50]}...'), which is not allowed. {e} 🚫"
+        except QueryBudgetExceeded:
+            raise
         except sqlite3.Error as e:
             logging.error(f"Error executing SQL generated by LLM ('{generated_sql[:100]}...'): {e}")
             return f"Error executing the generated SQL: {e}. The generated query might be invalid: '{generated_sql}'"
@@ -325,17 +1119,140 @@ class SQLiteAgent:
 
 
 
-    def get_database_details(self) -> Dict[str, Any]:
+    @staticmethod
+    def _quote_identifier(name: str) -> str:
+        """Quotes a table/column name for SQL (doubling any embedded double quote)."""
+        return '"' + name.replace('"', '""') + '"'
+
+    def _count_rows_exact(self, table_name: str, timeout_seconds: Optional[float]) -> int:
+        """SELECT COUNT(*) on a pooled read connection, aborted after timeout_seconds. Returns -1 on error/timeout."""
+        count_sql = f"SELECT COUNT(*) FROM {self._quote_identifier(table_name)};"
+        try:
+            with self._connect() as conn:
+                with statement_timeout(conn, timeout_seconds):
+                    row_count = conn.execute(count_sql).fetchone()[0]
+            logging.debug(f"Row count for {table_name}: {row_count}")
+            return row_count
+        except sqlite3.OperationalError as e:
+            if is_interrupted(e):
+                logging.warning(f"Counting rows for table '{table_name}' took more than {timeout_seconds}s, giving up. ⏱️")
+            else:
+                logging.error(f"Error counting rows for table '{table_name}': {e}")
+        except sqlite3.Error as e:
+            logging.error(f"Error counting rows for table '{table_name}': {e}")
+        return -1
+
+    def count_rows_exact(self, table_names: List[str], timeout_seconds: Optional[float] = 5.0) -> Dict[str, int]:
+        """
+        Exact row counts (SELECT COUNT(*)), run in parallel on the pooled read connections.
+
+        Args:
+            table_names (List[str]): Tables to count.
+            timeout_seconds (float): Per-table budget. A table over budget gets -1.
+
+        Returns:
+            Dict[str, int]: table name -> row count (-1 if it cannot be determined).
+        """
+        if not table_names:
+            return {}
+        workers = min(len(table_names), self._pool.max_readers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sqlite-count") as executor:
+            counts = executor.map(lambda name: self._count_rows_exact(name, timeout_seconds), table_names)
+            return dict(zip(table_names, counts))
+
+    @staticmethod
+    def _estimate_rows_dbstat(conn: sqlite3.Connection, table_name: str, timeout_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+        """
+        Leaf-page cell count of a table b-tree from `dbstat`, aborted after timeout_seconds
+        ({'rows': -1, 'source': 'unknown'}). None if dbstat is not compiled in.
+        """
+        try:
+            with statement_timeout(conn, timeout_seconds):
+                row = conn.execute(
+                    "SELECT SUM(ncell) FROM dbstat WHERE name = ? AND pagetype = 'leaf';", (table_name,)
+                ).fetchone()
+            # A table with no leaf page at all is simply empty.
+            return {'rows': row[0] or 0, 'source': 'dbstat'}
+        except sqlite3.OperationalError as e:
+            if is_interrupted(e):
+                logging.warning(f"Estimating rows for table '{table_name}' took more than {timeout_seconds}s, giving up. ⏱️")
+                return {'rows': -1, 'source': 'unknown'}
+            logging.debug(f"dbstat not available ({e}).")
+            return None
+
+    def estimate_row_counts(self, table_names: List[str], refresh_stats: bool = False, timeout_seconds: Optional[float] = 5.0) -> Dict[str, Dict[str, Any]]:
+        """
+        Row count estimates, cheap when ANALYZE statistics exist.
+
+        Sources, in order:
+          1. `sqlite_stat1` (written by ANALYZE): O(1), but as fresh as the last ANALYZE.
+          2. `dbstat` leaf-page cell counts: no row decoding, but it still walks every page
+             of the table, i.e. about as much I/O as COUNT(*) on big tables. Bounded by
+             `timeout_seconds` per table: a table over budget is 'unknown' (-1).
+          3. Exact COUNT(*) fallback (same budget), if dbstat is not available.
+
+        Args:
+            table_names (List[str]): Tables to estimate.
+            refresh_stats (bool): If True and write access is enabled, run a sampled
+                                  `ANALYZE` (PRAGMA analysis_limit) first.
+            timeout_seconds (float): Per-table budget for the dbstat / COUNT(*) fallbacks.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: table name -> {'rows': int, 'source': str}.
+        """
+        estimates: Dict[str, Dict[str, Any]] = {}
+        if refresh_stats:
+            if self.allow_writes:
+                with self._connect(write=True) as conn:
+                    conn.execute("PRAGMA analysis_limit=1000;")
+                    conn.execute("ANALYZE;")
+                logging.info("Refreshed sqlite_stat1 with a sampled ANALYZE.")
+            else:
+                logging.warning("refresh_stats ignored: ANALYZE needs write access.")
+
+        with self._connect() as conn:
+            # 1. sqlite_stat1: first integer of 'stat' is the (approximate) row count.
+            try:
+                for tbl, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1;"):
+                    if tbl in table_names and stat:
+                        rows = int(stat.split()[0])
+                        if rows > estimates.get(tbl, {}).get('rows', -1):
+                            estimates[tbl] = {'rows': rows, 'source': 'sqlite_stat1'}
+            except sqlite3.OperationalError:
+                logging.debug("No sqlite_stat1 table (ANALYZE never run).")
+
+            # 2. dbstat: count cells on leaf pages of each table b-tree, one budget per table.
+            for name in [name for name in table_names if name not in estimates]:
+                estimate = self._estimate_rows_dbstat(conn, name, timeout_seconds)
+                if estimate is None:
+                    break # no dbstat at all
+                estimates[name] = estimate
+
+        # 3. Last resort: exact counts.
+        missing = [name for name in table_names if name not in estimates]
+        for name, rows in self.count_rows_exact(missing, timeout_seconds).items():
+            estimates[name] = {'rows': rows, 'source': 'count'}
+        return estimates
+
+    def get_database_details(self, exact_counts: bool = False, count_timeout_seconds: Optional[float] = 5.0) -> Dict[str, Any]:
         """
         Retrieves enhanced details for all tables, including schema and row counts.
 
+        Row counts are ESTIMATED by default (see estimate_row_counts), so this stays
+        fast on multi-GB databases. Exact counts are opt-in and run in parallel.
+
+        Args:
+            exact_counts (bool): If True, run SELECT COUNT(*) on every table (in parallel).
+            count_timeout_seconds (float): Per-table budget for row counts (exact or estimated).
+
         Returns:
             Dict[str, Any]: A dictionary containing 'db_filename' and 'table_details'.
                             'table_details' is a dict mapping table names to their
-                            schema and row count ({'schema': {...}, 'rows': int}).
+                            schema and row count ({'schema': {...}, 'rows': int,
+                            'rows_estimated': bool, 'rows_source': str}).
                             Row count is -1 if it cannot be determined.
         """
-        logging.info("Attempting to retrieve full database details (schema and row counts).")
+        logging.info(f"Attempting to retrieve full database details (schema and {'exact' if exact_counts else 'estimated'} row counts).")
         db_details: Dict[str, Any] = {
             'db_filename': self.db_filename,
             'table_details': {}
@@ -343,54 +1260,29 @@ class SQLiteAgent:
         table_details_dict: Dict[str, Dict[str, Any]] = {}
 
         try:
-            table_names = self.list_tables()
+            catalog = self.get_schema_catalog()
+            table_names = catalog.table_names()
             if not table_names:
                 logging.warning("No tables found in the database.")
                 db_details['table_details'] = {}
                 return db_details
 
             logging.debug(f"Found tables: {table_names}. Fetching details for each.")
-            for table_name in table_names:
-                table_schema = self.get_table_schema(table_name)
-                row_count = -1 # Default to -1 (unknown)
-
-                # --- Get Row Count ---
-                # Basic quoting for table names to handle spaces/keywords, escape quotes within
-                # NOTE: This is basic quoting, might not cover all edge cases.
-                # More robust parsing/quoting might be needed for complex names.
-
-                # when I push to CRun I get this:
-                # f-string expression part cannot include a backslash (sqlite_agent.py, line 361)
-                #quoted_table_name = f'"{table_name.replace("\"", "\"\"")}"'
-                quoted_table_name = f'"{table_name}"'
-                count_sql = f"SELECT COUNT(*) FROM {quoted_table_name};"
-                try:
-                    # Use execute_sql as it handles connection and cursor
-                    # We expect a result like [{'COUNT(*)': 42}]
-                    count_result = self.execute_sql(count_sql)
-                    if isinstance(count_result, list) and count_result:
-                         # The key might vary slightly depending on DB/driver nuances,
-                         # but 'COUNT(*)' is standard for SQLite's default row factory.
-                         # Accessing the first (and only) key of the first row's dict is safer.
-                        first_row = count_result[0]
-                        if first_row:
-                            count_key = list(first_row.keys())[0] # Get the actual key name ('COUNT(*)')
-                            row_count = first_row[count_key]
-                            logging.debug(f"Row count for {table_name}: {row_count}")
-                        else:
-                             logging.warning(f"Could not determine row count for table '{table_name}' - empty row returned.")
-                    else:
-                         logging.warning(f"Could not determine row count for table '{table_name}' - unexpected result from count query: {count_result}")
-
-                except sqlite3.Error as e:
-                    logging.error(f"Error counting rows for table '{table_name}': {e}")
-                except Exception as e:
-                    logging.error(f"Unexpected error counting rows for table '{table_name}': {e}")
-                # --- End Row Count ---
+            if exact_counts:
+                counts = {
+                    name: {'rows': rows, 'source': 'count'}
+                    for name, rows in self.count_rows_exact(table_names, count_timeout_seconds).items()
+                }
+            else:
+                counts = self.estimate_row_counts(table_names, timeout_seconds=count_timeout_seconds)
 
+            for table_name in table_names:
+                count = counts.get(table_name, {'rows': -1, 'source': 'unknown'})
                 table_details_dict[table_name] = {
-                    'schema': table_schema,
-                    'rows': row_count
+                    'schema': catalog.table_schema(table_name),
+                    'rows': count['rows'],
+                    'rows_estimated': count['source'] != 'count',
+                    'rows_source': count['source'],
                 }
 
             db_details['table_details'] = table_details_dict
@@ -406,11 +1298,6 @@ class SQLiteAgent:
 
 
 
-
-
-
-
-
 def print_database_schema(db_details: Dict[str, Any], color_lib: Type[Color]):
     """Takes the enhanced database details and prints a colorful representation."""
     db_filename = db_details.get('db_filename', 'N/A')
@@ -430,6 +1317,8 @@ def print_database_schema(db_details: Dict[str, Any], color_lib: Type[Color]):
         schema = details.get('schema', {})
         rows = details.get('rows', -1) # Get row count, default to -1 if missing
         row_text = f"{rows} rows" if rows >= 0 else "? rows" # Handle -1 or missing rows
+        if rows >= 0 and details.get('rows_estimated'):
+            row_text = f"~{row_text}"
 
         if i > 0:
             print(f"{color_lib.magenta('------------------------')}") # Separator line
@@ -491,6 +1380,8 @@ def database_schema_to_colorful_markdown(db_details: Dict[str, Any]) -> str:
         schema = details.get('schema', {})
         rows = details.get('rows', -1)
         row_text = f"{rows} rows" if rows >= 0 else "? rows"
+        if rows >= 0 and details.get('rows_estimated'):
+            row_text = f"~{row_text}"
 
         if i > 0:
             output_lines.append("\n---\n") # Add more space and separator between tables
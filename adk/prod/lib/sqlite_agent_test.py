@@ -0,0 +1,610 @@
+'''
+Test me:  python -m pytest lib/sqlite_agent_test.py   (from adk/prod/)
+'''
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from lib.sqlite_agent import SQLiteAgent
+from lib.sqlite_budget import QueryBudget, QueryBudgetExceeded
+from lib.sqlite_async import DatabaseExecutor, shutdown_executors
+from lib.sqlite_index_advisor import replay_workload
+from lib.sqlite_columnar import columnar_to_rows, to_typed_columns
+
+
+def _create_sample_db(path: str, n_events: int = 50):
+    """Creates a tiny DB similar to siculo's google_events.sqlite."""
+    agent = SQLiteAgent(filename=path, write_access=True)
+    agent.execute_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+    agent.execute_sql("CREATE TABLE events (id INTEGER PRIMARY KEY, title TEXT, city TEXT, attendees INTEGER)")
+    for i in range(3):
+        agent.execute_sql("INSERT INTO users (name, email) VALUES (?, ?)", (f"user{i}", f"user{i}@example.com"))
+    for i in range(n_events):
+        agent.execute_sql(
+            "INSERT INTO events (title, city, attendees) VALUES (?, ?, ?)",
+            (f"Event {i}", ["Zurich", "Rome", "Catania"][i % 3], i * 10),
+        )
+    agent.close()
+
+
+class TestSQLiteAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp_dir.name, "test.sqlite")
+        _create_sample_db(self.db_file)
+        self.agent = SQLiteAgent(filename=self.db_file)
+
+    def tearDown(self):
+        self.agent.close()
+        shutdown_executors()
+        self.tmp_dir.cleanup()
+
+    def test_basic_reads(self):
+        self.assertEqual(self.agent.list_tables(), ["users", "events"])
+        self.assertEqual(self.agent.get_table_schema("users"), {"id": "INTEGER", "name": "TEXT", "email": "TEXT"})
+        rows = self.agent.execute_sql("SELECT name FROM users ORDER BY id")
+        self.assertEqual(rows, [{"name": "user0"}, {"name": "user1"}, {"name": "user2"}])
+
+    def test_writes_blocked_without_write_access(self):
+        with self.assertRaises(PermissionError):
+            self.agent.execute_sql("DELETE FROM users")
+
+    def test_pool_reuses_connections(self):
+        self.agent.get_database_details()
+        self.agent.execute_sql("SELECT * FROM users")
+        stats = self.agent.get_pool_stats()
+        # One connection opened on init, then reused for every call.
+        self.assertEqual(stats["misses"], 1)
+        self.assertGreaterEqual(stats["hits"], 3)
+        self.assertLessEqual(stats["open_readers"], stats["max_readers"])
+
+    def test_pool_is_bounded_across_threads(self):
+        agent = SQLiteAgent(filename=self.db_file, max_readers=2)
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(20):
+                    agent.execute_sql("SELECT COUNT(*) AS n FROM events")
+            except Exception as e: # pragma: no cover - only on failure
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = agent.get_pool_stats()
+        agent.close()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(stats["misses"], 2)
+        self.assertEqual(stats["hits"] + stats["misses"], 1 + 6 * 20)
+
+    def test_schema_catalog_is_cached_until_schema_changes(self):
+        self.agent.list_tables()
+        self.agent.get_full_schema()
+        self.agent.get_table_schema("events")
+        stats = self.agent.get_schema_catalog_stats()
+        self.assertEqual(stats["rebuilds"], 1)
+        self.assertEqual(stats["hits"], 2)
+
+        # Schema change from another connection/agent is detected via PRAGMA schema_version.
+        writer = SQLiteAgent(filename=self.db_file, write_access=True)
+        writer.execute_sql("ALTER TABLE users ADD COLUMN city TEXT")
+        writer.close()
+        self.assertIn("city", self.agent.get_table_schema("users"))
+        self.assertEqual(self.agent.get_schema_catalog_stats()["rebuilds"], 2)
+
+    def test_schema_description_and_views(self):
+        writer = SQLiteAgent(filename=self.db_file, write_access=True)
+        writer.execute_sql("CREATE VIEW big_events AS SELECT title FROM events WHERE attendees > 100")
+        writer.close()
+        self.assertEqual(self.agent.list_tables(), ["users", "events"])
+        self.assertEqual(self.agent.get_table_schema("big_events"), {"title": "TEXT"})
+        self.assertIn("Table 'events': [id (INTEGER), title (TEXT)", self.agent._get_full_schema_description())
+
+    def test_iter_sql_streams_all_rows(self):
+        titles = [row["title"] for row in self.agent.iter_sql("SELECT title FROM events ORDER BY id", batch_size=7)]
+        self.assertEqual(len(titles), 50)
+        self.assertEqual(titles[:2], ["Event 0", "Event 1"])
+        # Generator gave its connection back to the pool.
+        self.assertEqual(self.agent.get_pool_stats()["idle_readers"], 1)
+        with self.assertRaises(PermissionError):
+            list(self.agent.iter_sql("DELETE FROM events"))
+
+    def test_execute_sql_paginated(self):
+        sql = "SELECT id FROM events ORDER BY id"
+        seen = []
+        page = self.agent.execute_sql_paginated(sql, page_size=20)
+        self.assertEqual(page["columns"], ["id"])
+        while True:
+            seen.extend(row["id"] for row in page["rows"])
+            if not page["next_page_token"]:
+                break
+            page = self.agent.execute_sql_paginated(sql, page_size=20, page_token=page["next_page_token"])
+        self.assertEqual(seen, list(range(1, 51)))
+        self.assertFalse(page["truncated"])
+
+        with self.assertRaises(ValueError):
+            token = self.agent.execute_sql_paginated(sql, page_size=20)["next_page_token"]
+            self.agent.execute_sql_paginated("SELECT * FROM users", page_token=token)
+
+    def test_execute_sql_paginated_max_rows(self):
+        page = self.agent.execute_sql_paginated("SELECT id FROM events", page_size=30, max_rows=45)
+        page = self.agent.execute_sql_paginated("SELECT id FROM events", page_size=30, max_rows=45, page_token=page["next_page_token"])
+        self.assertEqual(page["row_count"], 15)
+        self.assertTrue(page["truncated"])
+        self.assertIsNone(page["next_page_token"])
+
+    def test_database_details_estimated_counts(self):
+        details = self.agent.get_database_details()["table_details"]
+        # No ANALYZE yet: estimates come from dbstat leaf cells (exact for rowid tables).
+        self.assertEqual(details["events"]["rows"], 50)
+        self.assertTrue(details["events"]["rows_estimated"])
+        self.assertEqual(details["events"]["rows_source"], "dbstat")
+
+        writer = SQLiteAgent(filename=self.db_file, write_access=True)
+        writer.execute_sql("CREATE INDEX idx_events_city ON events(city)")
+        writer.estimate_row_counts(["events"], refresh_stats=True)
+        writer.close()
+        estimates = self.agent.estimate_row_counts(["events", "users"])
+        self.assertEqual(estimates["events"], {"rows": 50, "source": "sqlite_stat1"})
+        self.assertEqual(estimates["users"]["rows"], 3)
+
+    def test_database_details_exact_counts(self):
+        details = self.agent.get_database_details(exact_counts=True)["table_details"]
+        self.assertEqual(details["users"]["rows"], 3)
+        self.assertEqual(details["events"]["rows"], 50)
+        self.assertFalse(details["events"]["rows_estimated"])
+
+    def test_exact_count_timeout(self):
+        writer = SQLiteAgent(filename=self.db_file, write_access=True)
+        writer.execute_sql("CREATE VIEW huge AS SELECT 1 FROM events a, events b, events c, events d")
+        writer.close()
+        self.assertEqual(self.agent.count_rows_exact(["huge"], timeout_seconds=0.05), {"huge": -1})
+
+    def test_estimate_timeout(self):
+        writer = SQLiteAgent(filename=self.db_file, write_access=True)
+        writer.execute_sql("CREATE TABLE big AS WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 20000) SELECT i, printf('%.500c', 'x') AS pad FROM n")
+        writer.close()
+        # dbstat walks every page of the table: over budget it gives up, it does not fall back to COUNT(*).
+        self.assertEqual(self.agent.estimate_row_counts(["big"], timeout_seconds=0), {"big": {"rows": -1, "source": "unknown"}})
+        self.assertEqual(self.agent.estimate_row_counts(["big"]), {"big": {"rows": 20000, "source": "dbstat"}})
+
+    def test_columnar_results(self):
+        sql = "SELECT id, title, city FROM events ORDER BY id"
+        columnar = self.agent.execute_sql(sql, result_format="columnar")
+        self.assertEqual(columnar["columns"], ["id", "title", "city"])
+        self.assertEqual(columnar["values"][0], list(range(1, 51)))
+        self.assertEqual(columnar_to_rows(columnar), self.agent.execute_sql(sql))
+
+        report = columnar["payload_bytes"]
+        rows_json = json.dumps(self.agent.execute_sql(sql))
+        self.assertEqual(report["rows_json_bytes"], len(rows_json))
+        self.assertLess(report["columnar_json_bytes"], report["rows_json_bytes"])
+
+        page = self.agent.execute_sql_paginated(sql, page_size=10, result_format="columnar")
+        self.assertEqual(page["values"][1][:2], ["Event 0", "Event 1"])
+        self.assertNotIn("rows", page)
+        with self.assertRaises(ValueError):
+            self.agent.execute_sql(sql, result_format="parquet")
+
+    def test_typed_columns(self):
+        columnar = self.agent.execute_sql("SELECT id, attendees, city FROM events", result_format="columnar")
+        typed = to_typed_columns(columnar)
+        self.assertEqual(typed["values"][0].typecode, "q")
+        self.assertIsInstance(typed["values"][2], list)
+
+    def test_explain_flags_full_scans(self):
+        plan = self.agent.explain("SELECT * FROM events WHERE city = 'Rome'")
+        self.assertEqual(plan["full_scans"], ["events"])
+        plan = self.agent.explain("SELECT * FROM events WHERE id = 3")
+        self.assertEqual(plan["full_scans"], [])
+
+    def test_slow_query_log(self):
+        log_path = os.path.join(self.tmp_dir.name, "slow.jsonl")
+        agent = SQLiteAgent(filename=self.db_file, explain_queries=True, slow_query_ms=0, slow_query_log_path=log_path)
+        agent.execute_sql("SELECT * FROM events WHERE city = ?", ("Rome",))
+        page = agent.execute_sql_paginated("SELECT * FROM events WHERE city = 'Zurich'")
+        self.assertEqual(page["full_scans"], ["events"])
+        agent.close()
+
+        # Persistent: a new agent on the same log sees the entries.
+        agent = SQLiteAgent(filename=self.db_file, slow_query_ms=1000, slow_query_log_path=log_path)
+        slow = agent.get_slow_queries()
+        agent.close()
+        self.assertEqual(len(slow), 2)
+        self.assertEqual(slow[0]["params"], ["Rome"])
+        self.assertEqual(slow[0]["full_scans"], ["events"])
+        self.assertEqual(self.agent.get_slow_queries(), [])
+
+    def test_index_advisor(self):
+        agent = SQLiteAgent(filename=self.db_file, write_access=True)
+        for city in ("Rome", "Zurich", "Rome"):
+            agent.execute_sql("SELECT title FROM events WHERE city = ? ORDER BY attendees", (city,))
+        agent.execute_sql("SELECT * FROM users WHERE id = 1") # already served by the rowid
+        self.assertEqual(len(agent.get_workload()), 3)
+
+        advice = agent.advise_indexes()
+        self.assertEqual(len(advice["recommendations"]), 1)
+        recommendation = advice["recommendations"][0]
+        self.assertEqual(recommendation["table"], "events")
+        self.assertEqual(recommendation["columns"], ["city", "attendees", "title"])
+        self.assertEqual(recommendation["calls"], 3)
+
+        with self.assertRaises(PermissionError):
+            self.agent.advise_indexes(apply=True)
+
+        applied = agent.advise_indexes(apply=True, repeat=1)
+        self.assertTrue(applied["applied"])
+        self.assertEqual(len(applied["replay"]), 2)
+        self.assertEqual(agent.explain("SELECT title FROM events WHERE city = 'Rome'")["full_scans"], [])
+        # Once created, the index is not proposed again.
+        self.assertEqual(agent.advise_indexes()["recommendations"], [])
+        agent.close()
+
+    def test_index_advisor_quotes_identifiers(self):
+        agent = SQLiteAgent(filename=self.db_file, write_access=True)
+        agent.execute_sql('CREATE TABLE "odd ""name" ("ci""ty" TEXT, n INTEGER)')
+        agent.execute_sql('SELECT n FROM "odd ""name" WHERE "ci""ty" = ?', ("Rome",))
+        applied = agent.advise_indexes(apply=True, repeat=1)
+        self.assertEqual(applied["recommendations"][0]["index_name"], "idx_odd_name_ci_ty_n")
+        self.assertTrue(applied["applied"])
+        self.assertEqual(agent.advise_indexes()["recommendations"], [])
+        agent.close()
+
+    def test_index_advisor_replay_timeout(self):
+        self._create_huge_view()
+        started = time.perf_counter()
+        with self.agent._connect() as conn:
+            timings = replay_workload(conn, [{"sql": "SELECT * FROM huge WHERE a = 1"}, {"sql": "SELECT id FROM users"}], repeat=3, timeout_seconds=0.1)
+        self.assertIsNone(timings[0])
+        self.assertIsNotNone(timings[1])
+        self.assertLess(time.perf_counter() - started, 2)
+
+    def _create_huge_view(self):
+        writer = SQLiteAgent(filename=self.db_file, write_access=True)
+        writer.execute_sql("CREATE VIEW huge AS SELECT a.id AS a, b.id AS b, c.id AS c, d.id AS d FROM events a, events b, events c, events d")
+        writer.close()
+
+    def test_statement_timeout(self):
+        self._create_huge_view()
+        budget = QueryBudget(timeout_seconds=0.1)
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            self.agent.execute_sql("SELECT COUNT(*) FROM huge, events", budget=budget)
+        self.assertEqual(ctx.exception.reason, "timeout")
+
+        # Streaming: rows fetched before the deadline come back as a partial result.
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            self.agent.execute_sql("SELECT * FROM huge", budget=budget)
+        self.assertGreater(len(ctx.exception.rows), 0)
+
+        page = self.agent.execute_sql_paginated("SELECT * FROM huge ORDER BY a + b DESC", budget=budget)
+        self.assertEqual(page["status"], "partial")
+        self.assertEqual(page["stopped_reason"], "timeout")
+        self.assertIsNone(page["next_page_token"])
+        # Stopped statements are not recorded: the index advisor must not rank them by their timeout.
+        self.assertEqual([e["sql"] for e in self.agent.get_workload() if "huge" in e["sql"]], [])
+        # The pooled connection is still usable afterwards.
+        self.assertEqual(self.agent.execute_sql("SELECT COUNT(*) AS n FROM users"), [{"n": 3}])
+
+    def test_row_and_byte_caps(self):
+        agent = SQLiteAgent(filename=self.db_file, max_result_rows=10)
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            agent.execute_sql("SELECT id FROM events ORDER BY id")
+        self.assertEqual(ctx.exception.reason, "max_rows")
+        self.assertEqual([row["id"] for row in ctx.exception.rows], list(range(1, 11)))
+        self.assertEqual(len(agent.execute_sql("SELECT id FROM events LIMIT 10")), 10)
+        page = agent.execute_sql_paginated("SELECT id FROM events", page_size=8)
+        page = agent.execute_sql_paginated("SELECT id FROM events", page_size=8, page_token=page["next_page_token"])
+        self.assertEqual((page["row_count"], page["truncated"], page["stopped_reason"]), (2, True, "max_rows"))
+        agent.close()
+
+        # Byte cap: smaller pages, but paging still reaches every row.
+        budget = QueryBudget(max_bytes=200)
+        seen, pages = 0, 0
+        page = self.agent.execute_sql_paginated("SELECT title FROM events", page_size=50, budget=budget)
+        while True:
+            seen, pages = seen + page["row_count"], pages + 1
+            if not page["next_page_token"]:
+                break
+            self.assertEqual(page["stopped_reason"], "max_bytes")
+            page = self.agent.execute_sql_paginated("SELECT title FROM events", page_size=50, page_token=page["next_page_token"], budget=budget)
+        self.assertEqual(seen, 50)
+        self.assertGreater(pages, 1)
+
+    def test_cancel_running_queries(self):
+        self._create_huge_view()
+        result = {}
+
+        def worker():
+            result["page"] = self.agent.execute_sql_paginated("SELECT COUNT(*) FROM huge, events")
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while self.agent.get_pool_stats()["borrowed"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1) # let the statement start
+        self.assertEqual(self.agent.cancel_running_queries(), 1)
+        thread.join(timeout=5)
+        self.assertEqual(result["page"]["status"], "partial")
+        self.assertEqual(result["page"]["stopped_reason"], "cancelled")
+
+    def test_performance_profiles(self):
+        self.assertEqual(self.agent.get_pragmas()["journal_mode"], "delete")
+        agent = SQLiteAgent(filename=self.db_file, write_access=True, performance_profile="fast")
+        pragmas = agent.get_pragmas()
+        self.assertEqual(pragmas["journal_mode"], "wal")
+        self.assertEqual(pragmas["synchronous"], 1) # NORMAL
+        self.assertEqual(pragmas["temp_store"], 2) # MEMORY
+        self.assertEqual(pragmas["cache_size"], -65536)
+        # WAL: a reader is not blocked by an open write transaction.
+        with agent._connect(write=True) as conn:
+            conn.execute("INSERT INTO users (name) VALUES ('writer')")
+            self.assertEqual(agent.execute_sql("SELECT COUNT(*) AS n FROM users"), [{"n": 3}])
+        agent.close()
+        with self.assertRaises(ValueError):
+            SQLiteAgent(filename=self.db_file, performance_profile="ludicrous")
+
+    def test_read_only_fast_profile_leaves_journal_mode_alone(self):
+        self.agent.close()
+        agent = SQLiteAgent(filename=self.db_file, performance_profile="fast")
+        pragmas = agent.get_pragmas()
+        self.assertEqual(pragmas["journal_mode"], "delete")
+        self.assertEqual(pragmas["synchronous"], 2) # FULL: NORMAL is only safe with WAL
+        self.assertEqual(pragmas["cache_size"], -65536) # per connection PRAGMAs still apply
+        agent.close()
+        with sqlite3.connect(self.db_file) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode;").fetchone()[0], "delete")
+
+    def test_bulk_import(self):
+        csv_path = os.path.join(self.tmp_dir.name, "talks.csv")
+        with open(csv_path, "w") as f:
+            f.write("title,year,rating,speaker\n")
+            for i in range(2500):
+                f.write(f"Talk {i},{2000 + i % 25},{i % 5}.5,{'' if i % 10 == 0 else 'Speaker ' + str(i)}\n")
+        with self.assertRaises(PermissionError):
+            self.agent.import_file(csv_path, "talks")
+
+        agent = SQLiteAgent(filename=self.db_file, write_access=True)
+        stats = agent.import_file(csv_path, "talks", batch_size=1000)
+        self.assertEqual(stats["rows"], 2500)
+        self.assertTrue(stats["created"])
+        self.assertEqual(agent.get_table_schema("talks"), {"title": "TEXT", "year": "INTEGER", "rating": "REAL", "speaker": "TEXT"})
+        self.assertEqual(agent.execute_sql("SELECT COUNT(*) AS n FROM talks WHERE speaker IS NULL"), [{"n": 250}])
+        self.assertGreater(stats["rows_per_sec"], 0)
+
+        jsonl_path = os.path.join(self.tmp_dir.name, "more_events.jsonl")
+        with open(jsonl_path, "w") as f:
+            for i in range(5):
+                f.write(json.dumps({"title": f"Imported {i}", "city": "Pescara", "attendees": i, "tags": ["gde"]}) + "\n")
+        stats = agent.import_file(jsonl_path, "events")
+        self.assertFalse(stats["created"])
+        self.assertEqual(stats["ignored_columns"], ["tags"])
+        # id is not in the file: the INTEGER PRIMARY KEY still gets assigned.
+        self.assertEqual(agent.execute_sql("SELECT MAX(id) AS id FROM events WHERE city = 'Pescara'"), [{"id": 55}])
+
+        with self.assertRaises(ValueError):
+            agent.import_file(jsonl_path, "events", if_exists="fail")
+        stats = agent.import_file(jsonl_path, "events", if_exists="replace")
+        self.assertEqual(agent.execute_sql("SELECT COUNT(*) AS n FROM events"), [{"n": 5}])
+        self.assertEqual(agent.get_table_schema("events")["tags"], "TEXT")
+        agent.close()
+
+    def test_bulk_import_keeps_late_keys_and_leading_zeros(self):
+        agent = SQLiteAgent(filename=self.db_file, write_access=True)
+        csv_path = os.path.join(self.tmp_dir.name, "contacts.csv")
+        with open(csv_path, "w") as f:
+            f.write("name,zip,phone,age\n")
+            for i in range(10):
+                f.write(f"p{i},{'00123' if i == 7 else 95100 + i},{'+39' if i == 3 else ''}{3331234500 + i},{30 + i}\n")
+        agent.import_file(csv_path, "contacts")
+        self.assertEqual(agent.get_table_schema("contacts"), {"name": "TEXT", "zip": "TEXT", "phone": "TEXT", "age": "INTEGER"})
+        self.assertEqual(agent.execute_sql("SELECT zip, phone FROM contacts WHERE name IN ('p3', 'p7') ORDER BY name"),
+                         [{"zip": "95103", "phone": "+393331234503"}, {"zip": "00123", "phone": "3331234507"}])
+
+        jsonl_path = os.path.join(self.tmp_dir.name, "late.jsonl")
+        with open(jsonl_path, "w") as f:
+            for i in range(1500):
+                f.write(json.dumps({"n": i, **({"extra": i * 2} if i >= 1200 else {})}) + "\n")
+        stats = agent.import_file(jsonl_path, "late", batch_size=500)
+        self.assertEqual((stats["rows"], stats["added_columns"], stats["ignored_columns"]), (1500, ["extra"], []))
+        self.assertEqual(agent.execute_sql("SELECT COUNT(extra) AS n, MIN(extra) AS lo FROM late"), [{"n": 300, "lo": 2400}])
+        # Appending to a table that does not have the late key: reported, not added.
+        with open(jsonl_path, "a") as f:
+            f.write(json.dumps({"n": 0, "surprise": True}) + "\n")
+        stats = agent.import_file(jsonl_path, "late")
+        self.assertEqual(stats["ignored_columns"], ["surprise"])
+        agent.close()
+
+    def test_nl_query_cache(self):
+        cache_path = os.path.join(self.tmp_dir.name, "nl_cache.json")
+        agent = SQLiteAgent(filename=self.db_file, nl_cache_path=cache_path)
+        llm_calls = []
+
+        def fake_llm(nl_query, schema_description):
+            llm_calls.append(nl_query)
+            return "SELECT title FROM events WHERE city = 'Rome' AND attendees > 400 ORDER BY id;"
+
+        agent._generate_sql = fake_llm
+        first = agent.execute_natural_language_query("Events in 'Rome' with more than 400 attendees?")
+        again = agent.execute_natural_language_query("events in 'Rome'   with more than 400 attendees")
+        self.assertEqual(first, again)
+        self.assertEqual(len(llm_calls), 1)
+
+        # Same question, other literals: cached SQL reused with bound parameters.
+        fuzzy = agent.execute_natural_language_query("Events in 'Zurich' with more than 300 attendees?")
+        self.assertEqual(len(llm_calls), 1)
+        self.assertEqual(fuzzy, agent.execute_sql("SELECT title FROM events WHERE city = 'Zurich' AND attendees > 300 ORDER BY id"))
+        stats = agent.get_nl_cache_stats()
+        self.assertEqual((stats["exact_hits"], stats["fuzzy_hits"], stats["misses"]), (1, 1, 1))
+        agent.close()
+
+        # Persisted on disk: a new agent hits without calling the LLM.
+        agent = SQLiteAgent(filename=self.db_file, nl_cache_path=cache_path)
+        agent._generate_sql = fake_llm
+        agent.execute_natural_language_query("Events in 'Rome' with more than 400 attendees?")
+        self.assertEqual(len(llm_calls), 1)
+
+        # A schema change invalidates the translations.
+        writer = SQLiteAgent(filename=self.db_file, write_access=True)
+        writer.execute_sql("ALTER TABLE events ADD COLUMN country TEXT")
+        writer.close()
+        agent.execute_natural_language_query("Events in 'Rome' with more than 400 attendees?")
+        self.assertEqual(len(llm_calls), 2)
+        agent.close()
+
+    def test_nl_query_cache_budget_and_stale_sql(self):
+        agent = SQLiteAgent(filename=self.db_file)
+        llm_calls = []
+        agent._generate_sql = lambda nl_query, schema: llm_calls.append(nl_query) or "SELECT id FROM events ORDER BY id"
+        question = "All the event ids?"
+        self.assertEqual(len(agent.execute_natural_language_query(question)), 50)
+
+        # Over budget: raised as is, no second LLM call nor second run, the translation stays.
+        agent.query_budget = QueryBudget(max_rows=10)
+        with self.assertRaises(QueryBudgetExceeded) as cm:
+            agent.execute_natural_language_query(question)
+        self.assertEqual(cm.exception.reason, "max_rows")
+        self.assertEqual(len(llm_calls), 1)
+        self.assertEqual(agent.get_nl_cache_stats()["entries"], 1)
+
+        # A cached SQL that no longer runs is dropped and translated again.
+        agent.query_budget = QueryBudget()
+        fingerprint = agent.get_schema_catalog().fingerprint
+        agent.nl_cache.put("Broken question?", fingerprint, "SELECT nope FROM events")
+        self.assertEqual(len(agent.execute_natural_language_query("Broken question?")), 50)
+        self.assertEqual(len(llm_calls), 2)
+        self.assertEqual(agent.nl_cache.discard(fingerprint, "SELECT nope FROM events"), 0)
+        agent.close()
+
+    def test_async_facade(self):
+        agent = SQLiteAgent(filename=self.db_file, max_readers=2)
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                # Keeps running while the (blocking) queries are in flight: the loop is never stalled.
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.001)
+
+            tick_task = asyncio.create_task(ticker())
+            queries = [agent.aexecute_sql("SELECT COUNT(*) AS n FROM events a, events b, events c") for _ in range(6)]
+            results = await asyncio.gather(agent.alist_tables(), *queries)
+            tick_task.cancel()
+            return ticks, results
+
+        ticks, results = asyncio.run(scenario())
+        self.assertEqual(results[0], ["users", "events"])
+        self.assertTrue(all(r == [{"n": 125000}] for r in results[1:]))
+        self.assertGreater(ticks, 1)
+        stats = agent.get_executor_stats()
+        self.assertEqual(stats["max_workers"], 3)
+        self.assertEqual(stats["completed"], 7)
+        self.assertEqual((stats["queue_depth"], stats["running"]), (0, 0))
+        self.assertGreater(stats["max_queue_depth"], 0) # 7 calls, 3 threads: some had to wait
+
+        async def admin_calls():
+            return await asyncio.gather(agent.aget_fts_indexes(), agent.aget_schema_catalog(force_refresh=True), agent.aget_pragmas(), agent.aget_slow_queries())
+
+        fts_indexes, catalog, pragmas, slow_queries = asyncio.run(admin_calls())
+        self.assertEqual((fts_indexes, catalog.table_names(), pragmas["journal_mode"]), ({}, ["users", "events"], "delete"))
+        self.assertIsInstance(slow_queries, list)
+        self.assertEqual(agent.get_executor_stats()["completed"], 11)
+        agent.close()
+
+    def test_executor_queue_count_on_errors(self):
+        executor = DatabaseExecutor(self.db_file, max_workers=1)
+
+        def boom():
+            raise RuntimeError("raised by the call itself")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(executor.run(boom))
+        self.assertEqual((executor.stats()["queue_depth"], executor.stats()["completed"]), (0, 1))
+        executor.shutdown()
+        with self.assertRaises(RuntimeError): # refused by the executor: never queued
+            asyncio.run(executor.run(lambda: None))
+        self.assertEqual(executor.stats()["queue_depth"], 0)
+
+    def test_full_text_search(self):
+        agent = SQLiteAgent(filename=self.db_file, write_access=True, fts_routing=True)
+        agent.execute_sql("UPDATE events SET title = 'Gemini hands-on in ' || city WHERE id % 10 = 0")
+        built = agent.create_fts_index("events")
+        self.assertEqual(built["columns"], ["title", "city"])
+        self.assertEqual(built["rows_indexed"], 50)
+        # FTS5 tables and shadow tables stay out of the schema the LLM sees.
+        self.assertEqual(agent.list_tables(), ["users", "events"])
+
+        found = agent.search_text("events", "gemini rome")
+        self.assertEqual(found["row_count"], 2) # ids 20 and 50 are in Rome
+        self.assertIn("[Gemini]", found["rows"][0]["_snippet"])
+
+        # Triggers keep the index in sync.
+        agent.execute_sql("INSERT INTO events (title, city, attendees) VALUES ('Gemini meetup', 'Pescara', 80)")
+        agent.execute_sql("DELETE FROM events WHERE id = 20")
+        agent.execute_sql("UPDATE events SET title = 'Renamed' WHERE id = 50")
+        self.assertEqual(agent.search_text("events", "gemini")["row_count"], 4)
+        self.assertEqual(agent.search_text("events", "gemini rome")["row_count"], 0)
+
+        # LIKE '%word%' is routed to MATCH, and gives the same answer here.
+        sql = "SELECT id FROM events WHERE title LIKE '%gemini%' ORDER BY id"
+        page = agent.execute_sql_paginated(sql)
+        self.assertIn("MATCH", page["fts_routed_sql"])
+        self.assertEqual([r["id"] for r in page["rows"]], [10, 30, 40, 51])
+        self.assertEqual(agent.execute_sql(sql), self.agent.execute_sql(sql))
+        # Routing only narrows: the LIKE is kept, so no false positives; infix matches are lost.
+        agent.execute_sql("INSERT INTO events (title, city, attendees) VALUES ('data big bang', 'Rome', 1)")
+        self.assertEqual(agent.execute_sql("SELECT title FROM events WHERE title LIKE '%big data%'"), [])
+        self.assertEqual(self.agent.execute_sql("SELECT title FROM events WHERE title LIKE '%mini%' AND id = 10"), [{"title": "Gemini hands-on in Zurich"}])
+        self.assertEqual(agent.execute_sql("SELECT title FROM events WHERE title LIKE '%mini%' AND id = 10"), [])
+
+        with self.assertRaises(ValueError):
+            agent.search_text("users", "alice")
+        self.assertTrue(agent.drop_fts_index("events"))
+        self.assertEqual(agent.get_fts_indexes(), {})
+        agent.close()
+
+
+    def test_in_memory_snapshot(self):
+        with self.assertRaises(ValueError):
+            SQLiteAgent(filename=self.db_file, write_access=True, in_memory=True)
+        agent = SQLiteAgent(filename=self.db_file, in_memory=True, in_memory_check_seconds=0)
+        try:
+            self.assertEqual(agent.get_storage_stats()['storage_mode'], "memory")
+            self.assertEqual(agent.execute_sql("SELECT COUNT(*) AS n FROM events"), [{"n": 50}])
+            self.assertEqual(agent.list_tables(), ["users", "events"])
+            # Another process writes to the file: the next read sees a fresh copy.
+            writer = SQLiteAgent(filename=self.db_file, write_access=True)
+            writer.execute_sql("INSERT INTO users (name, email) VALUES (?, ?)", ("late", "late@example.com"))
+            writer.close()
+            self.assertEqual(agent.execute_sql("SELECT COUNT(*) AS n FROM users"), [{"n": 4}])
+            self.assertEqual(agent.get_storage_stats()['reloads'], 1)
+            self.assertEqual(agent.get_pool_stats()['generation'], 1)
+            # Unchanged file: no reload.
+            agent.execute_sql("SELECT COUNT(*) AS n FROM users")
+            self.assertEqual(agent.get_storage_stats()['reloads'], 1)
+            self.assertEqual(agent.reload_snapshot()['reloads'], 2)
+        finally:
+            agent.close()
+        # Too big to copy: memory-mapped instead.
+        agent = SQLiteAgent(filename=self.db_file, in_memory=True, in_memory_max_bytes=1)
+        try:
+            self.assertEqual(agent.get_storage_stats()['storage_mode'], "mmap")
+            self.assertGreater(agent.get_pragmas()['mmap_size'], 0)
+            self.assertEqual(agent.execute_sql("SELECT COUNT(*) AS n FROM events"), [{"n": 50}])
+        finally:
+            agent.close()
+
+if __name__ == "__main__":
+    unittest.main()
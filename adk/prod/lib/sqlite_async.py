@@ -0,0 +1,109 @@
+# lib/sqlite_async.py
+# Per-database thread pools, so async callers (ADK Runner event loop) never block on SQLite.
+import asyncio
+import functools
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class DatabaseExecutor:
+    """
+    A bounded ThreadPoolExecutor dedicated to ONE database file.
+
+    Blocking SQLiteAgent calls run on its threads; the event loop only awaits them.
+    At most `max_workers` calls run at once (the rest wait in the queue), so a burst
+    of slow queries on one DB cannot eat the threads of another DB.
+    """
+
+    def __init__(self, filename: str, max_workers: int = 4):
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1. 🤔")
+        self.filename: str = filename
+        self.max_workers: int = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"sqlite-{os.path.basename(filename)}")
+        self._lock = threading.Lock()
+        # Metrics: queued = submitted but not started yet.
+        self._queued: int = 0
+        self._running: int = 0
+        self._completed: int = 0
+        self._max_queue_depth: int = 0
+        self._queue_wait_seconds: float = 0.0
+
+    def _track(self, fn: Callable[..., Any], submitted: float) -> Callable[[], Any]:
+        def tracked():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._queue_wait_seconds += time.perf_counter() - submitted
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+        return tracked
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs fn(*args, **kwargs) on this database's threads and awaits the result."""
+        with self._lock:
+            self._queued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued)
+        call = self._track(functools.partial(fn, *args, **kwargs), time.perf_counter())
+        try:
+            # Submitted right away (not at the await): only a refused submission raises here.
+            future = asyncio.get_running_loop().run_in_executor(self._executor, call)
+        except RuntimeError:
+            # Executor shut down: the call never ran, undo the queue count.
+            # (A RuntimeError raised by fn itself comes from the await below, counts already settled.)
+            with self._lock:
+                self._queued -= 1
+            raise
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth (calls waiting for a thread), running calls and average queue wait."""
+        with self._lock:
+            return {
+                'db_filename': self.filename,
+                'max_workers': self.max_workers,
+                'queue_depth': self._queued,
+                'max_queue_depth': self._max_queue_depth,
+                'running': self._running,
+                'completed': self._completed,
+                'avg_queue_wait_ms': round(1000 * self._queue_wait_seconds / self._completed, 3) if self._completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_executors: Dict[str, DatabaseExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(filename: str, max_workers: int = 4) -> DatabaseExecutor:
+    """
+    Returns THE executor of a database file (created on first use, shared by every
+    agent on that file: the first caller decides max_workers).
+    """
+    key = os.path.abspath(filename)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            executor = DatabaseExecutor(filename, max_workers=max_workers)
+            _executors[key] = executor
+            logging.debug(f"Created async executor for {filename} ({max_workers} workers)")
+        return executor
+
+
+def shutdown_executors(wait: bool = True):
+    """Shuts down every per-database executor (e.g. at process exit, or between tests)."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
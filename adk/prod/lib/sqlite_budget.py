@@ -0,0 +1,166 @@
+# lib/sqlite_budget.py
+# Per-query execution budget for SQLiteAgent: wall-clock timeout, row cap, byte cap.
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# Reasons a statement can stop before its natural end.
+STOP_TIMEOUT = 'timeout'
+STOP_CANCELLED = 'cancelled'
+STOP_MAX_ROWS = 'max_rows'
+STOP_MAX_BYTES = 'max_bytes'
+
+
+@contextmanager
+def statement_timeout(conn: sqlite3.Connection, timeout_seconds: Optional[float]):
+    """
+    Aborts any statement running on `conn` for longer than `timeout_seconds`
+    (sqlite3 raises OperationalError('interrupted')). No-op if timeout_seconds is None.
+    """
+    if timeout_seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + timeout_seconds
+    # Called every N SQLite VM instructions: returning non-zero aborts the statement.
+    conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 1000)
+    try:
+        yield
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+def is_interrupted(error: sqlite3.Error) -> bool:
+    """True if the error comes from a progress handler abort or Connection.interrupt()."""
+    return isinstance(error, sqlite3.OperationalError) and str(error) == 'interrupted'
+
+
+def approx_row_bytes(row: Sequence[Any]) -> int:
+    """Cheap estimate of the serialized size of a row (no json.dumps per row)."""
+    size = 0
+    for value in row:
+        if value is None:
+            size += 4
+        elif isinstance(value, (str, bytes)):
+            size += len(value) + 2
+        else:
+            size += 8
+    return size
+
+
+class QueryBudget:
+    """
+    Limits for ONE statement. Any limit set to None is not enforced.
+
+    - timeout_seconds: wall-clock time, enforced inside SQLite (progress handler),
+                       so even a runaway cartesian join is stopped.
+    - max_rows / max_bytes: stop fetching once the result gets this big.
+    """
+
+    def __init__(self, timeout_seconds: Optional[float] = None, max_rows: Optional[int] = None, max_bytes: Optional[int] = None):
+        if timeout_seconds is not None and timeout_seconds <= 0:
+            raise ValueError("timeout_seconds must be > 0 (or None). 🤔")
+        if max_rows is not None and max_rows < 0:
+            raise ValueError("max_rows must be >= 0 (or None). 🤔")
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("max_bytes must be >= 0 (or None). 🤔")
+        self.timeout_seconds: Optional[float] = timeout_seconds
+        self.max_rows: Optional[int] = max_rows
+        self.max_bytes: Optional[int] = max_bytes
+
+    def interrupt_reason(self, started: float) -> str:
+        """Tells a timeout from an explicit cancel(), given when the statement started (perf_counter)."""
+        if self.timeout_seconds is not None and time.perf_counter() - started >= self.timeout_seconds:
+            return STOP_TIMEOUT
+        return STOP_CANCELLED
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'timeout_seconds': self.timeout_seconds, 'max_rows': self.max_rows, 'max_bytes': self.max_bytes}
+
+
+class BudgetedRows:
+    """
+    Iterates the rows of an executed cursor until it is exhausted or the budget
+    runs out. After iteration, `stopped_reason` is None (complete result) or one
+    of STOP_*; `byte_count` is the approximate size of the rows yielded.
+
+    The timeout itself must be armed by the caller, around both execute() and
+    the iteration: `with statement_timeout(conn, budget.timeout_seconds):`.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, budget: QueryBudget, started: float, batch_size: int = 500):
+        self.cursor = cursor
+        self.budget = budget
+        self.started: float = started
+        self.batch_size: int = batch_size
+        self.stopped_reason: Optional[str] = None
+        self.row_count: int = 0
+        self.byte_count: int = 0
+
+    def __iter__(self) -> Iterator[sqlite3.Row]:
+        max_rows, max_bytes = self.budget.max_rows, self.budget.max_bytes
+        try:
+            while True:
+                batch = self.cursor.fetchmany(self.batch_size)
+                if not batch:
+                    return
+                for row in batch:
+                    if max_rows is not None and self.row_count >= max_rows:
+                        self.stopped_reason = STOP_MAX_ROWS
+                        return
+                    if max_bytes is not None:
+                        row_bytes = approx_row_bytes(row)
+                        if self.byte_count + row_bytes > max_bytes:
+                            self.stopped_reason = STOP_MAX_BYTES
+                            return
+                        self.byte_count += row_bytes
+                    self.row_count += 1
+                    yield row
+        except sqlite3.OperationalError as e:
+            if not is_interrupted(e):
+                raise
+            self.stopped_reason = self.budget.interrupt_reason(self.started)
+
+
+def stopped_message(reason: str, budget: QueryBudget, row_count: int) -> str:
+    """Human (and LLM) readable explanation of why a statement stopped early."""
+    limits = {
+        STOP_TIMEOUT: f"it ran for more than {budget.timeout_seconds}s",
+        STOP_CANCELLED: "it was cancelled",
+        STOP_MAX_ROWS: f"it returned more than {budget.max_rows} rows",
+        STOP_MAX_BYTES: f"its result exceeded ~{budget.max_bytes} bytes",
+    }
+    return (f"Query stopped because {limits.get(reason, reason)}: only {row_count} rows returned. "
+            "Add a WHERE/LIMIT, aggregate, or avoid cartesian joins. ⏱️")
+
+
+class QueryBudgetExceeded(sqlite3.OperationalError):
+    """
+    Raised when a statement is stopped by its budget (or cancelled).
+    Carries the rows fetched so far, so callers can still use a partial result.
+
+    Subclasses sqlite3.OperationalError: existing `except sqlite3.Error` handlers keep working.
+    """
+
+    def __init__(self, reason: str, budget: QueryBudget, columns: Optional[List[str]] = None, rows: Optional[List[Dict[str, Any]]] = None, elapsed_ms: float = 0.0):
+        self.reason: str = reason
+        self.budget: QueryBudget = budget
+        self.columns: List[str] = columns or []
+        self.rows: List[Dict[str, Any]] = rows or []
+        self.elapsed_ms: float = elapsed_ms
+        super().__init__(self.message())
+
+    def message(self) -> str:
+        return stopped_message(self.reason, self.budget, len(self.rows))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Partial-result payload, in the same shape as execute_sql_paginated pages."""
+        return {
+            'status': 'partial',
+            'stopped_reason': self.reason,
+            'message': self.message(),
+            'columns': self.columns,
+            'rows': self.rows,
+            'row_count': len(self.rows),
+            'elapsed_ms': round(self.elapsed_ms, 3),
+        }
@@ -0,0 +1,226 @@
+# lib/sqlite_bulk_import.py
+# Streams CSV / JSONL files into a SQLite table: schema inferred from a sample, executemany in big transactions.
+import sqlite3
+import csv
+import itertools
+import json
+import os
+import re
+import time
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+IMPORT_FORMATS = ('csv', 'tsv', 'jsonl')
+_EXTENSIONS = {'.csv': 'csv', '.tsv': 'tsv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+IF_EXISTS_OPTIONS = ('append', 'replace', 'fail')
+# Numbers as they print back: no sign other than '-', no leading zeros, no '_' or spaces.
+_CANONICAL_NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?")
+
+
+def detect_format(path: str) -> str:
+    """Guesses the file format from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError(f"Cannot guess the format of '{path}': use one of {IMPORT_FORMATS} explicitly. 🤔")
+    return _EXTENSIONS[extension]
+
+
+def iter_records(path: str, file_format: str) -> Iterator[Dict[str, Any]]:
+    """Yields the file records as dicts, one at a time (the file is never loaded in full)."""
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown format '{file_format}', use one of {IMPORT_FORMATS}. 🤔")
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if file_format in ('csv', 'tsv'):
+            yield from csv.DictReader(f, delimiter='\t' if file_format == 'tsv' else ',')
+            return
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{line_number}: expected a JSON object per line, got {type(record).__name__}. 🤔")
+            yield record
+
+
+def _parse_number(value: str) -> Optional[int | float]:
+    """
+    '42' -> 42, '4.2' -> 4.2, anything else -> None. Values that would not print back
+    as they are ('00123' zip codes, '+39 ...' phone numbers, '1_000') are not numbers.
+    """
+    if not _CANONICAL_NUMBER.fullmatch(value):
+        return None
+    try:
+        number = int(value)
+        return number if str(number) == value else None # '-0'
+    except ValueError:
+        return float(value)
+
+
+def _value_type(value: Any) -> Optional[str]:
+    """SQLite type of a single value, None for NULL/empty (no information)."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, int): # bool included
+        return 'INTEGER'
+    if isinstance(value, float):
+        return 'REAL'
+    if isinstance(value, str):
+        number = _parse_number(value)
+        if isinstance(number, int):
+            return 'INTEGER'
+        if isinstance(number, float):
+            return 'REAL'
+    return 'TEXT'
+
+
+def infer_schema(sample: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Column -> SQLite type from a sample of records: INTEGER if every non-empty value
+    is an integer, REAL if they are all numbers, TEXT otherwise (and for all-empty columns).
+    A single zero-padded or '+' prefixed value makes the column TEXT, so IDs keep their digits.
+    Columns keep the order in which they first appear.
+    """
+    types: Dict[str, Optional[str]] = {}
+    for record in sample:
+        for column, value in record.items():
+            if column is None: # CSV row longer than its header
+                continue
+            current, seen = types.get(column), _value_type(value)
+            if seen is None or current == 'TEXT':
+                types.setdefault(column, current)
+            elif current is None or current == seen:
+                types[column] = seen
+            elif {current, seen} == {'INTEGER', 'REAL'}:
+                types[column] = 'REAL'
+            else:
+                types[column] = 'TEXT'
+    return {column: column_type or 'TEXT' for column, column_type in types.items()}
+
+
+def coerce_value(value: Any, column_type: str) -> Any:
+    """Converts a raw value for storage: '' -> NULL, numeric strings -> numbers, nested JSON -> JSON text."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, str) and column_type in ('INTEGER', 'REAL'):
+        number = _parse_number(value)
+        return value if number is None else number
+    return value
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _existing_columns(conn: sqlite3.Connection, table_name: str) -> Dict[str, str]:
+    """Column -> declared type of an existing table ({} if there is no such table)."""
+    return {row[0]: row[1].upper() for row in conn.execute("SELECT name, type FROM pragma_table_info(?) ORDER BY cid;", (table_name,))}
+
+
+def bulk_import(
+    conn: sqlite3.Connection,
+    path: str,
+    table_name: str,
+    file_format: Optional[str] = None,
+    if_exists: str = 'append',
+    batch_size: int = 10000,
+    sample_size: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Loads a CSV/TSV/JSONL file into `table_name` on a WRITE connection.
+
+    The table is created from the schema inferred on the first `sample_size` records
+    if it does not exist. Rows are inserted with one prepared INSERT via executemany,
+    `batch_size` rows per transaction. Keys first seen after the sample (JSONL) are
+    added with ALTER TABLE ADD COLUMN to a table created by the import, and imported
+    from then on. Columns of the file that an existing table does not have are ignored
+    (and reported); table columns missing from the file get their DEFAULT.
+
+    Returns:
+        Dict[str, Any]: {'table', 'file', 'format', 'rows', 'columns', 'created',
+                         'added_columns', 'ignored_columns', 'seconds', 'rows_per_sec'}.
+    """
+    if if_exists not in IF_EXISTS_OPTIONS:
+        raise ValueError(f"Unknown if_exists '{if_exists}', use one of {IF_EXISTS_OPTIONS}. 🤔")
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1. 🤔")
+    file_format = file_format or detect_format(path)
+    started = time.perf_counter()
+
+    records = iter_records(path, file_format)
+    sample = list(itertools.islice(records, sample_size))
+    inferred = infer_schema(sample)
+
+    existing = _existing_columns(conn, table_name)
+    if existing and if_exists == 'fail':
+        raise ValueError(f"Table '{table_name}' already exists (if_exists='fail'). 🤔")
+    if existing and if_exists == 'replace':
+        conn.execute(f"DROP TABLE {_quote(table_name)};")
+        existing = {}
+    created = not existing
+    if created:
+        if not inferred:
+            raise ValueError(f"No columns found in '{path}': nothing to import. 🤷")
+        columns_sql = ", ".join(f"{_quote(column)} {column_type}" for column, column_type in inferred.items())
+        conn.execute(f"CREATE TABLE {_quote(table_name)} ({columns_sql});")
+        logging.info(f"Created table '{table_name}' ({columns_sql})")
+        existing = dict(inferred)
+    # Only the columns the file provides: the others keep their table DEFAULT.
+    columns = [column for column in existing if column in inferred]
+    if not columns:
+        raise ValueError(f"None of the columns of '{path}' ({list(inferred)}) exist in table '{table_name}'. 🤷")
+    column_types = [existing[column] for column in columns]
+    ignored_columns = [column for column in inferred if column not in existing]
+    if ignored_columns:
+        logging.warning(f"Columns not in table '{table_name}', ignored: {ignored_columns}")
+
+    added_columns: List[str] = []
+    seen_keys = set(inferred)
+    rows = 0
+    all_records = itertools.chain(sample, records)
+    while True:
+        records_batch = list(itertools.islice(all_records, batch_size))
+        if not records_batch:
+            break
+        late_keys = [key for key in dict.fromkeys(key for record in records_batch for key in record) if key is not None and key not in seen_keys]
+        if late_keys:
+            seen_keys.update(late_keys)
+            late_types = infer_schema(records_batch)
+            for key in late_keys:
+                if key not in existing and created:
+                    conn.execute(f"ALTER TABLE {_quote(table_name)} ADD COLUMN {_quote(key)} {late_types[key]};")
+                    existing[key] = late_types[key]
+                    added_columns.append(key)
+                if key in existing:
+                    columns.append(key)
+                    column_types.append(existing[key])
+                else:
+                    ignored_columns.append(key)
+            logging.warning(f"Keys first seen after row {rows}: added {[k for k in late_keys if k in existing]}, ignored {[k for k in late_keys if k not in existing]}")
+        insert_sql = f"INSERT INTO {_quote(table_name)} ({', '.join(_quote(c) for c in columns)}) VALUES ({', '.join('?' for _ in columns)});"
+        batch: List[Tuple[Any, ...]] = [
+            tuple(coerce_value(record.get(column), column_type) for column, column_type in zip(columns, column_types))
+            for record in records_batch
+        ]
+        conn.executemany(insert_sql, batch)
+        conn.commit() # one transaction per batch: fast, and a failure only loses the current batch
+        rows += len(batch)
+        logging.debug(f"Imported {rows} rows into '{table_name}'...")
+
+    seconds = time.perf_counter() - started
+    stats = {
+        'table': table_name,
+        'file': path,
+        'format': file_format,
+        'rows': rows,
+        'columns': dict(zip(columns, column_types)),
+        'created': created,
+        'added_columns': added_columns,
+        'ignored_columns': ignored_columns,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows / seconds) if seconds > 0 else rows,
+    }
+    logging.info(f"📥 Imported {rows} rows into '{table_name}' in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec)")
+    return stats
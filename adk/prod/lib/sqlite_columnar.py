@@ -0,0 +1,100 @@
+# lib/sqlite_columnar.py
+# Columnar result shape for SQLiteAgent: column names once, then one value list per column.
+import array
+import json
+from typing import Any, Dict, Iterable, List, Sequence
+
+try:
+    import numpy # Optional: only needed for to_typed_columns(use_numpy=True)
+except ImportError:
+    numpy = None
+
+RESULT_FORMATS = ('rows', 'columnar')
+
+
+def rows_to_columnar(columns: List[str], rows: Iterable[Sequence[Any]]) -> Dict[str, Any]:
+    """
+    Transposes rows (tuples or sqlite3.Row) into a columnar payload:
+
+        {'format': 'columnar', 'columns': ['id', 'name'], 'values': [[1, 2], ['a', 'b']], 'row_count': 2}
+
+    JSON-serializable, so it can be returned as is by ADK tools.
+    """
+    values: List[List[Any]] = [[] for _ in columns]
+    row_count = 0
+    for row in rows:
+        row_count += 1
+        for i, value in enumerate(row):
+            values[i].append(value)
+    return {'format': 'columnar', 'columns': list(columns), 'values': values, 'row_count': row_count}
+
+
+def columnar_to_rows(columnar: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Inverse of rows_to_columnar: back to the classic List[Dict] shape."""
+    columns = columnar['columns']
+    return [dict(zip(columns, row)) for row in zip(*columnar['values'])]
+
+
+def _typecode_for(values: List[Any]) -> str | None:
+    """'q' for all-int columns, 'd' for int/float columns, None otherwise (NULLs included)."""
+    if not values:
+        return None
+    if all(type(v) is int for v in values):
+        return 'q'
+    if all(type(v) in (int, float) for v in values):
+        return 'd'
+    return None
+
+
+def to_typed_columns(columnar: Dict[str, Any], use_numpy: bool = False) -> Dict[str, Any]:
+    """
+    Returns a copy of the columnar payload where numeric columns are packed into
+    `array.array` (or NumPy arrays if use_numpy): 8 bytes per value instead of a
+    full Python object. Meant for in-process consumers, NOT for JSON tool payloads.
+    Columns with NULLs or mixed types are left as lists.
+    """
+    if use_numpy and numpy is None:
+        raise ImportError("NumPy is not installed: `pip install numpy` or use use_numpy=False. 🐍")
+    typed_values: List[Any] = []
+    for values in columnar['values']:
+        typecode = _typecode_for(values)
+        if typecode is None:
+            typed_values.append(values)
+        elif use_numpy:
+            typed_values.append(numpy.array(values, dtype='int64' if typecode == 'q' else 'float64'))
+        else:
+            typed_values.append(array.array(typecode, values))
+    return {**columnar, 'values': typed_values, 'typed': True}
+
+
+def payload_size_report(columnar: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Byte accounting of the JSON payload, columnar vs the equivalent List[Dict] rows.
+
+    The rows size is computed exactly from per-column JSON sizes (json.dumps default
+    separators), without ever building the rows payload.
+    """
+    columns = columnar['columns']
+    n_rows = columnar['row_count']
+    n_cols = len(columns)
+    values_json_sizes = [len(json.dumps(values, default=str)) for values in columnar['values']]
+    columnar_bytes = len(json.dumps({k: v for k, v in columnar.items() if k != 'payload_bytes'}, default=str))
+
+    if n_rows:
+        # Sum of the JSON lengths of all values: strip brackets and ', ' separators from each column dump.
+        all_values_size = sum(size - 2 - 2 * (n_rows - 1) for size in values_json_sizes)
+        keys_size = sum(len(json.dumps(col)) + len(': ') for col in columns)
+        row_overhead = 2 + keys_size + 2 * max(n_cols - 1, 0) # {} + "key": + ', ' between pairs
+        rows_bytes = 2 + n_rows * row_overhead + all_values_size + 2 * (n_rows - 1)
+    else:
+        rows_bytes = 2 # '[]'
+
+    saved = rows_bytes - columnar_bytes
+    return {
+        'rows_json_bytes': rows_bytes,
+        'columnar_json_bytes': columnar_bytes,
+        'saved_bytes': saved,
+        'saved_pct': round(100.0 * saved / rows_bytes, 1) if rows_bytes else 0.0,
+        # Rough rule of thumb: ~4 bytes of JSON per LLM token.
+        'approx_tokens_saved': saved // 4,
+    }
@@ -0,0 +1,173 @@
+# lib/sqlite_fts.py
+# FTS5 full-text indexes for SQLiteAgent: external-content shadow tables kept in sync by triggers, bm25 search.
+import sqlite3
+import re
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from .sqlite_schema_catalog import SchemaCatalog
+
+FTS_SUFFIX = "_fts"
+# Triggers keeping <table>_fts in sync with <table>.
+_TRIGGER_SUFFIXES = ("_fts_ai", "_fts_ad", "_fts_au")
+_TEXT_AFFINITY = re.compile(r"CHAR|CLOB|TEXT", re.IGNORECASE)
+_CONTENT_OPTION = re.compile(r"content\s*=\s*'(?P<table>(?:[^']|'')+)'", re.IGNORECASE)
+# <col> LIKE '%word%' (optionally alias-qualified): the only shape routed to MATCH.
+_LIKE_PREDICATE = re.compile(
+    r"(?P<qualifier>\b\w+\.)?(?P<column>\b\w+)\s+LIKE\s+'%(?P<term>[\w\s]+?)%'",
+    re.IGNORECASE,
+)
+_SINGLE_TABLE_FROM = re.compile(r"\bFROM\s+\"?(?P<table>\w+)\"?(?:\s+(?:AS\s+)?(?P<alias>\w+))?\s*(?:WHERE\b|$)", re.IGNORECASE)
+_MULTI_TABLE = re.compile(r"\bJOIN\b|\bFROM\s+[^()]*?,", re.IGNORECASE)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def fts_table_name(table_name: str) -> str:
+    return f"{table_name}{FTS_SUFFIX}"
+
+
+def text_columns(catalog: SchemaCatalog, table_name: str) -> List[str]:
+    """Columns with TEXT affinity (TEXT, VARCHAR, CLOB...) of a table."""
+    return [column for column, column_type in catalog.tables.get(table_name, {}).items() if _TEXT_AFFINITY.search(column_type or "")]
+
+
+def list_fts_indexes(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+    """Indexed table -> {'fts_table', 'columns'} for every external-content FTS5 table."""
+    indexes = {}
+    for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%USING fts5%';"):
+        match = _CONTENT_OPTION.search(sql)
+        if not match:
+            continue # contentless / standalone FTS table: not ours
+        table = match.group('table').replace("''", "'")
+        columns = [row[0] for row in conn.execute("SELECT name FROM pragma_table_info(?);", (name,))]
+        indexes[table] = {'fts_table': name, 'columns': columns}
+    return indexes
+
+
+def drop_fts_index(conn: sqlite3.Connection, table_name: str) -> bool:
+    """Drops the FTS table and its sync triggers. Returns False if there was none."""
+    fts_table = fts_table_name(table_name)
+    for suffix in _TRIGGER_SUFFIXES:
+        conn.execute(f"DROP TRIGGER IF EXISTS {_quote(table_name + suffix)};")
+    existed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?;", (fts_table,)).fetchone() is not None
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(fts_table)};")
+    return existed
+
+
+def create_fts_index(conn: sqlite3.Connection, catalog: SchemaCatalog, table_name: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    (Re)builds `<table>_fts`, an FTS5 external-content index over the TEXT columns of a
+    table (or the given `columns`), plus AFTER INSERT/DELETE/UPDATE triggers keeping it
+    in sync. The text is NOT duplicated: FTS5 reads it from the table itself.
+
+    Must run on a write connection. Returns {'table', 'fts_table', 'columns', 'rows_indexed', 'seconds'}.
+    """
+    if table_name not in catalog.tables:
+        raise ValueError(f"Unknown table '{table_name}'. Available: {catalog.table_names()} 🤔")
+    columns = columns or text_columns(catalog, table_name)
+    unknown = [column for column in columns if column not in catalog.tables[table_name]]
+    if unknown or not columns:
+        raise ValueError(f"No indexable TEXT columns for '{table_name}' (unknown: {unknown}). 🤔")
+    started = time.perf_counter()
+
+    fts_table = fts_table_name(table_name)
+    drop_fts_index(conn, table_name)
+    quoted_columns = ", ".join(_quote(column) for column in columns)
+    new_values = ", ".join(f"new.{_quote(column)}" for column in columns)
+    old_values = ", ".join(f"old.{_quote(column)}" for column in columns)
+    content = table_name.replace("'", "''")
+    conn.execute(
+        f"CREATE VIRTUAL TABLE {_quote(fts_table)} USING fts5({quoted_columns}, "
+        f"content='{content}', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2');"
+    )
+    t, f = _quote(table_name), _quote(fts_table)
+    conn.execute(
+        f"CREATE TRIGGER {_quote(table_name + '_fts_ai')} AFTER INSERT ON {t} BEGIN "
+        f"INSERT INTO {f}(rowid, {quoted_columns}) VALUES (new.rowid, {new_values}); END;"
+    )
+    conn.execute(
+        f"CREATE TRIGGER {_quote(table_name + '_fts_ad')} AFTER DELETE ON {t} BEGIN "
+        f"INSERT INTO {f}({f}, rowid, {quoted_columns}) VALUES ('delete', old.rowid, {old_values}); END;"
+    )
+    conn.execute(
+        f"CREATE TRIGGER {_quote(table_name + '_fts_au')} AFTER UPDATE ON {t} BEGIN "
+        f"INSERT INTO {f}({f}, rowid, {quoted_columns}) VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO {f}(rowid, {quoted_columns}) VALUES (new.rowid, {new_values}); END;"
+    )
+    conn.execute(f"INSERT INTO {f}({f}) VALUES ('rebuild');")
+    rows_indexed = conn.execute(f"SELECT COUNT(*) FROM {t};").fetchone()[0]
+    seconds = time.perf_counter() - started
+    logging.info(f"🔎 Built FTS index {fts_table} on {columns}: {rows_indexed} rows in {seconds:.3f}s")
+    return {'table': table_name, 'fts_table': fts_table, 'columns': columns, 'rows_indexed': rows_indexed, 'seconds': round(seconds, 3)}
+
+
+def to_match_query(keywords: str, prefix: bool = True) -> str:
+    """
+    Turns free text into a safe FTS5 query: every word becomes a quoted term (so
+    punctuation / FTS operators in user input are never a syntax error), all required.
+    With prefix=True, 'gem' also matches 'gemini'.
+    """
+    terms = re.findall(r"\w+", keywords)
+    return " ".join('"' + term + '"' + ("*" if prefix else "") for term in terms)
+
+
+def fts_search(conn: sqlite3.Connection, table_name: str, keywords: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Full-text search on an indexed table, best matches first (bm25). Each row is the
+    table row plus '_rank' (lower is better) and '_snippet' (matching text, terms in [brackets]).
+    """
+    indexes = list_fts_indexes(conn)
+    if table_name not in indexes:
+        raise ValueError(f"No full-text index on '{table_name}': build it first. Indexed tables: {list(indexes)} 🤔")
+    match_query = to_match_query(keywords)
+    if not match_query:
+        return []
+    t, f = _quote(table_name), _quote(indexes[table_name]['fts_table'])
+    cursor = conn.execute(
+        f"SELECT {t}.*, bm25({f}) AS _rank, snippet({f}, -1, '[', ']', '…', 12) AS _snippet "
+        f"FROM {f} JOIN {t} ON {t}.rowid = {f}.rowid "
+        f"WHERE {f} MATCH ? ORDER BY _rank LIMIT ?;",
+        (match_query, limit),
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def route_like_to_match(sql_query: str, fts_indexes: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """
+    Adds an indexed `rowid IN (... MATCH ...)` lookup in front of `col LIKE '%word%'`
+    predicates on an FTS-indexed column of a single-table query. The LIKE itself stays,
+    so routing only narrows the rows LIKE has to check: no false positives ('%big data%'
+    does not match 'data big bang'). Returns None if nothing can be routed (joins, bound
+    parameters, wildcards inside the term...).
+
+    NOTE: MATCH works on tokens, with prefix matching, so infix matches are LOST:
+    '%gemini%' finds 'Gemini 2.5' and 'geminis', but '%mini%' no longer finds 'Gemini'
+    as plain LIKE would. Good for keyword questions only, hence off by default.
+    """
+    if _MULTI_TABLE.search(sql_query):
+        return None
+    from_match = _SINGLE_TABLE_FROM.search(sql_query)
+    if not from_match or from_match.group('table') not in fts_indexes:
+        return None
+    table, alias = from_match.group('table'), from_match.group('alias')
+    index = fts_indexes[table]
+    routed = False
+
+    def route(match: re.Match) -> str:
+        nonlocal routed
+        qualifier = (match.group('qualifier') or "").rstrip(".")
+        column = match.group('column')
+        if column not in index['columns'] or (qualifier and qualifier not in (table, alias)):
+            return match.group(0)
+        routed = True
+        match_query = f"{{{column}}} : {to_match_query(match.group('term'))}".replace("'", "''")
+        rowid = f"{qualifier}.rowid" if qualifier else "rowid"
+        fts_lookup = f"{rowid} IN (SELECT rowid FROM {_quote(index['fts_table'])} WHERE {_quote(index['fts_table'])} MATCH '{match_query}')"
+        return f"({fts_lookup} AND {match.group(0)})"
+
+    rewritten = _LIKE_PREDICATE.sub(route, sql_query)
+    return rewritten if routed else None
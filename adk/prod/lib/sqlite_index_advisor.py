@@ -0,0 +1,258 @@
+# lib/sqlite_index_advisor.py
+# Proposes (and optionally creates) covering indexes from the queries SQLiteAgent actually ran.
+import sqlite3
+import re
+import time
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .sqlite_budget import is_interrupted, statement_timeout
+from .sqlite_schema_catalog import SchemaCatalog
+
+_IDENT = r'(?:"(?:[^"]|"")+"|\w+)'
+# FROM/JOIN <table> [[AS] alias]
+_TABLE_REF = re.compile(rf'\b(?:FROM|JOIN)\s+(?P<table>{_IDENT})(?:\s+(?:AS\s+)?(?P<alias>{_IDENT}))?', re.IGNORECASE)
+# [alias.]column <op>
+_PREDICATE = re.compile(
+    rf'(?:(?P<qualifier>{_IDENT})\.)?(?P<column>{_IDENT})\s*(?P<op>==|=|IN\b|IS\b|<=|>=|<>|!=|<|>|BETWEEN\b|LIKE\b|GLOB\b)',
+    re.IGNORECASE,
+)
+_COLUMN_REF = re.compile(rf'(?:(?P<qualifier>{_IDENT})\.)?(?P<column>{_IDENT})')
+# a.x = b.y (join condition: both sides are index candidates, the planner picks the inner table)
+_JOIN_EQUALITY = re.compile(
+    rf'(?:(?P<q1>{_IDENT})\.)?(?P<c1>{_IDENT})\s*==?\s*(?:(?P<q2>{_IDENT})\.)?(?P<c2>{_IDENT})(?!\s*\()',
+)
+# Clause boundaries, to cut WHERE / ON / ORDER BY bodies out of the statement.
+_CLAUSE_END = r'(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bHAVING\b|\bWINDOW\b|\bUNION\b|\bJOIN\b|\bLEFT\b|\bINNER\b|\bCROSS\b|\bWHERE\b|\)|;|$)'
+_WHERE = re.compile(rf'\bWHERE\b(?P<body>.*?){_CLAUSE_END}', re.IGNORECASE | re.DOTALL)
+_ON = re.compile(rf'\bON\b(?P<body>.*?){_CLAUSE_END}', re.IGNORECASE | re.DOTALL)
+_ORDER_BY = re.compile(r'\bORDER\s+BY\b(?P<body>.*?)(?=\bLIMIT\b|\)|;|$)', re.IGNORECASE | re.DOTALL)
+_SELECT_LIST = re.compile(r'^\s*SELECT\s+(?:DISTINCT\s+)?(?P<body>.*?)\bFROM\b', re.IGNORECASE | re.DOTALL)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+_SQL_KEYWORDS = {
+    'where', 'on', 'join', 'left', 'right', 'inner', 'outer', 'cross', 'natural', 'group', 'order',
+    'limit', 'having', 'union', 'using', 'and', 'or', 'not', 'null', 'as', 'select', 'from', 'by',
+    'asc', 'desc', 'collate', 'nocase', 'window', 'like', 'in', 'is', 'between', 'exists',
+}
+_EQUALITY_OPS = {'=', '==', 'in', 'is'}
+# Wider indexes cost more on writes than they save on reads.
+MAX_INDEX_COLUMNS = 5
+
+
+def _unquote(identifier: str) -> str:
+    if identifier[:1] == '"' and identifier[-1:] == '"':
+        return identifier[1:-1].replace('""', '"')
+    return identifier
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class QueryColumns:
+    """Columns a single statement uses, per table: equality / range predicates, joins, ORDER BY, SELECT."""
+
+    def __init__(self):
+        self.equality: Dict[str, List[str]] = {}
+        self.range: Dict[str, List[str]] = {}
+        self.order_by: Dict[str, List[str]] = {}
+        self.selected: Dict[str, Optional[List[str]]] = {} # None means SELECT * (no covering index)
+
+    @staticmethod
+    def _add(target: Dict[str, List[str]], table: str, column: str):
+        columns = target.setdefault(table, [])
+        if column not in columns:
+            columns.append(column)
+
+    def tables(self) -> Set[str]:
+        return set(self.equality) | set(self.range) | set(self.order_by)
+
+
+def extract_query_columns(sql_query: str, catalog: SchemaCatalog) -> QueryColumns:
+    """
+    Lightweight (regex based, NOT a full SQL parser) extraction of the columns used in
+    WHERE, JOIN ... ON and ORDER BY clauses, resolved to their table via the schema catalog.
+    Unresolvable or ambiguous columns are ignored: the advisor errs on the side of silence.
+    """
+    result = QueryColumns()
+    sql = _STRING_LITERAL.sub("''", sql_query) # literals may contain anything, including keywords
+
+    aliases: Dict[str, str] = {}
+    for match in _TABLE_REF.finditer(sql):
+        table = _unquote(match.group('table'))
+        if table not in catalog.tables:
+            continue
+        aliases[table.lower()] = table
+        alias = match.group('alias')
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            aliases[_unquote(alias).lower()] = table
+    query_tables = sorted(set(aliases.values()))
+    if not query_tables:
+        return result
+
+    def resolve(qualifier: Optional[str], column: str) -> Optional[str]:
+        column = _unquote(column)
+        if column.lower() in _SQL_KEYWORDS:
+            return None
+        if qualifier:
+            table = aliases.get(_unquote(qualifier).lower())
+            return table if table and column in catalog.tables[table] else None
+        candidates = [t for t in query_tables if column in catalog.tables[t]]
+        return candidates[0] if len(candidates) == 1 else None
+
+    for clause in (_WHERE, _ON):
+        for body_match in clause.finditer(sql):
+            body = body_match.group('body')
+            for match in _PREDICATE.finditer(body):
+                table = resolve(match.group('qualifier'), match.group('column'))
+                if not table:
+                    continue
+                op = match.group('op').lower()
+                target = result.equality if op in _EQUALITY_OPS else result.range
+                QueryColumns._add(target, table, _unquote(match.group('column')))
+            for match in _JOIN_EQUALITY.finditer(body):
+                # The right-hand side of a column = column condition is not caught above.
+                table = resolve(match.group('q2'), match.group('c2'))
+                if table:
+                    QueryColumns._add(result.equality, table, _unquote(match.group('c2')))
+
+    for body_match in _ORDER_BY.finditer(sql):
+        for term in body_match.group('body').split(','):
+            match = _COLUMN_REF.match(term.strip())
+            if match:
+                table = resolve(match.group('qualifier'), match.group('column'))
+                if table:
+                    QueryColumns._add(result.order_by, table, _unquote(match.group('column')))
+
+    select_match = _SELECT_LIST.match(sql)
+    for table in query_tables:
+        result.selected[table] = None
+    if select_match and '*' not in select_match.group('body'):
+        selected: Dict[str, List[str]] = {table: [] for table in query_tables}
+        for match in _COLUMN_REF.finditer(select_match.group('body')):
+            table = resolve(match.group('qualifier'), match.group('column'))
+            if table:
+                QueryColumns._add(selected, table, _unquote(match.group('column')))
+        result.selected.update(selected)
+    return result
+
+
+def index_columns_for(query_columns: QueryColumns, table: str) -> List[str]:
+    """
+    Index column order for one table: equality columns, then ONE range column, then
+    ORDER BY columns, then the selected columns (making it covering) if it stays narrow.
+    """
+    columns: List[str] = []
+    for column in query_columns.equality.get(table, []):
+        if column not in columns:
+            columns.append(column)
+    ranges = [c for c in query_columns.range.get(table, []) if c not in columns]
+    if ranges:
+        columns.append(ranges[0]) # an index can only be range-scanned on one column
+    elif query_columns.order_by.get(table):
+        columns.extend(c for c in query_columns.order_by[table] if c not in columns)
+    if not columns:
+        return []
+    selected = query_columns.selected.get(table)
+    if selected is not None:
+        extra = [c for c in selected if c not in columns]
+        if len(columns) + len(extra) <= MAX_INDEX_COLUMNS:
+            columns.extend(extra)
+    return columns[:MAX_INDEX_COLUMNS]
+
+
+def existing_indexes(conn: sqlite3.Connection, table: str) -> List[List[str]]:
+    """Column lists of the existing indexes on `table`, INTEGER PRIMARY KEY (rowid) included."""
+    indexes: Dict[str, List[str]] = {}
+    for index_name, column in conn.execute(
+        "SELECT il.name, ii.name FROM pragma_index_list(?) AS il JOIN pragma_index_info(il.name) AS ii ORDER BY il.name, ii.seqno;",
+        (table,),
+    ):
+        indexes.setdefault(index_name, []).append(column)
+    result = list(indexes.values())
+    rowid_pk = conn.execute(
+        "SELECT name FROM pragma_table_info(?) WHERE pk = 1 AND upper(type) = 'INTEGER' AND (SELECT COUNT(*) FROM pragma_table_info(?) WHERE pk > 0) = 1;",
+        (table, table),
+    ).fetchone()
+    if rowid_pk:
+        result.append([rowid_pk[0]])
+    return result
+
+
+def _is_served_by(columns: List[str], indexes: List[List[str]]) -> bool:
+    """True if an existing index already starts with the (key) columns we would index."""
+    return any(index[:len(columns)] == columns for index in indexes)
+
+
+def recommend_indexes(
+    conn: sqlite3.Connection,
+    catalog: SchemaCatalog,
+    workload: List[Dict[str, Any]],
+    max_indexes: int = 5,
+) -> List[Dict[str, Any]]:
+    """
+    Proposes indexes for a workload (list of {'sql', 'params', 'calls', 'total_ms'}),
+    most valuable (total time of the queries they would help) first.
+    """
+    candidates: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+    for entry in workload:
+        query_columns = extract_query_columns(entry['sql'], catalog)
+        for table in query_columns.tables():
+            columns = index_columns_for(query_columns, table)
+            if not columns:
+                continue
+            key_columns = columns[:len(query_columns.equality.get(table, [])) or 1]
+            if _is_served_by(key_columns, existing_indexes(conn, table)):
+                continue
+            candidate = candidates.setdefault((table, tuple(columns)), {
+                'table': table,
+                'columns': columns,
+                'queries': [],
+                'calls': 0,
+                'total_ms': 0.0,
+            })
+            candidate['queries'].append(entry['sql'])
+            candidate['calls'] += entry.get('calls', 1)
+            candidate['total_ms'] += entry.get('total_ms', 0.0)
+
+    recommendations = sorted(candidates.values(), key=lambda c: (c['total_ms'], c['calls']), reverse=True)[:max_indexes]
+    for recommendation in recommendations:
+        table, columns = recommendation['table'], recommendation['columns']
+        # Only word characters in the name: any quote, space... in a table/column name stays out of it.
+        index_name = re.sub(r'\W+', '_', "idx_" + "_".join([table] + columns))
+        quoted_columns = ", ".join(_quote(c) for c in columns)
+        recommendation['index_name'] = index_name
+        recommendation['ddl'] = f'CREATE INDEX IF NOT EXISTS {_quote(index_name)} ON {_quote(table)} ({quoted_columns});'
+        recommendation['total_ms'] = round(recommendation['total_ms'], 3)
+    return recommendations
+
+
+def time_query(conn: sqlite3.Connection, sql_query: str, params: Tuple = (), repeat: int = 3, timeout_seconds: Optional[float] = None) -> float:
+    """
+    Best-of-`repeat` wall time (ms) to run a read query and walk all its rows (without keeping them).
+    Each run is interrupted after timeout_seconds (OperationalError('interrupted')).
+    """
+    best = float('inf')
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        with statement_timeout(conn, timeout_seconds):
+            for _row in conn.execute(sql_query, params):
+                pass
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return round(best, 3)
+
+
+def replay_workload(conn: sqlite3.Connection, workload: List[Dict[str, Any]], repeat: int = 3, timeout_seconds: Optional[float] = None) -> List[Optional[float]]:
+    """Times every query of the workload (same order). Queries that fail or run over timeout_seconds get None."""
+    timings: List[Optional[float]] = []
+    for entry in workload:
+        try:
+            timings.append(time_query(conn, entry['sql'], tuple(entry.get('params', ())), repeat, timeout_seconds))
+        except sqlite3.Error as e:
+            if is_interrupted(e):
+                logging.warning(f"⏱️ Replay over {timeout_seconds}s, skipping: {entry['sql'][:100]}")
+            else:
+                logging.warning(f"Cannot replay query, skipping: {entry['sql'][:100]} ({e})")
+            timings.append(None)
+    return timings
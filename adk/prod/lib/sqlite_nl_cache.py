@@ -0,0 +1,221 @@
+# lib/sqlite_nl_cache.py
+# Natural language -> SQL translation cache for SQLiteAgent: LRU, persisted to JSON, with literal templating.
+import json
+import os
+import re
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Literals we can lift out of a question and bind as SQL parameters: quoted strings and numbers.
+# One regex, scanned left to right: digits inside quotes belong to the quoted literal.
+_LITERAL = re.compile(r"'(?P<single>[^']*)'|\"(?P<double>[^\"]*)\"|(?<![\w.])(?P<number>-?\d+(?:\.\d+)?)(?![\w.])")
+_PUNCTUATION = re.compile(r"[^\w\s<>=*'\".-]")
+_SPACES = re.compile(r"\s+")
+LITERAL_PLACEHOLDER = "<lit>"
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, no punctuation, single spaces: 'Show  users!' == 'show users'."""
+    question = _PUNCTUATION.sub(" ", question.strip().lower())
+    return _SPACES.sub(" ", question).strip(" .")
+
+
+def question_template(question: str) -> Tuple[str, List[str | int | float]]:
+    """
+    Lifts the literals out of a question (keeping their case) and normalizes the rest:
+
+        "Events in 'Rome' with more than 100 attendees?"
+        -> ("events in <lit> with more than <lit> attendees", ['Rome', 100])
+    """
+    literals: List[str | int | float] = []
+
+    def lift(match: re.Match) -> str:
+        number = match.group('number')
+        if number is not None:
+            literals.append(float(number) if '.' in number else int(number))
+        else:
+            literals.append(match.group('single') if match.group('single') is not None else match.group('double'))
+        return f" {LITERAL_PLACEHOLDER} "
+
+    return normalize_question(_LITERAL.sub(lift, question)), literals
+
+
+def _cache_key(template: str, literals: List[str | int | float]) -> str:
+    """Exact-hit key: normalized text + literals as typed ('Rome' != 'rome')."""
+    return template + " | " + json.dumps(literals)
+
+
+def _sql_literal_pattern(literal: str | int | float) -> re.Pattern:
+    """Regex matching `literal` as it would appear in SQL ('Rome' quoted, 100 as a bare number)."""
+    if isinstance(literal, str):
+        return re.compile(r"'" + re.escape(literal.replace("'", "''")) + r"'")
+    return re.compile(r"(?<![\w.'])" + re.escape(str(literal)) + r"(?![\w.'])")
+
+
+def parameterize_sql(sql_query: str, literals: List[str | int | float]) -> Optional[str]:
+    """
+    Turns the question literals found in the SQL into `?` placeholders, in question order:
+
+        ("SELECT * FROM events WHERE city = 'Rome' AND attendees > 100", ['Rome', 100])
+        -> "SELECT * FROM events WHERE city = ? AND attendees > ?"
+
+    Returns None if the mapping is not unambiguous (a literal missing, repeated, or the
+    SQL literals in a different order than in the question): then only exact hits are safe.
+    """
+    positions = []
+    for literal in literals:
+        matches = list(_sql_literal_pattern(literal).finditer(sql_query))
+        if len(matches) != 1:
+            return None
+        positions.append(matches[0].span())
+    if positions != sorted(positions):
+        return None
+    parts, last = [], 0
+    for start, end in positions:
+        parts.append(sql_query[last:start])
+        parts.append("?")
+        last = end
+    parts.append(sql_query[last:])
+    return "".join(parts)
+
+
+class NLQueryCache:
+    """
+    LRU cache of natural language question -> SQL, scoped by schema fingerprint
+    (a schema change silently invalidates every translation made for the old one).
+
+    - Exact hit: same normalized question and literals, returns the cached SQL (no params).
+    - Fuzzy hit: same question template with different literals ("events in 'Rome'"
+      vs "events in 'Catania'"), returns the parameterized SQL plus the new literals
+      as params, if the cached SQL could be parameterized unambiguously.
+
+    Optionally persisted to a JSON file (rewritten atomically on every put).
+    """
+
+    def __init__(self, max_entries: int = 256, path: Optional[str] = None):
+        self.max_entries: int = max_entries
+        self.path: Optional[str] = path
+        self._lock = threading.Lock()
+        # (fingerprint, template + literals) -> entry
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lookups: int = 0
+        self._exact_hits: int = 0
+        self._fuzzy_hits: int = 0
+        if path:
+            self._load()
+
+    def _template_index(self) -> Dict[Tuple[str, str], Tuple[str, str]]:
+        """(fingerprint, template) -> key of the most recent entry with a parameterized SQL."""
+        index = {}
+        for key, entry in self._entries.items():
+            if entry.get('param_sql'):
+                index[(key[0], entry['template'])] = key
+        return index
+
+    def get(self, question: str, schema_fingerprint: str) -> Optional[Tuple[str, Tuple, str]]:
+        """Returns (sql, params, 'exact'|'fuzzy') or None on a miss."""
+        template, literals = question_template(question)
+        key = (schema_fingerprint, _cache_key(template, literals))
+        with self._lock:
+            self._lookups += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry['hits'] += 1
+                self._exact_hits += 1
+                return entry['sql'], (), 'exact'
+            if not literals:
+                return None
+            similar_key = self._template_index().get((schema_fingerprint, template))
+            if similar_key is None:
+                return None
+            similar = self._entries[similar_key]
+            if len(similar['literals']) != len(literals):
+                return None
+            self._entries.move_to_end(similar_key)
+            similar['hits'] += 1
+            self._fuzzy_hits += 1
+            return similar['param_sql'], tuple(literals), 'fuzzy'
+
+    def put(self, question: str, schema_fingerprint: str, sql_query: str):
+        """Caches a translation (call it only once the SQL ran fine)."""
+        template, literals = question_template(question)
+        key = (schema_fingerprint, _cache_key(template, literals))
+        entry = {
+            'question': question,
+            'template': template,
+            'literals': literals,
+            'sql': sql_query,
+            'param_sql': parameterize_sql(sql_query, literals) if literals else None,
+            'hits': 0,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.path:
+            self._save()
+
+    def discard(self, schema_fingerprint: str, sql_query: str) -> int:
+        """Forgets the translations to sql_query (e.g. a cached SQL that no longer runs). Returns how many."""
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if key[0] == schema_fingerprint and sql_query in (entry['sql'], entry.get('param_sql'))
+            ]
+            for key in stale:
+                del self._entries[key]
+        if stale and self.path:
+            self._save()
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookups, exact / fuzzy hits and hit rate since startup."""
+        with self._lock:
+            hits = self._exact_hits + self._fuzzy_hits
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'lookups': self._lookups,
+                'exact_hits': self._exact_hits,
+                'fuzzy_hits': self._fuzzy_hits,
+                'misses': self._lookups - hits,
+                'hit_rate': round(hits / self._lookups, 3) if self._lookups else 0.0,
+                'path': self.path,
+            }
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for item in data.get('entries', [])[-self.max_entries:]:
+                self._entries[(item['fingerprint'], item['key'])] = item['entry']
+            logging.info(f"Loaded {len(self._entries)} NL->SQL translations from {self.path}")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable NL cache {self.path}: {e}")
+            self._entries.clear()
+
+    def _save(self):
+        with self._lock:
+            data = {'entries': [
+                {'fingerprint': fingerprint, 'key': key, 'entry': entry}
+                for (fingerprint, key), entry in self._entries.items()
+            ]}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, default=str)
+            os.replace(tmp_path, self.path) # atomic: readers never see half a file
+        except OSError as e:
+            logging.error(f"Could not write NL cache {self.path}: {e}")
@@ -0,0 +1,259 @@
+# lib/sqlite_pool.py
+# A tiny, bounded, thread-safe connection pool for SQLiteAgent.
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+
+class SQLiteConnectionPool:
+    """
+    Bounded pool of SQLite connections: up to `max_readers` read connections
+    plus ONE writer connection (SQLite only allows a single writer anyway).
+
+    Connections are opened lazily with `check_same_thread=False` and handed out
+    to one thread at a time, so the pool can be shared by ADK tool calls
+    running on different threads.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_readers: int = 4,
+        timeout: float = 10,
+        on_connect: Optional[Callable[[sqlite3.Connection, bool], None]] = None,
+        database: Optional[str] = None,
+        uri: bool = False,
+    ):
+        """
+        Args:
+            on_connect: Optional hook called on every newly opened connection, with
+                        True for the writer and False for readers (e.g. to apply PRAGMAs,
+                        which are per connection in SQLite).
+            database: What to actually connect to, if not `filename` (e.g. the URI of an
+                      in-memory copy of it, see lib/sqlite_snapshot.py). Can be changed
+                      later with retarget().
+            uri: If True, `database` is a 'file:...' URI.
+        """
+        if max_readers < 1:
+            raise ValueError("max_readers must be >= 1. 🤔")
+        self.filename: str = filename
+        self.max_readers: int = max_readers
+        self.timeout: float = timeout
+        self.on_connect = on_connect
+        self.database: str = database or filename
+        self.uri: bool = uri
+        # Bumped by retarget(): connections of an older generation are closed instead of reused.
+        self._generation: int = 0
+        self._connection_generation: Dict[sqlite3.Connection, int] = {}
+
+        self._lock = threading.Lock()
+        self._readers_available = threading.Condition(self._lock)
+        self._idle_readers: List[sqlite3.Connection] = []
+        self._open_readers: int = 0
+        self._writer: sqlite3.Connection | None = None
+        self._writer_lock = threading.Lock()
+        self._closed: bool = False
+        # Connections currently lent out (readers and writer), so they can be interrupted.
+        self._borrowed: Set[sqlite3.Connection] = set()
+
+        # Stats, to see how much we save compared to a connection per call.
+        self._hits: int = 0
+        self._misses: int = 0
+        self._waits: int = 0
+        self._wait_seconds: float = 0.0
+
+    def _open_connection(self, write: bool = False) -> sqlite3.Connection:
+        """Opens a brand new connection (counted as a pool miss)."""
+        while True:
+            with self._lock:
+                database, uri, generation = self.database, self.uri, self._generation
+            conn = sqlite3.connect(database, timeout=self.timeout, check_same_thread=False, uri=uri)
+            with self._lock:
+                if generation == self._generation:
+                    self._connection_generation[conn] = generation
+                    break
+            conn.close() # retargeted while connecting: the old database may already be gone
+        # Return rows as dictionary-like objects
+        conn.row_factory = sqlite3.Row
+        if self.on_connect is not None:
+            try:
+                self.on_connect(conn, write)
+            except Exception:
+                with self._lock:
+                    self._close_connection(conn)
+                raise
+        logging.debug(f"[pool] Opened new connection to {database}")
+        return conn
+
+    def _close_connection(self, conn: sqlite3.Connection):
+        """Closes a connection for good. Call with self._lock held."""
+        self._connection_generation.pop(conn, None)
+        conn.close()
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        start = time.perf_counter()
+        waited = False
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed.")
+                if self._idle_readers:
+                    self._hits += 1
+                    conn = self._idle_readers.pop()
+                    break
+                if self._open_readers < self.max_readers:
+                    self._misses += 1
+                    self._open_readers += 1
+                    conn = None
+                    break
+                waited = True
+                self._readers_available.wait()
+            if waited:
+                self._waits += 1
+                self._wait_seconds += time.perf_counter() - start
+        if conn is None:
+            try:
+                conn = self._open_connection()
+            except sqlite3.Error:
+                with self._lock:
+                    self._open_readers -= 1
+                    self._readers_available.notify()
+                raise
+        return conn
+
+    def _release_reader(self, conn: sqlite3.Connection, discard: bool = False):
+        with self._lock:
+            if self._closed or discard or self._connection_generation.get(conn) != self._generation:
+                self._open_readers -= 1
+                self._close_connection(conn)
+            else:
+                self._idle_readers.append(conn)
+            self._readers_available.notify()
+
+    def _acquire_writer(self) -> sqlite3.Connection:
+        start = time.perf_counter()
+        if not self._writer_lock.acquire(blocking=False):
+            self._writer_lock.acquire()
+            with self._lock:
+                self._waits += 1
+                self._wait_seconds += time.perf_counter() - start
+        try:
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed.")
+                if self._writer is not None:
+                    self._hits += 1
+                    return self._writer
+                self._misses += 1
+            self._writer = self._open_connection(write=True)
+            return self._writer
+        except Exception:
+            self._writer_lock.release()
+            raise
+
+    @contextmanager
+    def connection(self, write: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Borrows a connection from the pool.
+
+        Behaves like `with sqlite3.connect(...) as conn:` used to: the transaction
+        is committed on success and rolled back on error. The connection goes
+        back to the pool instead of being closed.
+
+        Args:
+            write (bool): If True, borrow the (single) writer connection.
+        """
+        conn = self._acquire_writer() if write else self._acquire_reader()
+        with self._lock:
+            self._borrowed.add(conn)
+        broken = False
+        try:
+            with conn:
+                yield conn
+        except sqlite3.ProgrammingError:
+            # e.g. the connection got closed under our feet: never reuse it.
+            broken = True
+            raise
+        finally:
+            with self._lock:
+                self._borrowed.discard(conn)
+            if write:
+                if broken:
+                    with self._lock:
+                        self._connection_generation.pop(conn, None)
+                    self._writer = None
+                self._writer_lock.release()
+            else:
+                self._release_reader(conn, discard=broken)
+
+    def retarget(self, database: str, uri: bool = False):
+        """
+        Points the pool to another database (e.g. a fresh in-memory snapshot): idle
+        connections are closed now, borrowed ones when they are given back.
+        """
+        with self._lock:
+            self.database, self.uri = database, uri
+            self._generation += 1
+            for conn in self._idle_readers:
+                self._close_connection(conn)
+            self._open_readers -= len(self._idle_readers)
+            self._idle_readers.clear()
+            self._readers_available.notify_all()
+        with self._writer_lock:
+            if self._writer is not None:
+                with self._lock:
+                    self._close_connection(self._writer)
+                self._writer = None
+        logging.debug(f"[pool] Retargeted {self.filename} to {database} (generation {self._generation})")
+
+    def interrupt_all(self) -> int:
+        """
+        Aborts the statements running on every borrowed connection (they raise
+        OperationalError('interrupted')). Safe to call from any thread.
+        Returns the number of connections interrupted.
+        """
+        with self._lock:
+            borrowed = list(self._borrowed)
+        for conn in borrowed:
+            conn.interrupt()
+        if borrowed:
+            logging.warning(f"[pool] Interrupted {len(borrowed)} running connection(s) on {self.filename}")
+        return len(borrowed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns pool hits/misses and time spent waiting for a free connection."""
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                'db_filename': self.filename,
+                'max_readers': self.max_readers,
+                'open_readers': self._open_readers,
+                'idle_readers': len(self._idle_readers),
+                'writer_open': self._writer is not None,
+                'borrowed': len(self._borrowed),
+                'generation': self._generation,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / requests, 3) if requests else 0.0,
+                'waits': self._waits,
+                'wait_seconds': round(self._wait_seconds, 6),
+            }
+
+    def close(self):
+        """Closes all idle connections. Borrowed connections are closed on release."""
+        with self._lock:
+            self._closed = True
+            for conn in self._idle_readers:
+                self._close_connection(conn)
+            self._open_readers -= len(self._idle_readers)
+            self._idle_readers.clear()
+            self._readers_available.notify_all()
+        with self._writer_lock:
+            if self._writer is not None:
+                with self._lock:
+                    self._close_connection(self._writer)
+                self._writer = None
+        logging.debug(f"[pool] Closed connection pool for {self.filename}")
@@ -0,0 +1,71 @@
+# lib/sqlite_profiles.py
+# Performance profiles (sets of PRAGMAs) applied to every connection SQLiteAgent opens.
+import sqlite3
+import logging
+from typing import Any, Dict, List, Tuple
+
+# Order matters: journal_mode first, synchronous=NORMAL is only safe with WAL.
+PERFORMANCE_PROFILES: Dict[str, List[Tuple[str, Any]]] = {
+    # SQLite defaults: rollback journal, writers block readers.
+    'default': [],
+    # WAL: readers never block the writer (and vice versa). Commits are durable
+    # up to the last checkpoint on power loss (not on app crash): fine for an agent DB.
+    'fast': [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', 256 * 1024 * 1024), # 256MB memory-mapped reads
+        ('cache_size', -64 * 1024),       # negative = KiB, i.e. 64MB page cache per connection
+        ('temp_store', 'MEMORY'),         # sorts / temp indexes in RAM
+    ],
+}
+
+# Only safe (durable up to the last checkpoint) under WAL: skipped when journal_mode is anything else.
+_WAL_ONLY_PRAGMAS = ('synchronous',)
+
+# PRAGMAs reported by read_pragmas(), whatever the profile.
+_REPORTED_PRAGMAS = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store', 'busy_timeout')
+
+
+def check_profile(profile: str) -> str:
+    """Returns `profile` if known, raises ValueError otherwise."""
+    if profile not in PERFORMANCE_PROFILES:
+        raise ValueError(f"Unknown performance profile '{profile}', use one of {list(PERFORMANCE_PROFILES)}. 🤔")
+    return profile
+
+
+def apply_profile(conn: sqlite3.Connection, profile: str, writer: bool = False):
+    """
+    Applies the profile PRAGMAs to a freshly opened connection.
+
+    journal_mode=WAL is persistent (stored in the DB file): it is only set from the
+    writer connection of an agent with write access (`writer=True`). Readers and
+    read-only agents leave the file as they found it (read-only mounts, DBs baked
+    into images...) and just look at its current mode.
+    Setting it needs write access to the file and its directory, and SQLite reports
+    a failure by returning the current mode, not by raising: we log and go on in
+    that mode. synchronous=NORMAL is only applied when the mode actually is WAL.
+    """
+    journal_mode = None
+    for pragma, value in PERFORMANCE_PROFILES[check_profile(profile)]:
+        if pragma == 'journal_mode':
+            statement = f"PRAGMA journal_mode = {value};" if writer else "PRAGMA journal_mode;"
+            try:
+                journal_mode = str(conn.execute(statement).fetchone()[0]).lower()
+            except sqlite3.Error as e:
+                logging.warning(f"Could not set PRAGMA journal_mode={value} ({profile} profile): {e}")
+                continue
+            if writer and journal_mode != str(value).lower():
+                logging.warning(f"Could not set PRAGMA journal_mode={value} ({profile} profile): still '{journal_mode}'")
+            continue
+        if pragma in _WAL_ONLY_PRAGMAS and journal_mode != 'wal':
+            logging.debug(f"Skipping PRAGMA {pragma}={value} ({profile} profile): journal_mode is '{journal_mode}', not WAL")
+            continue
+        try:
+            conn.execute(f"PRAGMA {pragma} = {value};").fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"Could not set PRAGMA {pragma}={value} ({profile} profile): {e}")
+
+
+def read_pragmas(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Returns the effective values of the PRAGMAs the profiles touch."""
+    return {pragma: conn.execute(f"PRAGMA {pragma};").fetchone()[0] for pragma in _REPORTED_PRAGMAS}
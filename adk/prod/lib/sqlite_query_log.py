@@ -0,0 +1,116 @@
+# lib/sqlite_query_log.py
+# EXPLAIN QUERY PLAN helpers, a persistent (JSONL) slow-query log and the query workload for SQLiteAgent.
+import sqlite3
+import json
+import os
+import re
+import threading
+import datetime
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+# "SCAN events" (SQLite >= 3.36) or "SCAN TABLE events" (older). "SCAN events USING INDEX ..." is fine.
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(?P<table>[\w\"]+)(?P<rest>.*)$")
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql_query: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+    """Runs EXPLAIN QUERY PLAN and returns its rows as dicts ({'id', 'parent', 'detail'})."""
+    cursor = conn.execute(f"EXPLAIN QUERY PLAN {sql_query}", params)
+    return [{'id': row[0], 'parent': row[1], 'detail': row[3]} for row in cursor.fetchall()]
+
+
+def find_full_scans(plan: List[Dict[str, Any]]) -> List[str]:
+    """Returns the tables read with a full table scan (no index) in a query plan."""
+    tables = []
+    for step in plan:
+        match = _FULL_SCAN.match(step['detail'])
+        if not match or 'INDEX' in match.group('rest') or match.group('table') == 'CONSTANT':
+            continue
+        tables.append(match.group('table').strip('"'))
+    return tables
+
+
+class SlowQueryLog:
+    """
+    Append-only JSONL log of statements slower than `threshold_ms`, with their plan.
+
+    One JSON object per line, so it survives restarts, can be tailed, and is
+    cheap to append to from many threads.
+    """
+
+    def __init__(self, path: str, threshold_ms: float = 200.0):
+        self.path: str = path
+        self.threshold_ms: float = threshold_ms
+        self._lock = threading.Lock()
+
+    def should_log(self, duration_ms: float) -> bool:
+        return duration_ms >= self.threshold_ms
+
+    def record(self, sql_query: str, params: Tuple, duration_ms: float, row_count: int, plan: Optional[List[Dict[str, Any]]] = None):
+        """Appends one slow statement to the log."""
+        entry = {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'duration_ms': round(duration_ms, 3),
+            'row_count': row_count,
+            'sql': sql_query,
+            'params': list(params),
+            'plan': [step['detail'] for step in plan] if plan else [],
+            'full_scans': find_full_scans(plan) if plan else [],
+        }
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        logging.warning(f"🐢 Slow query ({entry['duration_ms']} ms, full scans: {entry['full_scans']}): {sql_query[:100]}")
+
+    def read(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Returns the last `limit` entries (most recent last)."""
+        if not os.path.exists(self.path):
+            return []
+        entries: deque = deque(maxlen=max(limit, 0))
+        with self._lock:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logging.warning(f"Skipping corrupted line in slow query log {self.path}")
+        return list(entries)
+
+
+class QueryWorkload:
+    """
+    Bounded in-memory history of the read statements run by an agent:
+    one entry per distinct (sql, params), with call count and total time.
+    Least recently seen statements are dropped first.
+    """
+
+    def __init__(self, max_statements: int = 500):
+        self.max_statements: int = max_statements
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+    def record(self, sql_query: str, params: Tuple, duration_ms: float):
+        key = (sql_query, json.dumps(list(params), default=str))
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                entry = {'sql': sql_query, 'params': list(params), 'calls': 0, 'total_ms': 0.0}
+            entry['calls'] += 1
+            entry['total_ms'] += duration_ms
+            self._entries[key] = entry
+            while len(self._entries) > self.max_statements:
+                self._entries.popitem(last=False)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Returns a copy of the recorded statements, most expensive (total time) first."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        return sorted(entries, key=lambda e: e['total_ms'], reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
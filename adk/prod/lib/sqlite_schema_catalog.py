@@ -0,0 +1,108 @@
+# lib/sqlite_schema_catalog.py
+# In-memory schema catalog for SQLiteAgent, invalidated by PRAGMA schema_version.
+import sqlite3
+import hashlib
+import json
+import time
+import logging
+from typing import Dict, List
+
+# User tables and views only: no sqlite_* internals, no virtual tables (e.g. FTS5
+# indexes, see lib/sqlite_fts.py) and none of their shadow tables (<vtab>_data, ...).
+_USER_OBJECTS = """
+    m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%'
+    AND COALESCE(m.sql, '') NOT LIKE 'CREATE VIRTUAL TABLE%'
+    AND NOT EXISTS (
+        SELECT 1 FROM sqlite_master AS v
+        WHERE v.sql LIKE 'CREATE VIRTUAL TABLE%'
+          AND m.name IN (v.name || '_data', v.name || '_idx', v.name || '_content', v.name || '_docsize', v.name || '_config')
+    )
+"""
+# One pass over sqlite_master + pragma_table_info, instead of 1 + N queries.
+_CATALOG_QUERY = f"""
+    SELECT m.type AS object_type, m.name AS table_name, p.name AS column_name, p.type AS column_type
+    FROM sqlite_master AS m
+    JOIN pragma_table_info(m.name) AS p
+    WHERE {_USER_OBJECTS}
+    ORDER BY m.rowid, p.cid;
+"""
+
+
+def read_schema_version(conn: sqlite3.Connection) -> int:
+    """Returns PRAGMA schema_version: SQLite bumps it on every schema change (any connection)."""
+    return conn.execute("PRAGMA schema_version;").fetchone()[0]
+
+
+class SchemaCatalog:
+    """
+    Immutable snapshot of the database schema (table -> column -> type).
+
+    Build it with `SchemaCatalog.load(conn)`, and rebuild it only when
+    `read_schema_version(conn)` no longer matches `schema_version`.
+    """
+
+    def __init__(self, schema_version: int, tables: Dict[str, Dict[str, str]], views: Dict[str, Dict[str, str]] | None = None):
+        self.schema_version: int = schema_version
+        self.tables: Dict[str, Dict[str, str]] = tables
+        self.views: Dict[str, Dict[str, str]] = views or {}
+        self.loaded_at: float = time.time()
+        self._description: str | None = None
+        self._fingerprint: str | None = None
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "SchemaCatalog":
+        """Reads the whole schema in one pass."""
+        schema_version = read_schema_version(conn)
+        tables: Dict[str, Dict[str, str]] = {}
+        views: Dict[str, Dict[str, str]] = {}
+        try:
+            rows = conn.execute(_CATALOG_QUERY).fetchall()
+        except sqlite3.OperationalError as e:
+            # A single broken view (e.g. pointing to a dropped table) fails the whole join:
+            # fall back to one PRAGMA per object, skipping the broken ones.
+            logging.warning(f"One-pass schema read failed ({e}), falling back to per-table reads.")
+            rows = []
+            objects = conn.execute(f"SELECT m.type, m.name FROM sqlite_master AS m WHERE {_USER_OBJECTS} ORDER BY m.rowid;").fetchall()
+            for object_type, table_name in objects:
+                try:
+                    columns = conn.execute("SELECT name, type FROM pragma_table_info(?);", (table_name,)).fetchall()
+                except sqlite3.OperationalError as table_error:
+                    logging.warning(f"Skipping '{table_name}' in schema catalog: {table_error}")
+                    continue
+                rows.extend((object_type, table_name, column_name, column_type) for column_name, column_type in columns)
+        for object_type, table_name, column_name, column_type in rows:
+            target = tables if object_type == 'table' else views
+            target.setdefault(table_name, {})[column_name] = column_type
+        return cls(schema_version, tables, views)
+
+    def table_names(self) -> List[str]:
+        return list(self.tables.keys())
+
+    def table_schema(self, table_name: str) -> Dict[str, str]:
+        """Returns a copy of the table (or view) schema, or {} if unknown."""
+        return dict(self.tables.get(table_name) or self.views.get(table_name) or {})
+
+    def full_schema(self) -> Dict[str, Dict[str, str]]:
+        """Returns a copy of the whole schema (callers may mutate it)."""
+        return {name: dict(columns) for name, columns in self.tables.items()}
+
+    def description(self) -> str:
+        """Schema description string for the LLM (computed once per catalog)."""
+        if self._description is None:
+            if not self.tables:
+                self._description = "The database contains no tables."
+            else:
+                schema_parts = []
+                for table, schema in self.tables.items():
+                    columns_str = ", ".join([f"{name} ({type})" for name, type in schema.items()])
+                    schema_parts.append(f"Table '{table}': [{columns_str}]")
+                self._description = "\n".join(schema_parts)
+        return self._description
+
+    @property
+    def fingerprint(self) -> str:
+        """Short stable hash of the schema content (not of schema_version)."""
+        if self._fingerprint is None:
+            payload = json.dumps([self.tables, self.views], sort_keys=True)
+            self._fingerprint = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+        return self._fingerprint
@@ -0,0 +1,167 @@
+# lib/sqlite_snapshot.py
+# Read-only RAM copy of a SQLite file for SQLiteAgent: loaded with the backup API, reloaded when the file changes.
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import logging
+import urllib.parse
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Bigger databases are not copied to RAM: they are memory-mapped instead (see mmap_size_for()).
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Room for the file to grow before the mapping stops covering all of it.
+MMAP_HEADROOM_BYTES = 64 * 1024 * 1024
+_snapshot_ids = itertools.count(1)
+
+
+def database_size(filename: str) -> int:
+    """Bytes on disk of a database, its WAL file included (0 if it does not exist)."""
+    size = 0
+    for path in (filename, f"{filename}-wal"):
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    return size
+
+
+def mmap_size_for(filename: str) -> int:
+    """PRAGMA mmap_size mapping the whole database file (plus some headroom)."""
+    return database_size(filename) + MMAP_HEADROOM_BYTES
+
+
+def file_signature(filename: str) -> Tuple[Tuple[int, int], ...]:
+    """(mtime_ns, size) of the database file and of its WAL file: changes on every commit."""
+    signature = []
+    for path in (filename, f"{filename}-wal"):
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((0, 0))
+    return tuple(signature)
+
+
+def read_only_uri(filename: str) -> str:
+    return f"file:{urllib.parse.quote(os.path.abspath(filename))}?mode=ro"
+
+
+class MemorySnapshot:
+    """
+    A copy of a database file in a shared-cache in-memory database, so reads run at
+    RAM speed (no file I/O, no locking against the writers of the file).
+
+    Every load creates a NEW in-memory database (one URI per generation) while the
+    previous one keeps serving the connections still using it. An "anchor" connection
+    keeps the current copy alive: SQLite frees an in-memory DB with its last connection.
+
+    Staleness is checked at most every `check_interval` seconds, with the file mtime/size
+    (cheap) and PRAGMA data_version on a watcher connection (also sees WAL commits
+    that have not been checkpointed into the file yet).
+    """
+
+    def __init__(self, filename: str, check_interval: float = 1.0, on_reload: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            check_interval: Min seconds between two staleness checks.
+            on_reload: Called with the new URI after every reload, BEFORE the previous
+                       copy is released (e.g. to retarget a connection pool).
+        """
+        self.filename: str = filename
+        self.check_interval: float = check_interval
+        self.on_reload = on_reload
+        self.uri: Optional[str] = None
+        self.generation: int = 0
+        self._id: int = next(_snapshot_ids)
+        self._lock = threading.Lock()
+        self._anchor: Optional[sqlite3.Connection] = None
+        self._watcher = sqlite3.connect(read_only_uri(filename), uri=True, check_same_thread=False)
+        self._signature: Tuple[Tuple[int, int], ...] = ()
+        self._data_version: int = -1
+        self._last_check: float = 0.0
+        # Stats
+        self._checks: int = 0
+        self._last_load_seconds: float = 0.0
+        self._loaded_at: float = 0.0
+        self._bytes: int = 0
+        self.load()
+
+    def _read_data_version(self) -> int:
+        return self._watcher.execute("PRAGMA data_version;").fetchone()[0]
+
+    def load(self) -> str:
+        """(Re)copies the file into a new in-memory database and returns its URI."""
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> str:
+        started = time.perf_counter()
+        generation = self.generation + 1
+        uri = f"file:snapshot_{os.getpid()}_{self._id}_{generation}?mode=memory&cache=shared"
+        # Read the markers BEFORE copying: a commit during the copy means one more reload, never a missed one.
+        signature, data_version = file_signature(self.filename), self._read_data_version()
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(read_only_uri(self.filename), uri=True)
+        try:
+            source.backup(anchor) # one step: a consistent copy, under a single read lock
+        except sqlite3.Error:
+            anchor.close()
+            raise
+        finally:
+            source.close()
+        previous = self._anchor
+        self._anchor, self.uri, self.generation = anchor, uri, generation
+        self._signature, self._data_version = signature, data_version
+        self._last_check = time.monotonic()
+        if self.on_reload is not None and previous is not None:
+            self.on_reload(uri)
+        if previous is not None:
+            previous.close() # freed once the last connection still reading it is closed
+        page_count = anchor.execute("PRAGMA page_count;").fetchone()[0]
+        self._bytes = page_count * anchor.execute("PRAGMA page_size;").fetchone()[0]
+        self._last_load_seconds = time.perf_counter() - started
+        self._loaded_at = time.time()
+        logging.info(f"🧠 Loaded {self.filename} in memory ({self._bytes} bytes, generation {generation}) in {self._last_load_seconds:.3f}s")
+        return uri
+
+    def is_stale(self) -> bool:
+        """True if the file changed since the last load."""
+        return file_signature(self.filename) != self._signature or self._read_data_version() != self._data_version
+
+    def refresh_if_stale(self, force: bool = False) -> bool:
+        """
+        Reloads the copy if the file changed (checked at most every check_interval
+        seconds, unless force=True). Returns True if it reloaded.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+            self._checks += 1
+            if not force and not self.is_stale():
+                return False
+            self._load()
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'uri': self.uri,
+                'generation': self.generation,
+                'bytes': self._bytes,
+                'checks': self._checks,
+                'reloads': self.generation - 1,
+                'last_load_seconds': round(self._last_load_seconds, 3),
+                'loaded_at': self._loaded_at,
+                'check_interval': self.check_interval,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._anchor is not None:
+                self._anchor.close()
+                self._anchor = None
+            self._watcher.close()